@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+A2A Event Queue Benchmark
+Simulates an executor streaming many `working` updates to a slow A2A reader
+and to a reader that stops reading, with the SDK's default event queue and
+with the bounded queue policy. Reports queue depth, events delivered, time
+the producer was blocked and whether the final event arrived.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from a2a.server.events import EventConsumer, EventQueue  # noqa: E402
+from a2a.types import (  # noqa: E402
+    TaskArtifactUpdateEvent,
+    TaskState,
+    TaskStatus,
+    TaskStatusUpdateEvent,
+)
+from a2a.utils import new_agent_text_message, new_text_artifact  # noqa: E402
+
+from src.agent.event_queue import BoundedEventQueue, QueuePolicy  # noqa: E402
+
+TASK_ID = "task-1"
+CONTEXT_ID = "context-1"
+
+
+def working_update(i: int) -> TaskStatusUpdateEvent:
+    return TaskStatusUpdateEvent(
+        status=TaskStatus(
+            state=TaskState.working,
+            message=new_agent_text_message(f"Building the output... {i}", CONTEXT_ID, TASK_ID),
+        ),
+        final=False,
+        contextId=CONTEXT_ID,
+        taskId=TASK_ID,
+        metadata={"progress": [{"type": "tool_call", "tool": f"step{i}"}]},
+    )
+
+
+async def produce(queue: EventQueue, updates: int, interval: float) -> float:
+    """Enqueue the updates, an artifact and a final status; returns seconds spent"""
+    started = time.perf_counter()
+    for i in range(updates):
+        await queue.enqueue_event(working_update(i))
+        await asyncio.sleep(interval)
+    await queue.enqueue_event(
+        TaskArtifactUpdateEvent(
+            append=False,
+            contextId=CONTEXT_ID,
+            taskId=TASK_ID,
+            lastChunk=True,
+            artifact=new_text_artifact(name="current_result", description="Result", text="done"),
+        )
+    )
+    await queue.enqueue_event(
+        TaskStatusUpdateEvent(
+            status=TaskStatus(state=TaskState.completed), final=True, contextId=CONTEXT_ID, taskId=TASK_ID
+        )
+    )
+    return time.perf_counter() - started
+
+
+async def run(
+    name: str, queue: EventQueue, updates: int, interval: float, read_delay: float, stall_after: int, timeout: float
+):
+    delivered = 0
+    final = False
+    max_depth = 0
+
+    async def consume():
+        nonlocal delivered, final
+        async for event in EventConsumer(queue).consume_all():
+            delivered += 1
+            final = final or (isinstance(event, TaskStatusUpdateEvent) and event.final)
+            if stall_after and delivered >= stall_after:
+                await asyncio.sleep(3600)
+            await asyncio.sleep(read_delay)
+
+    async def sample():
+        nonlocal max_depth
+        while True:
+            max_depth = max(max_depth, queue.queue.qsize())
+            await asyncio.sleep(0.001)
+
+    consumer = asyncio.create_task(consume())
+    sampler = asyncio.create_task(sample())
+    try:
+        producer = f"{await asyncio.wait_for(produce(queue, updates, interval), timeout):6.2f} s"
+    except asyncio.TimeoutError:
+        producer = "blocked"
+    try:
+        await asyncio.wait_for(consumer, timeout)
+    except asyncio.TimeoutError:
+        consumer.cancel()
+    sampler.cancel()
+    extra = ""
+    if isinstance(queue, BoundedEventQueue):
+        extra = f"  coalesced {queue.coalesced:5d}  disconnected {queue.slow_consumer}"
+    print(f"  {name:<26} producer {producer:>8}  max depth {max_depth:5d}  "
+          f"delivered {delivered:5d}  final {str(final):<5}{extra}")
+
+
+async def main_async(args) -> None:
+    policy = QueuePolicy(capacity=args.capacity, slow_consumer_timeout=args.slow_consumer_timeout)
+    scenarios = [
+        ("slow reader", 0),
+        ("stalled reader", 5),
+    ]
+    print(f"\n{'='*60}")
+    print(f"A2A EVENT QUEUE ({args.updates} working updates every {args.interval * 1000:.0f} ms, "
+          f"reader {args.read_delay * 1000:.0f} ms/event)")
+    print(f"{'='*60}")
+    for scenario, stall_after in scenarios:
+        print(f"{scenario}:")
+        await run("SDK default queue", EventQueue(), args.updates, args.interval, args.read_delay,
+                  stall_after, args.timeout)
+        await run(f"bounded (capacity {args.capacity})", BoundedEventQueue(policy), args.updates, args.interval,
+                  args.read_delay, stall_after, args.timeout)
+    print(f"{'='*60}\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark A2A event queues with slow readers")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--interval", type=float, default=0.0005, help="Seconds between working updates")
+    parser.add_argument("--read-delay", type=float, default=0.01, help="Seconds the reader spends per event")
+    parser.add_argument("--capacity", type=int, default=64)
+    parser.add_argument("--slow-consumer-timeout", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds before a stuck producer or reader is abandoned")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
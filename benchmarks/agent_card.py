@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Agent Card Benchmark
+Measures the cost of serving the Agent Card when it is rebuilt and
+re-serialized on every request, as the discovery endpoint used to do, against
+the pre-serialized card with ETag validation (full 200 and conditional 304),
+both as direct handler calls and over HTTP through an ASGI transport.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import JSONResponse, Response  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from src.agent.a2a_server import A2AServer  # noqa: E402
+
+
+def make_request(if_none_match: str | None = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/agent-card", "headers": headers})
+
+
+def rebuild_response(server: A2AServer) -> Response:
+    """The previous per-request path: build the card models and serialize them"""
+    card = server._build_agent_card()
+    return JSONResponse(card.model_dump(mode="json", by_alias=True, exclude_none=True))
+
+
+def time_calls(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+async def time_http(client: httpx.AsyncClient, path: str, headers: dict, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        response.read()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+def report(name: str, samples: list[float], baseline: float | None = None) -> float:
+    mean = statistics.fmean(samples)
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    speedup = f"  {baseline / mean:6.1f}x" if baseline else ""
+    print(f"  {name:<28} mean {mean:8.1f} us  p95 {p95:8.1f} us{speedup}")
+    return mean
+
+
+async def main_async(args) -> None:
+    async with httpx.AsyncClient() as upstream:
+        server = A2AServer(upstream)
+    etag = server.agent_card_etag
+
+    print(f"\n{'='*60}")
+    print(f"AGENT CARD ({len(server._agent_card_bytes)} bytes, {args.iterations} requests per mode)")
+    print(f"{'='*60}")
+    print("handler call:")
+    baseline = report("rebuild per request", time_calls(lambda: rebuild_response(server), args.iterations))
+    report("cached bytes (200)", time_calls(lambda: server.agent_card_response(make_request()), args.iterations),
+           baseline)
+    report("If-None-Match (304)",
+           time_calls(lambda: server.agent_card_response(make_request(etag)), args.iterations), baseline)
+
+    async def rebuild(request: Request) -> Response:
+        return rebuild_response(server)
+
+    async def cached(request: Request) -> Response:
+        return server.agent_card_response(request)
+
+    app = Starlette(routes=[Route("/rebuild", rebuild), Route("/cached", cached)])
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        print("over HTTP (ASGI transport):")
+        baseline = report("rebuild per request", await time_http(client, "/rebuild", {}, args.iterations))
+        report("cached bytes (200)", await time_http(client, "/cached", {}, args.iterations), baseline)
+        report("If-None-Match (304)",
+               await time_http(client, "/cached", {"If-None-Match": etag}, args.iterations), baseline)
+    print(f"{'='*60}\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Agent Card serving")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
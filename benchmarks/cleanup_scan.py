@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Sensitive Data Scan Benchmark
+Generates a synthetic tree of thousands of files, a few percent of them
+containing sensitive strings, and times a dry-run scan with the previous
+per-pattern algorithm, the single-pass engine, and the engine with a process
+pool.
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cleanup_sensitive_data import REPLACEMENTS, SensitiveDataCleaner  # noqa: E402
+
+FILLER = (
+    "The travel agent delegates currency questions to the exchange agent and "
+    "activity questions to the planner; responses are streamed to the client.\n"
+)
+
+
+def build_tree(root: Path, files: int, kb_per_file: int, dirty_ratio: float, seed: int = 7) -> int:
+    """Write a synthetic project tree; returns the number of files containing sensitive data"""
+    rng = random.Random(seed)
+    secrets = list(REPLACEMENTS)
+    extensions = [".py", ".md", ".yaml", ".json", ".txt"]
+    body = FILLER * max(1, kb_per_file * 1024 // len(FILLER))
+    dirty = 0
+    for i in range(files):
+        directory = root / f"pkg{i % 50}" / f"mod{i % 7}"
+        directory.mkdir(parents=True, exist_ok=True)
+        content = body
+        if rng.random() < dirty_ratio:
+            dirty += 1
+            lines = content.splitlines(keepends=True)
+            for _ in range(3):
+                lines.insert(rng.randrange(len(lines)), f"endpoint: {rng.choice(secrets)}\n")
+            content = "".join(lines)
+        (directory / f"file{i}{rng.choice(extensions)}").write_text(content, encoding="utf-8")
+    return dirty
+
+
+def legacy_scan(root: Path) -> int:
+    """The previous algorithm: one pass per pattern, then str.replace and count per match"""
+    cleaner = SensitiveDataCleaner(str(root))
+    changed = 0
+    for file_path in root.rglob("*"):
+        if not file_path.is_file() or not cleaner.should_process_file(file_path):
+            continue
+        content = file_path.read_text(encoding="utf-8", errors="ignore")
+        found = [(s, p) for s, p in REPLACEMENTS.items() if s in content]
+        if not found:
+            continue
+        modified = content
+        for sensitive, placeholder in found:
+            modified = modified.replace(sensitive, placeholder)
+            content.count(sensitive)
+        changed += 1
+    return changed
+
+
+def engine_scan(root: Path, workers: int) -> int:
+    cleaner = SensitiveDataCleaner(str(root), workers=workers)
+    cleaner.dry_run = True
+    with contextlib.redirect_stdout(io.StringIO()):
+        return cleaner.scan_directory()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the sensitive data scan")
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--kb-per-file", type=int, default=8)
+    parser.add_argument("--dirty-ratio", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="cleanup-bench-") as tmp:
+        root = Path(tmp)
+        dirty = build_tree(root, args.files, args.kb_per_file, args.dirty_ratio)
+        total_mb = sum(f.stat().st_size for f in root.rglob("*") if f.is_file()) / 1024 / 1024
+
+        runs = [
+            ("per-pattern (previous)", lambda: legacy_scan(root)),
+            ("single-pass, 1 process", lambda: engine_scan(root, 1)),
+            ("single-pass, pool", lambda: engine_scan(root, args.workers or 0)),
+        ]
+        print(f"\n{'='*60}")
+        print(f"SCAN ({args.files} files, {total_mb:.1f} MB, {dirty} with sensitive data)")
+        print(f"{'='*60}")
+        for name, run in runs:
+            start = time.perf_counter()
+            found = run()
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<24} {elapsed:7.2f} s  {args.files / elapsed:8.0f} files/s  "
+                  f"{total_mb / elapsed:7.1f} MB/s  found {found}")
+        print(f"{'='*60}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
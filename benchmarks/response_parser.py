@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Structured Response Parsing Benchmark
+Parses synthetic `ResponseFormat` answers of increasing size with the strict
+`model_validate_json`, with the tolerant character scanner alone, and with
+`parse_response_format` (strict first, tolerant on failure), for well-formed
+and truncated output, and measures streaming the message as text deltas from
+small chunks.
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import ValidationError  # noqa: E402
+
+from src.agent.response_parser import ResponseFormatParser, parse_response_format  # noqa: E402
+from src.agent.travel_agent import ResponseFormat  # noqa: E402
+
+SENTENCE = 'Day 2: take the 8:10 train to Kyoto (¥14,170), visit Fushimi Inari "early" and eat at Nishiki.\n'
+
+
+def make_response(size: int) -> str:
+    """A completed response whose message is roughly `size` characters"""
+    message = (SENTENCE * (size // len(SENTENCE) + 1))[:size]
+    return json.dumps({'status': 'completed', 'message': message}, ensure_ascii=False)
+
+
+def strict(text: str):
+    try:
+        return ResponseFormat.model_validate_json(text)
+    except ValidationError:
+        return None
+
+
+def scanner_only(text: str):
+    """The tolerant scanner without the strict fast path"""
+    parser = ResponseFormatParser(ResponseFormat)
+    parser.feed(text)
+    parser._scan()
+    data = {'message': parser.partial_message}
+    if parser.status:
+        data['status'] = parser.status
+    return ResponseFormat.model_validate(data)
+
+
+def stream_deltas(text: str, chunk_size: int) -> str:
+    """Feed the answer in chunks and collect the message deltas, as `stream` does"""
+    parser = ResponseFormatParser(ResponseFormat)
+    deltas = []
+    for start in range(0, len(text), chunk_size):
+        parser.feed(text[start:start + chunk_size])
+        deltas.append(parser.take_message_delta())
+    return "".join(deltas)
+
+
+def measure(fn, text: str, repeat: int) -> tuple[float, bool]:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(text)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result is not None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark structured response parsing")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 31000, 124000],
+                        help="Message sizes in characters")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=8, help="Characters per streamed chunk")
+    args = parser.parse_args()
+    # Truncated inputs log a recovery warning on every run
+    logging.getLogger("src.agent.response_parser").setLevel(logging.ERROR)
+
+    modes = [
+        ("strict model_validate_json", strict),
+        ("tolerant scanner only", scanner_only),
+        ("parse_response_format", lambda text: parse_response_format(ResponseFormat, text)),
+    ]
+
+    print(f"\n{'='*60}")
+    print(f"STRUCTURED RESPONSE PARSING (median of {args.repeat} runs)")
+    print(f"{'='*60}")
+    for size in args.sizes:
+        text = make_response(size)
+        for label, sample in (("well-formed", text), ("truncated", text[: len(text) * 2 // 3])):
+            print(f"{len(sample) / 1000:6.1f} KB {label}:")
+            for name, fn in modes:
+                ms, parsed = measure(fn, sample, args.repeat)
+                print(f"  {name:<28} {ms:9.3f} ms  {'parsed' if parsed else 'failed'}")
+        ms, _ = measure(lambda sample: stream_deltas(sample, args.chunk_size), text, args.repeat)
+        print(f"{len(text) / 1000:6.1f} KB streamed as deltas ({args.chunk_size}-char chunks):")
+        print(f"  {'take_message_delta':<28} {ms:9.3f} ms  "
+              f"{ms * 1000 / (len(text) / args.chunk_size):.2f} us/chunk")
+    print(f"{'='*60}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Guide Retrieval Benchmark
+Builds a synthetic corpus of passages, indexes it exactly and with an IVF
+coarse quantizer, and reports recall@k of IVF against exact search together
+with per-query latency for single and batched queries.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agent.embeddings import HashingEmbedder  # noqa: E402
+from src.agent.vector_index import DEFAULT_CORPUS, VectorIndex, build_index, chunk_guides  # noqa: E402
+
+
+def synthetic_passages(count: int, seed: int = 11) -> list[dict]:
+    """Passages made of shuffled sentences drawn from the bundled guides"""
+    rng = random.Random(seed)
+    sentences = [
+        sentence.strip() + "."
+        for passage in chunk_guides(DEFAULT_CORPUS)
+        for sentence in passage["text"].split(". ")
+        if len(sentence) > 20
+    ]
+    return [
+        {"title": f"doc{i}", "source": "synthetic", "text": " ".join(rng.sample(sentences, 4))}
+        for i in range(count)
+    ]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def time_queries(index: VectorIndex, queries, k: int, nprobe, batch: int) -> list[float]:
+    """Per-query latency in ms, measured per batch"""
+    latencies = []
+    for start in range(0, len(queries), batch):
+        chunk = queries[start:start + batch]
+        began = time.perf_counter()
+        index.search_vectors(chunk, k, nprobe)
+        latencies.extend([(time.perf_counter() - began) * 1000 / len(chunk)] * len(chunk))
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark guide retrieval")
+    parser.add_argument("--passages", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--nlist", type=int, default=256, help="IVF clusters")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 32])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=64, help="Queries per batched search")
+    args = parser.parse_args()
+
+    embedder = HashingEmbedder(args.dim)
+    passages = synthetic_passages(args.passages)
+    rng = random.Random(3)
+    query_texts = [" ".join(rng.choice(passages)["text"].split()[:8]) for _ in range(args.queries)]
+    queries = embedder.embed(query_texts)
+
+    with tempfile.TemporaryDirectory(prefix="retrieval-bench-") as tmp:
+        began = time.perf_counter()
+        build_index(passages, Path(tmp) / "index", embedder, nlist=args.nlist)
+        build_seconds = time.perf_counter() - began
+        index = VectorIndex(Path(tmp) / "index", embedder)
+
+        _, exact_rows = index.search_vectors(queries, args.k)
+        print(f"\n{'='*60}")
+        print(f"RETRIEVAL ({args.passages} passages, dim {args.dim}, k={args.k}, "
+              f"build {build_seconds:.1f} s)")
+        print(f"{'='*60}")
+        print(f"  {'mode':<18} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'batch p50':>10}")
+
+        modes = [("exact", None)] + [(f"ivf nprobe={n}", n) for n in args.nprobe]
+        for name, nprobe in modes:
+            _, rows = index.search_vectors(queries, args.k, nprobe)
+            recall = statistics.mean(
+                len(set(found.tolist()) & set(expected.tolist())) / args.k
+                for found, expected in zip(rows, exact_rows)
+            )
+            single = time_queries(index, queries, args.k, nprobe, 1)
+            batched = time_queries(index, queries, args.k, nprobe, args.batch)
+            print(f"  {name:<18} {recall:7.3f} {percentile(single, 50):8.3f} "
+                  f"{percentile(single, 95):8.3f} {percentile(batched, 50):10.3f}")
+        print(f"{'='*60}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Cold-Start Benchmark
+Measures import time, time to first /health 200 and time to first completed
+chat against a local chat-completions stub, and checks them against a budget.
+"""
+
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET = Path(__file__).resolve().parent / "startup_budget.json"
+
+
+class ChatCompletionsStub(BaseHTTPRequestHandler):
+    """Answers OpenAI chat completion calls with a fixed structured reply."""
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        content = json.dumps({"status": "completed", "message": "Stub answer"})
+        body = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "stub",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import() -> Dict:
+    """Import `main` in a fresh interpreter with -X importtime."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    top_level: List[tuple] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented by two spaces per level after the separator space
+        if not name[1:].startswith(" "):
+            top_level.append((name.strip(), int(cumulative_us) / 1000))
+    top_level.sort(key=lambda item: item[1], reverse=True)
+    return {"import_ms": wall_ms, "top_imports": top_level[:10]}
+
+
+def measure_server(stub_port: int) -> Dict:
+    """Start the app and time the first /health 200 and first completed chat."""
+    port = free_port()
+    # AzureChatCompletion only accepts https endpoints, so the stub is served
+    # through the OpenAI service, which takes any OpenAI-compatible base URL
+    env = {
+        **os.environ,
+        "CHAT_COMPLETION_SERVICE": "openai",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_MODEL_ID": "stub",
+        "PORT": str(port),
+    }
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        health_ms = None
+        deadline = start + 60
+        while time.perf_counter() < deadline:
+            try:
+                with urllib.request.urlopen(f"{base}/health", timeout=1) as response:
+                    if response.status == 200:
+                        health_ms = (time.perf_counter() - start) * 1000
+                        break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.02)
+        if health_ms is None:
+            raise RuntimeError("Server did not become healthy within 60s")
+
+        request = urllib.request.Request(
+            f"{base}/api/chat/message",
+            data=json.dumps({"message": "Hello", "session_id": "bench"}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=60) as response:
+            json.load(response)
+        first_chat_ms = (time.perf_counter() - start) * 1000
+        return {"health_ms": health_ms, "first_chat_ms": first_chat_ms}
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure cold-start time and check it against a budget")
+    parser.add_argument("--runs", type=int, default=3, help="Number of cold starts to measure (default: 3)")
+    parser.add_argument("--budget", default=str(DEFAULT_BUDGET), help="Budget JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed overshoot of the budget (default: 0.1)")
+    parser.add_argument("--output", help="Write the measured medians to this JSON file")
+    args = parser.parse_args()
+
+    stub = ThreadingHTTPServer(("127.0.0.1", free_port()), ChatCompletionsStub)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    samples: Dict[str, List[float]] = {"import_ms": [], "health_ms": [], "first_chat_ms": []}
+    top_imports = []
+    try:
+        for run in range(args.runs):
+            imports = measure_import()
+            top_imports = imports["top_imports"]
+            samples["import_ms"].append(imports["import_ms"])
+            for key, value in measure_server(stub.server_address[1]).items():
+                samples[key].append(value)
+            print(f"Run {run + 1}/{args.runs}: " + ", ".join(f"{k}={v[-1]:.0f}" for k, v in samples.items()))
+    finally:
+        stub.shutdown()
+
+    results = {key: statistics.median(values) for key, values in samples.items()}
+
+    print(f"\n{'='*60}")
+    print("SLOWEST TOP-LEVEL IMPORTS (cumulative ms)")
+    print(f"{'='*60}")
+    for name, ms in top_imports:
+        print(f"  {name:<40} {ms:8.1f}")
+
+    budget = json.loads(Path(args.budget).read_text())
+    print(f"\n{'='*60}")
+    print("RESULTS (median ms)")
+    print(f"{'='*60}")
+    failed = False
+    for key, value in results.items():
+        limit = budget.get(key)
+        status = "n/a"
+        if limit is not None:
+            ok = value <= limit * (1 + args.tolerance)
+            failed |= not ok
+            status = f"budget {limit} {'OK' if ok else 'EXCEEDED'}"
+        print(f"  {key:<16} {value:8.0f}   {status}")
+    print(f"{'='*60}\n")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
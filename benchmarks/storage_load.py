@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Conversation Storage Load Harness
+Replays chat turns (read history, save the user message, save the answer)
+from concurrent sessions against CosmosConversationStorage and reports
+latency and throughput. With --report ru it also reports the request charge
+(RU) per chat turn, per operation and for the most expensive sessions.
+
+By default it runs against an in-process fake container that charges RUs
+roughly like Cosmos DB does; --live uses the account configured by the
+AZURE_COSMOS_* environment variables.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from azure.cosmos.exceptions import CosmosResourceNotFoundError  # noqa: E402
+
+from src.storage.conversation_cache import ConversationCache  # noqa: E402
+from src.storage.cosmos_storage import CosmosConversationStorage  # noqa: E402
+from src.storage.request_charge import REQUEST_CHARGE_HEADER, RequestChargeTracker  # noqa: E402
+
+
+class FakeContainer:
+    """In-memory container returning Cosmos-like request charges and ETags."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.items: Dict[str, Dict] = {}
+
+    @staticmethod
+    def _kb(document: Dict) -> float:
+        return len(json.dumps(document)) / 1024
+
+    def read_item(self, item: str, partition_key: str, response_hook=None, initial_headers=None) -> Dict:
+        time.sleep(self.latency)
+        document = self.items.get(item)
+        if document is None:
+            response_hook and response_hook({REQUEST_CHARGE_HEADER: "1.0"}, None)
+            raise CosmosResourceNotFoundError(message=f"{item} not found")
+        if initial_headers and initial_headers.get("If-None-Match") == document["_etag"]:
+            response_hook and response_hook({REQUEST_CHARGE_HEADER: "1.0"}, None)
+            return {}
+        response_hook and response_hook({REQUEST_CHARGE_HEADER: f"{1 + self._kb(document):.2f}"}, document)
+        return dict(document)
+
+    def upsert_item(self, body: Dict, response_hook=None) -> Dict:
+        time.sleep(self.latency)
+        document = dict(body, _etag=uuid.uuid4().hex)
+        self.items[document["id"]] = document
+        response_hook and response_hook({REQUEST_CHARGE_HEADER: f"{5.7 + 5 * self._kb(document):.2f}"}, document)
+        return dict(document)
+
+
+def make_storage(args) -> CosmosConversationStorage:
+    if args.live:
+        return CosmosConversationStorage()
+    storage = CosmosConversationStorage.__new__(CosmosConversationStorage)
+    storage.container = FakeContainer(args.latency_ms / 1000)
+    storage.ttl_seconds = None
+    storage.cache = ConversationCache()
+    storage.cache_fresh_seconds = 0
+    storage.charges = RequestChargeTracker(budget_per_second=args.ru_budget)
+    return storage
+
+
+async def run_session(storage: CosmosConversationStorage, turns: int, latencies: List[float]) -> None:
+    session_id = f"load-{uuid.uuid4().hex[:12]}"
+    for turn in range(turns):
+        start = time.perf_counter()
+        await storage.get_conversation(session_id)
+        await storage.save_message(session_id, "user", f"Plan day {turn} of my trip to Seoul on a budget")
+        await storage.save_message(session_id, "assistant", "Here is an itinerary for the day. " * 20)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run(args) -> int:
+    storage = make_storage(args)
+    if args.ru_budget:
+        storage.charges.budget_per_second = args.ru_budget
+
+    latencies: List[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(storage, args.turns, latencies) for _ in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+
+    turns = len(latencies)
+    print(f"\n{'='*60}")
+    print(f"CHAT TURNS ({args.sessions} sessions x {args.turns} turns)")
+    print(f"{'='*60}")
+    print(f"  turns/s            {turns / elapsed:10.1f}")
+    print(f"  latency p50        {statistics.median(latencies):10.1f} ms")
+    print(f"  latency p95        {sorted(latencies)[int(turns * 0.95) - 1]:10.1f} ms")
+
+    if args.report == "ru":
+        report = storage.charges.report(top_sessions=5)
+        total = report["total"]["request_charge"]
+        print(f"\n{'='*60}")
+        print("REQUEST CHARGE (RU)")
+        print(f"{'='*60}")
+        print(f"  total              {total:10.1f}")
+        print(f"  per chat turn      {total / turns:10.2f}")
+        print(f"  throttled          {report['throttled']:10d} ({report['throttled_seconds']:.2f} s waited)")
+        print("  per operation:")
+        for name, totals in report["operations"].items():
+            print(f"    {name:<22} {totals['count']:6d} ops  {totals['average']:7.2f} avg  {totals['request_charge']:10.1f} total")
+        print("  top sessions:")
+        for name, totals in report["top_sessions"].items():
+            print(f"    {name:<22} {totals['request_charge']:10.1f}")
+        cache = storage.cache.stats()
+        print(f"  cache hit rate     {cache['hit_rate']}  ({cache['request_charge_saved']} RU saved)")
+    print(f"{'='*60}\n")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load harness for conversation storage")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated latency per request (fake container)")
+    parser.add_argument("--ru-budget", type=float, help="RU/s budget enforced client-side")
+    parser.add_argument("--report", choices=["latency", "ru"], default="latency")
+    parser.add_argument("--live", action="store_true", help="Use the Cosmos DB account from the environment")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
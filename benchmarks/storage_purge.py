@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Conversation Purge Benchmark
+Measures bulk purge throughput of CosmosConversationStorage against an
+in-process fake container that simulates per-request latency, and compares it
+with deleting the same sessions one by one.
+"""
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from azure.cosmos.exceptions import CosmosResourceNotFoundError  # noqa: E402
+
+from src.storage.conversation_cache import ConversationCache  # noqa: E402
+from src.storage.cosmos_storage import CosmosConversationStorage  # noqa: E402
+from src.storage.request_charge import RequestChargeTracker  # noqa: E402
+
+
+class FakeContainer:
+    """Thread-safe in-memory container with a fixed latency per request."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.partitions: Dict[str, Dict[str, Dict]] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _request(self):
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+
+    def upsert_item(self, body: Dict) -> Dict:
+        with self._lock:
+            self.partitions.setdefault(body["sessionId"], {})[body["id"]] = body
+        return body
+
+    def read_item(self, item: str, partition_key: str) -> Dict:
+        self._request()
+        try:
+            return self.partitions[partition_key][item]
+        except KeyError:
+            raise CosmosResourceNotFoundError(message=f"{item} not found")
+
+    def delete_item(self, item: str, partition_key: str) -> None:
+        self._request()
+        with self._lock:
+            if self.partitions.get(partition_key, {}).pop(item, None) is None:
+                raise CosmosResourceNotFoundError(message=f"{item} not found")
+
+    def query_items(self, query: str, parameters: List[Dict] = None, partition_key: str = None,
+                    enable_cross_partition_query: bool = False, response_hook=None):
+        self._request()
+        with self._lock:
+            if partition_key is not None:
+                return [{"id": item_id} for item_id in self.partitions.get(partition_key, {})]
+            cutoff = parameters[0]["value"]
+            return [
+                session_id for session_id, items in self.partitions.items()
+                if any(item["lastModified"] < cutoff for item in items.values())
+            ]
+
+    def execute_item_batch(self, batch_operations: List, partition_key: str, response_hook=None) -> List:
+        self._request()
+        with self._lock:
+            items = self.partitions.get(partition_key, {})
+            for _, (item_id,) in batch_operations:
+                items.pop(item_id, None)
+            if not items:
+                self.partitions.pop(partition_key, None)
+        return []
+
+
+def make_storage(container: FakeContainer, concurrency: int) -> CosmosConversationStorage:
+    storage = CosmosConversationStorage.__new__(CosmosConversationStorage)
+    storage.container = container
+    storage.ttl_seconds = None
+    storage.purge_concurrency = concurrency
+    storage.cache = ConversationCache()
+    storage.charges = RequestChargeTracker()
+    return storage
+
+
+def populate(container: FakeContainer, sessions: int, items_per_session: int) -> None:
+    stale = (datetime.utcnow() - timedelta(days=60)).isoformat()
+    for s in range(sessions):
+        session_id = f"session-{s}"
+        for i in range(items_per_session):
+            item_id = session_id if i == 0 else f"{session_id}-{i}"
+            container.upsert_item({"id": item_id, "sessionId": session_id, "lastModified": stale})
+
+
+async def run_purge(args) -> Dict:
+    container = FakeContainer(args.latency_ms / 1000)
+    populate(container, args.sessions, args.items_per_session)
+    storage = make_storage(container, args.concurrency)
+
+    start = time.perf_counter()
+    result = await storage.purge_conversations(older_than=timedelta(days=30))
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "items": result["items"], "requests": container.requests}
+
+
+def run_sequential(args) -> Dict:
+    """Baseline: one delete_item per item, one at a time"""
+    container = FakeContainer(args.latency_ms / 1000)
+    populate(container, args.sessions, args.items_per_session)
+
+    start = time.perf_counter()
+    items = 0
+    for session_id, partition in list(container.partitions.items()):
+        for item_id in list(partition):
+            container.delete_item(item=item_id, partition_key=session_id)
+            items += 1
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "items": items, "requests": container.requests}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark bulk purge of conversations")
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--items-per-session", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Simulated latency per request")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    baseline = run_sequential(args)
+    purge = asyncio.run(run_purge(args))
+
+    print(f"\n{'='*60}")
+    print(f"PURGE THROUGHPUT ({args.sessions} sessions x {args.items_per_session} items, "
+          f"{args.latency_ms} ms/request)")
+    print(f"{'='*60}")
+    for name, result in (("sequential delete", baseline), ("bulk purge", purge)):
+        rate = result["items"] / result["elapsed"] if result["elapsed"] else 0
+        print(f"  {name:<20} {result['elapsed']:8.2f} s  {rate:10.0f} items/s  {result['requests']:6d} requests")
+    print(f"  speedup              {baseline['elapsed'] / purge['elapsed']:8.1f}x")
+    print(f"{'='*60}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,11 +4,18 @@ Security Cleanup Script
 Replaces all sensitive Azure information with placeholders
 """
 
+import hashlib
+import json
+import mmap
 import os
 import re
+import subprocess
 import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 # =====================================
 # SENSITIVE DATA TO REPLACE
@@ -41,6 +48,7 @@ EXCLUDE_FILES = {
     ".gitignore",
     "__pycache__",
     "SECURITY_CLEANUP_CHECKLIST.md",
+    ".cleanup_scan_cache.json",
 }
 
 # File extensions to process
@@ -55,19 +63,267 @@ INCLUDE_EXTENSIONS = {
 }
 
 
+# Files larger than this are memory-mapped and rewritten in a streaming pass
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# Below this many files a process pool costs more than it saves
+PARALLEL_MIN_FILES = 64
+
+# Up to this many screening literals, per-literal bytes.find (memchr-accelerated)
+# rejects clean files faster than one regex pass; above it the regex screens
+SCREEN_MAX_LITERALS = 16
+
+
+# =====================================
+# MULTI-PATTERN ENGINE
+# =====================================
+
+class MultiPatternReplacer:
+    """Finds and replaces all sensitive strings in a single scan.
+    
+    All keys are compiled into one alternation regex, longest first, so at
+    any position the longest sensitive string wins (e.g. the full ACR login
+    server before the bare registry name). Matching works on bytes, which
+    leaves non-UTF-8 content untouched.
+    
+    Most files contain nothing sensitive, so they are screened first. A key
+    that contains another key can only match where the shorter one does, so
+    only the remaining keys are screened for; with few of them, C-level
+    substring search beats a regex scan of the same data.
+    """
+    
+    def __init__(self, replacements: Dict[str, str]):
+        self.replacements = replacements
+        keys = sorted(replacements, key=len, reverse=True)
+        self.pattern = re.compile("|".join(re.escape(k) for k in keys))
+        self.pattern_bytes = re.compile(b"|".join(re.escape(k.encode("utf-8")) for k in keys))
+        self.lookup_bytes = {k.encode("utf-8"): v.encode("utf-8") for k, v in replacements.items()}
+        literals = [k for k in keys if not any(other != k and other in k for other in keys)]
+        self.screen = [k.encode("utf-8") for k in literals] if len(literals) <= SCREEN_MAX_LITERALS else None
+    
+    def might_match(self, data) -> bool:
+        """Cheap check whether bytes (or an mmap) can contain a sensitive string"""
+        if self.screen is None:
+            return self.pattern_bytes.search(data) is not None
+        return any(data.find(literal) != -1 for literal in self.screen)
+    
+    def find(self, content: str) -> Counter:
+        """Count occurrences of each sensitive string in text"""
+        return Counter(m.group(0) for m in self.pattern.finditer(content))
+    
+    def replace_bytes(self, data: bytes) -> Tuple[bytes, Counter]:
+        """Replace all sensitive strings, returning the new data and occurrence counts"""
+        counts: Counter = Counter()
+        
+        def substitute(match: "re.Match[bytes]") -> bytes:
+            key = match.group(0)
+            counts[key.decode("utf-8")] += 1
+            return self.lookup_bytes[key]
+        
+        return self.pattern_bytes.sub(substitute, data), counts
+    
+    def process_file(self, file_path: Path, dry_run: bool = False) -> Counter:
+        """Scan (and unless dry_run, rewrite) one file.
+        
+        Small files are read whole; large files are memory-mapped and
+        rewritten by streaming the unchanged slices between matches to a
+        temporary file that replaces the original.
+        """
+        size = file_path.stat().st_size
+        if size == 0:
+            return Counter()
+        if size < MMAP_THRESHOLD:
+            data = file_path.read_bytes()
+            if not self.might_match(data):
+                return Counter()
+            if dry_run:
+                return Counter(m.group(0).decode("utf-8") for m in self.pattern_bytes.finditer(data))
+            new_data, counts = self.replace_bytes(data)
+            if counts:
+                file_path.write_bytes(new_data)
+            return counts
+        
+        counts: Counter = Counter()
+        tmp_path = file_path.with_name(file_path.name + ".cleanup.tmp")
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if not self.might_match(mm):
+                return counts
+            out = None
+            position = 0
+            try:
+                for match in self.pattern_bytes.finditer(mm):
+                    key = match.group(0)
+                    counts[key.decode("utf-8")] += 1
+                    if dry_run:
+                        continue
+                    if out is None:
+                        out = open(tmp_path, "wb")
+                    out.write(mm[position:match.start()])
+                    out.write(self.lookup_bytes[key])
+                    position = match.end()
+                if out is not None:
+                    out.write(mm[position:])
+                    out.close()
+                    out = None
+                    os.replace(tmp_path, file_path)
+            finally:
+                if out is not None:
+                    out.close()
+                    tmp_path.unlink(missing_ok=True)
+        return counts
+
+
+# =====================================
+# INCREMENTAL SCAN CACHE
+# =====================================
+
+DEFAULT_CACHE_FILE = ".cleanup_scan_cache.json"
+
+
+def file_digest(file_path: Path) -> str:
+    """Content hash of a file"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ScanCache:
+    """Remembers files already verified clean, keyed by path.
+    
+    Each entry holds the file's size, mtime and content hash. An unchanged
+    size and mtime skips the file without reading it; otherwise a matching
+    content hash still skips the scan. The cache is discarded when the
+    patterns or included extensions change.
+    """
+    
+    def __init__(self, path: Path, replacements: Dict[str, str]):
+        self.path = path
+        self.fingerprint = hashlib.sha256(
+            json.dumps([replacements, sorted(INCLUDE_EXTENSIONS)], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        self.entries: Dict[str, List] = {}
+        self.hits = 0
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("fingerprint") == self.fingerprint:
+                self.entries = data.get("files", {})
+        except (FileNotFoundError, ValueError):
+            pass
+    
+    def is_clean(self, key: str, file_path: Path) -> bool:
+        """Whether the file is unchanged since it was verified clean"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        stat = file_path.stat()
+        size, mtime_ns, digest = entry
+        if stat.st_size == size and stat.st_mtime_ns == mtime_ns:
+            self.hits += 1
+            return True
+        if stat.st_size == size and file_digest(file_path) == digest:
+            entry[1] = stat.st_mtime_ns
+            self.hits += 1
+            return True
+        del self.entries[key]
+        return False
+    
+    def mark_clean(self, key: str, file_path: Path) -> None:
+        stat = file_path.stat()
+        self.entries[key] = [stat.st_size, stat.st_mtime_ns, file_digest(file_path)]
+    
+    def save(self) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(
+            json.dumps({"fingerprint": self.fingerprint, "files": self.entries}),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.path)
+
+
+def git(cwd: Path, *args: str, input: Optional[bytes] = None) -> bytes:
+    """Run a git command and return its raw output"""
+    return subprocess.run(
+        ["git", *args], cwd=cwd, input=input, capture_output=True, check=True
+    ).stdout
+
+
+def git_toplevel(path: Path) -> Path:
+    return Path(git(path, "rev-parse", "--show-toplevel").decode().strip())
+
+
+def git_changed_files(root_dir: Path, since: Optional[str] = None) -> List[Path]:
+    """Files changed since a git ref, plus untracked files"""
+    top = git_toplevel(root_dir)
+    # Both commands run from the top level, so every name is relative to it
+    names = git(top, "diff", "--name-only", "-z", "--diff-filter=ACMR", since or "HEAD").decode().split("\0")
+    names += git(top, "ls-files", "--others", "--exclude-standard", "-z").decode().split("\0")
+    return [top / name for name in dict.fromkeys(names) if name]
+
+
+def git_staged_files(top: Path) -> List[Tuple[str, str]]:
+    """(mode, path) of the files staged for commit, paths relative to the top level"""
+    # --raw -z: ":<old mode> <new mode> <old sha> <new sha> <status>\0<path>\0", where
+    # renames and copies (status R<score> or C<score>) carry "<old path>\0<new path>\0"
+    fields = git(top, "diff", "--cached", "--raw", "-z", "--diff-filter=ACMR").decode().split("\0")
+    staged = []
+    i = 0
+    while i < len(fields) - 1:
+        _, mode, _, _, status = fields[i].split()
+        i += 3 if status[0] in "RC" else 2
+        staged.append((mode, fields[i - 1]))
+    return staged
+
+
+def git_staged_blob(top: Path, name: str) -> bytes:
+    """Content of a file as staged in the index, which may differ from the worktree"""
+    return git(top, "show", f":{name}")
+
+
+def git_stage_blob(top: Path, name: str, mode: str, data: bytes) -> None:
+    """Replace the staged content of a file without touching the worktree"""
+    sha = git(top, "hash-object", "-w", "--stdin", input=data).decode().strip()
+    git(top, "update-index", "--cacheinfo", f"{mode},{sha},{name}")
+
+
+_worker_engine: Optional[MultiPatternReplacer] = None
+
+
+def _init_worker(replacements: Dict[str, str]) -> None:
+    global _worker_engine
+    _worker_engine = MultiPatternReplacer(replacements)
+
+
+def _process_in_worker(file_path: Path, dry_run: bool) -> Tuple[Path, Dict[str, int], Optional[str]]:
+    try:
+        return file_path, dict(_worker_engine.process_file(file_path, dry_run)), None
+    except Exception as e:
+        return file_path, {}, str(e)
+
+
 class SensitiveDataCleaner:
-    def __init__(self, root_dir: str = "."):
+    def __init__(self, root_dir: str = ".", workers: Optional[int] = None):
         self.root_dir = Path(root_dir).resolve()
         self.replacements = REPLACEMENTS
+        self.engine = MultiPatternReplacer(self.replacements)
         self.files_modified: List[str] = []
         self.dry_run = False
+        self.workers = workers or os.cpu_count() or 1
+        # Incremental mode: limit the scan to git changes and/or skip files verified clean
+        self.since: Optional[str] = None
+        self.staged = False
+        self.cache: Optional[ScanCache] = None
         
     def should_process_file(self, file_path: Path) -> bool:
         """Check if file should be processed"""
         # Skip excluded files/directories
-        for exclude in EXCLUDE_FILES:
-            if exclude in str(file_path):
-                return False
+        try:
+            parts = file_path.relative_to(self.root_dir).parts
+        except ValueError:
+            return False
+        if any(part in EXCLUDE_FILES for part in parts):
+            return False
         
         # Only process specific extensions
         if file_path.suffix not in INCLUDE_EXTENSIONS:
@@ -81,76 +337,141 @@ class SensitiveDataCleaner:
     
     def find_sensitive_data(self, content: str) -> List[Tuple[str, str]]:
         """Find all sensitive data in content"""
-        found = []
-        for sensitive, placeholder in self.replacements.items():
-            if sensitive in content:
-                found.append((sensitive, placeholder))
-        return found
+        return [(sensitive, self.replacements[sensitive]) for sensitive in self.engine.find(content)]
+    
+    def report_file(self, file_path: Path, counts: Dict[str, int]) -> bool:
+        """Record and print the replacements made in a file"""
+        if not counts:
+            return False
+        self.files_modified.append(str(file_path.relative_to(self.root_dir)))
+        print(f"{'[DRY RUN] ' if self.dry_run else ''}✓ {file_path.relative_to(self.root_dir)}")
+        for sensitive, count in counts.items():
+            print(f"  • {sensitive} → {self.replacements[sensitive]} ({count} occurrences)")
+        return True
     
     def clean_file(self, file_path: Path) -> bool:
         """Clean sensitive data from a single file"""
         try:
-            # Read file content
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # Find sensitive data
-            found = self.find_sensitive_data(content)
-            if not found:
-                return False
-            
-            # Replace sensitive data
-            modified_content = content
-            for sensitive, placeholder in found:
-                modified_content = modified_content.replace(sensitive, placeholder)
-            
-            # Write back if not dry run
-            if not self.dry_run:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(modified_content)
-            
-            # Record modification
-            self.files_modified.append(str(file_path.relative_to(self.root_dir)))
-            
-            # Print changes
-            print(f"{'[DRY RUN] ' if self.dry_run else ''}✓ {file_path.relative_to(self.root_dir)}")
-            for sensitive, placeholder in found:
-                count = content.count(sensitive)
-                print(f"  • {sensitive} → {placeholder} ({count} occurrences)")
-            
-            return True
-            
+            counts = self.engine.process_file(file_path, self.dry_run)
         except Exception as e:
             print(f"✗ Error processing {file_path}: {e}", file=sys.stderr)
             return False
+        if not counts:
+            self.mark_clean(file_path)
+        return self.report_file(file_path, counts)
+    
+    def mark_clean(self, file_path: Path) -> None:
+        """Record a clean file in the incremental cache"""
+        if self.cache is not None:
+            self.cache.mark_clean(str(file_path.relative_to(self.root_dir)), file_path)
+    
+    def clean_files(self, files: List[Path]) -> int:
+        """Clean files, in parallel with a process pool for larger sets"""
+        if self.workers <= 1 or len(files) < PARALLEL_MIN_FILES:
+            return sum(self.clean_file(file_path) for file_path in files)
+        
+        changed = 0
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.replacements,),
+        ) as pool:
+            chunksize = max(1, len(files) // (self.workers * 8))
+            results = pool.map(_process_in_worker, files, [self.dry_run] * len(files), chunksize=chunksize)
+            for file_path, counts, error in results:
+                if error:
+                    print(f"✗ Error processing {file_path}: {error}", file=sys.stderr)
+                elif self.report_file(file_path, counts):
+                    changed += 1
+                else:
+                    self.mark_clean(file_path)
+        return changed
+    
+    def iter_files(self) -> Iterator[Path]:
+        """Walk the tree, pruning excluded directories instead of descending into them"""
+        for dirpath, dirnames, filenames in os.walk(self.root_dir):
+            dirnames[:] = [d for d in dirnames if d not in EXCLUDE_FILES]
+            for name in filenames:
+                if name not in EXCLUDE_FILES and os.path.splitext(name)[1] in INCLUDE_EXTENSIONS:
+                    yield Path(dirpath, name)
+    
+    def clean_staged(self) -> int:
+        """Check (and unless dry_run, clean) the staged content of each staged file.
+        
+        The blob in the index is what will be committed, so it is scanned
+        instead of the worktree copy. Cleaning writes a new blob to the index
+        and leaves the worktree file as it is.
+        """
+        top = git_toplevel(self.root_dir)
+        changed = 0
+        for mode, name in git_staged_files(top):
+            if mode == "160000" or not self.should_process_file(top / name):
+                continue  # submodule or excluded
+            try:
+                data = git_staged_blob(top, name)
+                if not self.engine.might_match(data):
+                    continue
+                new_data, counts = self.engine.replace_bytes(data)
+                if not self.dry_run:
+                    git_stage_blob(top, name, mode, new_data)
+            except subprocess.CalledProcessError as e:
+                print(f"✗ Error processing staged {name}: {e.stderr.decode().strip()}", file=sys.stderr)
+                continue
+            if self.report_file(top / name, counts):
+                changed += 1
+        if changed and not self.dry_run:
+            print("\nOnly the staged content was cleaned; the working tree still has the original text.")
+        return changed
+    
+    def collect_files(self) -> List[Path]:
+        """Files to scan: git changes since a ref, else the whole tree"""
+        if self.since:
+            files = [
+                file_path for file_path in git_changed_files(self.root_dir, self.since)
+                if file_path.is_file() and self.should_process_file(file_path)
+            ]
+        else:
+            files = list(self.iter_files())
+        if self.cache is not None:
+            files = [
+                file_path for file_path in files
+                if not self.cache.is_clean(str(file_path.relative_to(self.root_dir)), file_path)
+            ]
+        return files
     
     def scan_directory(self):
         """Scan directory for files with sensitive data"""
         print(f"\n{'='*60}")
         print(f"Scanning: {self.root_dir}")
         print(f"Mode: {'DRY RUN (no changes)' if self.dry_run else 'LIVE (will modify files)'}")
+        if self.staged:
+            print("Files: staged for commit")
+        elif self.since:
+            print(f"Files: changed since {self.since}")
         print(f"{'='*60}\n")
         
-        files_processed = 0
-        files_with_changes = 0
-        
-        for file_path in self.root_dir.rglob("*"):
-            if not file_path.is_file():
-                continue
-                
-            if not self.should_process_file(file_path):
-                continue
-            
-            files_processed += 1
-            if self.clean_file(file_path):
-                files_with_changes += 1
+        started = time.perf_counter()
+        if self.staged:
+            files_processed = None
+            files_with_changes = self.clean_staged()
+        else:
+            files = self.collect_files()
+            files_processed = len(files)
+            files_with_changes = self.clean_files(files)
+            if self.cache is not None:
+                self.cache.save()
+        elapsed = time.perf_counter() - started
         
         # Summary
         print(f"\n{'='*60}")
         print(f"SUMMARY")
         print(f"{'='*60}")
-        print(f"Files scanned: {files_processed}")
+        if files_processed is not None:
+            print(f"Files scanned: {files_processed}")
+        if self.cache is not None and not self.staged:
+            print(f"Files skipped (unchanged since verified clean): {self.cache.hits}")
         print(f"Files {'that would be ' if self.dry_run else ''}modified: {files_with_changes}")
+        print(f"Elapsed: {elapsed:.2f}s")
         
         if self.files_modified:
             print(f"\n{'Files that would be modified:' if self.dry_run else 'Modified files:'}")
@@ -179,6 +500,15 @@ Examples:
   
   # Clean specific directory
   python cleanup_sensitive_data.py --dir ./docs
+  
+  # Pre-commit hook: check staged files, fail if sensitive data is found
+  python cleanup_sensitive_data.py --check --staged
+  
+  # Fast rescan of a large tree, skipping files verified clean before
+  python cleanup_sensitive_data.py --dry-run --incremental
+  
+  # Only files changed since a branch point
+  python cleanup_sensitive_data.py --dry-run --since origin/main
         """
     )
     
@@ -194,7 +524,46 @@ Examples:
         help='Directory to scan (default: current directory)'
     )
     
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Worker processes (default: CPU count; 1 disables parallelism)'
+    )
+    
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Skip files unchanged since they were verified clean (content-hash cache)'
+    )
+    
+    parser.add_argument(
+        '--cache-file',
+        default=None,
+        help=f'Incremental cache location (default: <dir>/{DEFAULT_CACHE_FILE})'
+    )
+    
+    parser.add_argument(
+        '--since',
+        metavar='REF',
+        help='Only scan files changed since this git ref, plus untracked files'
+    )
+    
+    parser.add_argument(
+        '--staged',
+        action='store_true',
+        help='Only scan the staged content of files staged for commit; cleaning updates the index, not the working tree'
+    )
+    
+    parser.add_argument(
+        '--check',
+        action='store_true',
+        help='Dry run that exits with status 1 if sensitive data is found (for pre-commit hooks)'
+    )
+    
     args = parser.parse_args()
+    if args.check:
+        args.dry_run = True
     
     # Confirm if not dry run
     if not args.dry_run:
@@ -206,12 +575,26 @@ Examples:
             return 1
     
     # Run cleaner
-    cleaner = SensitiveDataCleaner(args.dir)
+    cleaner = SensitiveDataCleaner(args.dir, workers=args.workers)
     cleaner.dry_run = args.dry_run
+    cleaner.since = args.since
+    cleaner.staged = args.staged
+    if args.incremental:
+        cache_file = Path(args.cache_file) if args.cache_file else cleaner.root_dir / DEFAULT_CACHE_FILE
+        cleaner.cache = ScanCache(cache_file, cleaner.replacements)
     files_changed = cleaner.scan_directory()
     
+    if args.check:
+        return 1 if files_changed > 0 else 0
+    
     if args.dry_run and files_changed > 0:
         print("Run without --dry-run to apply these changes.\n")
+    elif files_changed > 0 and args.staged:
+        print("✓ Staged content cleaned!\n")
+        print("Next steps:")
+        print("  1. Review the staged changes: git diff --cached")
+        print("  2. Clean the working tree too, or do not stage those files again as they are")
+        print()
     elif files_changed > 0:
         print("✓ Cleanup complete!\n")
         print("Next steps:")
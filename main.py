@@ -1,17 +1,27 @@
 import os
+import asyncio
+import hashlib
 import logging
+import threading
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import httpx
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from dotenv import load_dotenv
 
-from src.api.chat import router as chat_router
-from src.agent.a2a_server import A2AServer
+from src.api.admin import router as admin_router
+from src.api.chat import get_travel_agent, load_travel_agent, router as chat_router
+from src.api.readiness import ReadinessState
+from src.api.request_context import EndpointContextMiddleware
+from src.auth import get_token_manager
+from src.web import AssetManifest, PrecompressedStaticFiles
+
+if TYPE_CHECKING:
+    from src.agent.a2a_server import A2AServer
 
 # Load environment variables
 load_dotenv()
@@ -22,35 +32,214 @@ logger = logging.getLogger(__name__)
 
 # Global variables for cleanup
 httpx_client: httpx.AsyncClient = None
-a2a_server: A2AServer = None
+a2a_server: "A2AServer" = None
+_a2a_app = None
+# Held while the A2A server or app is built, so warm-up and requests build it once
+_a2a_server_lock = threading.Lock()
+_a2a_app_lock = threading.Lock()
+readiness = ReadinessState()
+_warm_agents_done = asyncio.Event()
+fx_refresher = None
+
+
+def get_a2a_server() -> "A2AServer":
+    """Create the A2A server on first use.
+
+    Importing it pulls in the A2A SDK and Semantic Kernel and builds the
+    agents, so it is kept out of the startup path. Blocks while the server is
+    built; on the event loop use `load_a2a_server`.
+    """
+    global a2a_server
+    if a2a_server is None:
+        with _a2a_server_lock:
+            if a2a_server is None:
+                from src.agent.a2a_server import A2AServer
+
+                host = os.getenv("HOST", "0.0.0.0")
+                port = int(os.getenv("PORT", 8000))
+                a2a_server = A2AServer(httpx_client, host=host, port=port)
+    return a2a_server
+
+
+def get_a2a_app():
+    """Build the mounted A2A application on first use"""
+    global _a2a_app
+    if _a2a_app is None:
+        with _a2a_app_lock:
+            if _a2a_app is None:
+                _a2a_app = get_a2a_server().get_starlette_app()
+    return _a2a_app
+
+
+async def load_a2a_server() -> "A2AServer":
+    """Return the A2A server, building it (or waiting for the warm-up) off the event loop"""
+    if a2a_server is not None:
+        return a2a_server
+    return await asyncio.to_thread(get_a2a_server)
+
+
+async def a2a_app(scope, receive, send):
+    """A2A application mounted at /a2a, built on the first request"""
+    asgi_app = _a2a_app or await asyncio.to_thread(get_a2a_app)
+    await asgi_app(scope, receive, send)
+
+
+# region Warm-up
+
+
+async def _warm_agents():
+    """Import the SDKs and build the chat and A2A agents off the event loop"""
+    try:
+        await asyncio.to_thread(get_travel_agent)
+        server = await asyncio.to_thread(get_a2a_server)
+        await asyncio.to_thread(lambda: server.agent_executor.agent)
+        await asyncio.to_thread(get_a2a_app)
+    finally:
+        # Steps that need the agents wait for this, whether or not it succeeded
+        _warm_agents_done.set()
+
+
+async def _warm_agent_card():
+    """Make sure the Agent Card is built and serialized"""
+    await _warm_agents_done.wait()
+    return {"etag": (await load_a2a_server()).agent_card_etag}
+
+
+async def _warm_azure_ad_tokens():
+    """Fetch Azure AD tokens for every dependency using managed identity"""
+    scopes = []
+    azure_openai = os.getenv("CHAT_COMPLETION_SERVICE", "azure_openai") == "azure_openai"
+    if azure_openai and not os.getenv("AZURE_OPENAI_API_KEY"):
+        scopes.append("https://cognitiveservices.azure.com/.default")
+    if os.getenv("AZURE_COSMOS_ENDPOINT") and not os.getenv("AZURE_COSMOS_KEY"):
+        scopes.append("https://cosmos.azure.com/.default")
+    if not scopes:
+        return "api keys configured"
+
+    manager = get_token_manager()
+    for scope in scopes:
+        await asyncio.to_thread(manager.get_token, scope)
+    manager.start_background_refresh()
+    return manager.metrics()
+
+
+async def _warm_azure_openai():
+    """Open the pooled TLS connection to the chat completion endpoint"""
+    import openai
+
+    await _warm_agents_done.wait()
+    client = (await load_travel_agent()).agent.service.client
+    try:
+        await client.models.list()
+    except openai.APIStatusError as e:
+        # Any HTTP answer means the connection (and auth round trip) is established
+        return {"status_code": e.status_code}
+    return {"status_code": 200}
+
+
+async def _warm_synthetic_completion():
+    """Run a one-token completion to warm the deployment end to end"""
+    await _warm_agents_done.wait()
+    service = (await load_travel_agent()).agent.service
+    await service.client.chat.completions.create(
+        model=service.ai_model_id,
+        messages=[{"role": "user", "content": "ping"}],
+        max_tokens=1,
+    )
+
+
+async def _warm_cosmos():
+    """Connect to Cosmos DB and read the container metadata"""
+    from src.storage import get_conversation_storage
+
+    storage = await asyncio.to_thread(get_conversation_storage)
+    await asyncio.to_thread(storage.container.read)
+    if storage.ttl_seconds is not None:
+        await asyncio.to_thread(storage.enable_ttl)
+
+
+async def _warm_fx_cache():
+    """Prime the exchange rate cache and the Frankfurter connection"""
+    await _warm_agents_done.wait()
+    from src.agent.travel_agent import CurrencyPlugin
+
+    rates = await asyncio.to_thread(CurrencyPlugin.get_rates, "USD")
+    return {"currencies": len(rates)}
+
+
+async def _warm_guide_index():
+    """Build the destination guide index if missing (one process builds, others wait) and open it"""
+    await _warm_agents_done.wait()
+    from src.agent.travel_agent import DestinationGuidePlugin
+
+    index = await asyncio.to_thread(DestinationGuidePlugin.prepare)
+    return {"passages": len(index)}
+
+
+async def _start_fx_snapshot_refresher():
+    """Keep the shared FX snapshot fresh; one process per host refreshes it (file lock)"""
+    global fx_refresher
+
+    def create():
+        from src.agent.fx_snapshot import SnapshotRefresher
+
+        return SnapshotRefresher(
+            os.getenv("FX_SNAPSHOT_PATH", "data/fx_snapshot.bin"),
+            os.getenv("FRANKFURTER_API_URL", "https://api.frankfurter.app"),
+            interval=float(os.getenv("FX_SNAPSHOT_INTERVAL", "600")),
+        )
+
+    fx_refresher = await asyncio.to_thread(create)
+    fx_refresher.start()
+
+
+def _register_warmup_steps():
+    """Register warm-up steps for the configured dependencies"""
+    readiness.add_step("agents", _warm_agents)
+    readiness.add_step("agent_card", _warm_agent_card)
+    readiness.add_step("azure_ad_tokens", _warm_azure_ad_tokens)
+    readiness.add_step("azure_openai", _warm_azure_openai, required=False)
+    readiness.add_step("frankfurter", _warm_fx_cache, required=False)
+    readiness.add_step("guide_index", _warm_guide_index, required=False)
+    if os.getenv("FX_SNAPSHOT_REFRESH", "true").lower() == "true":
+        readiness.add_step("fx_snapshot", _start_fx_snapshot_refresher, required=False)
+    if os.getenv("AZURE_COSMOS_ENDPOINT"):
+        readiness.add_step("cosmos", _warm_cosmos, required=False)
+    if os.getenv("WARMUP_SYNTHETIC_COMPLETION", "false").lower() == "true":
+        readiness.add_step("synthetic_completion", _warm_synthetic_completion, required=False)
+
+
+# endregion
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifespan"""
-    global httpx_client, a2a_server
+    global httpx_client
     
     # Startup
     logger.info("Starting Semantic Kernel Travel Agent with A2A integration...")
     httpx_client = httpx.AsyncClient(timeout=30)
     
-    # Initialize A2A server
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 8000))
-    a2a_server = A2AServer(httpx_client, host=host, port=port)
-    
-    # Mount A2A endpoints to the main app
-    app.mount("/a2a", a2a_server.get_starlette_app(), name="a2a")
-    
     logger.info(
         f"A2A server mounted at /a2a - Agent Card available at "
         f"http://{host}:{port}/a2a/"
     )
     
+    # Warm up in the background; /ready reports progress
+    _register_warmup_steps()
+    readiness.start(retry_interval=float(os.getenv("WARMUP_RETRY_INTERVAL", "10")))
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Semantic Kernel Travel Agent...")
+    await readiness.stop()
+    if fx_refresher:
+        fx_refresher.stop()
+    get_token_manager().stop_background_refresh()
     if httpx_client:
         await httpx_client.aclose()
 
@@ -65,22 +254,43 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Mount static files
+# Attribute downstream work (e.g. Cosmos DB request charges) to the endpoint being served
+app.add_middleware(EndpointContextMiddleware)
+
+# Mount static files (fingerprinted, precompressed variants are built by `python -m src.web`)
 static_path = Path(__file__).parent / "static"
-app.mount("/static", StaticFiles(directory=static_path), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory=static_path), name="static")
+asset_manifest = AssetManifest(static_path)
 
 # Setup templates
 templates_path = Path(__file__).parent / "templates"
 templates = Jinja2Templates(directory=templates_path)
+templates.env.globals["asset_url"] = asset_manifest.url
+
+# The root page does not depend on the request, so it is rendered once
+_index_page: tuple[bytes, str] | None = None
 
 # Include API routes
 app.include_router(chat_router, prefix="/api")
+app.include_router(admin_router, prefix="/api")
+
+# Mount A2A endpoints; the A2A server itself is created on first use
+app.mount("/a2a", a2a_app, name="a2a")
 
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     """Serve the main chat interface"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    global _index_page
+    if _index_page is None:
+        body = templates.get_template("index.html").render().encode("utf-8")
+        _index_page = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+    body, etag = _index_page
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(body, headers=headers)
 
 
 @app.get("/health")
@@ -89,12 +299,33 @@ async def health_check():
     return {"status": "healthy", "service": "semantic-kernel-travel-agent"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 200 once warm-up of required dependencies has succeeded"""
+    report = readiness.report()
+    return JSONResponse(report, status_code=200 if readiness.is_ready else 503)
+
+
+@app.get("/metrics/tokens")
+async def token_metrics():
+    """Azure AD token age, time to expiry and refresh counters per scope"""
+    return {"scopes": get_token_manager().metrics()}
+
+
+@app.get("/metrics/storage")
+async def storage_metrics():
+    """Conversation storage cache hit rate, request charge (RU) usage and throttling"""
+    if not os.getenv("AZURE_COSMOS_ENDPOINT"):
+        return {"storage": "in_memory"}
+    from src.storage import get_conversation_storage
+
+    return get_conversation_storage().metrics()
+
+
 @app.get("/agent-card")
-async def get_agent_card():
+async def get_agent_card(request: Request):
     """Expose the A2A Agent Card for discovery"""
-    if a2a_server:
-        return a2a_server._get_agent_card()
-    return {"error": "A2A server not initialized"}
+    return (await load_a2a_server()).agent_card_response(request)
 
 
 if __name__ == "__main__":
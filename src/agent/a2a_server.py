@@ -1,15 +1,37 @@
+import asyncio
+import hashlib
+import json
 import logging
+import os
+import re
+import uuid
+
+from pathlib import Path
+
 import httpx
 
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import BasePushNotificationSender, InMemoryPushNotificationConfigStore, InMemoryTaskStore
+from a2a.server.tasks import BasePushNotificationSender, InMemoryPushNotificationConfigStore, InMemoryTaskStore, TaskStore
 from a2a.types import AgentCapabilities, AgentCard, AgentSkill
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
 
 from .agent_executor import SemanticKernelTravelAgentExecutor
+from .batch import BatchRunner
+from .event_queue import BoundedQueueManager
 
 logger = logging.getLogger(__name__)
 
+# Well-known discovery paths served by the A2A SDK (current and legacy names)
+AGENT_CARD_WELL_KNOWN_PATHS = ("/.well-known/agent.json", "/.well-known/agent-card.json")
+AGENT_CARD_CACHE_CONTROL = "public, max-age=300"
+# Upper bound of the max_workers query parameter of POST /batch
+MAX_BATCH_WORKERS = 32
+# Batch ids double as directory names
+_BATCH_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
 
 class A2AServer:
     """A2A Server wrapper for the Semantic Kernel Travel Agent"""
@@ -18,6 +40,14 @@ class A2AServer:
         self.httpx_client = httpx_client
         self.host = host
         self.port = port
+        self.batch_dir = Path(os.getenv("A2A_BATCH_DIR", "batches"))
+        self.batches: dict[str, dict] = {}
+        self._batch_tasks: dict[str, asyncio.Task] = {}
+        self.skills = [self._trip_planning_skill()]
+        self._agent_card: AgentCard | None = None
+        self._agent_card_bytes = b""
+        self._agent_card_etag = ""
+        self.refresh_agent_card()
         self._setup_server()
     
     def _setup_server(self):
@@ -26,9 +56,17 @@ class A2AServer:
         config_store = InMemoryPushNotificationConfigStore()
         push_sender = BasePushNotificationSender(self.httpx_client, config_store)
         
+        self.task_store = self._create_task_store()
+
+        self.agent_executor = SemanticKernelTravelAgentExecutor()
+
+        # Bounded per-task event queues, so slow streaming clients cannot pile up events
+        self.queue_manager = BoundedQueueManager(task_store=self.task_store)
+
         request_handler = DefaultRequestHandler(
-            agent_executor=SemanticKernelTravelAgentExecutor(),
-            task_store=InMemoryTaskStore(),
+            agent_executor=self.agent_executor,
+            task_store=self.task_store,
+            queue_manager=self.queue_manager,
             push_config_store=config_store,
             push_sender=push_sender,
         )
@@ -40,12 +78,22 @@ class A2AServer:
         )
         
         logger.info(f"A2A server configured for {self.host}:{self.port}")
+
+    def _create_task_store(self) -> TaskStore:
+        """Create the task store; persistent when A2A_TASK_STORE_URL is set"""
+        db_url = os.getenv("A2A_TASK_STORE_URL")
+        if not db_url:
+            return InMemoryTaskStore()
+
+        from a2a.server.tasks import DatabaseTaskStore
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        logger.info("Using database task store for A2A tasks")
+        return DatabaseTaskStore(create_async_engine(db_url))
     
-    def _get_agent_card(self) -> AgentCard:
-        """Returns the Agent Card for the Semantic Kernel Travel Agent."""
-        capabilities = AgentCapabilities(streaming=True)
-        
-        skill_trip_planning = AgentSkill(
+    def _trip_planning_skill(self) -> AgentSkill:
+        """Returns the trip planning skill advertised by the agent."""
+        return AgentSkill(
             id='trip_planning_sk',
             name='Semantic Kernel Trip Planning',
             description=(
@@ -61,6 +109,10 @@ class A2AServer:
             ],
         )
 
+    def _build_agent_card(self) -> AgentCard:
+        """Builds the Agent Card for the Semantic Kernel Travel Agent."""
+        capabilities = AgentCapabilities(streaming=True)
+
         agent_card = AgentCard(
             name='SK Travel Agent',
             description=(
@@ -72,11 +124,174 @@ class A2AServer:
             defaultInputModes=['text'],
             defaultOutputModes=['text'],
             capabilities=capabilities,
-            skills=[skill_trip_planning],
+            skills=self.skills,
         )
 
         return agent_card
-    
+
+    def refresh_agent_card(self) -> None:
+        """Rebuild and re-serialize the Agent Card.
+
+        Call this after changing `skills`, `host` or `port`; every other request
+        is served from the cached bytes.
+        """
+        card = self._build_agent_card()
+        self._agent_card = card
+        self._agent_card_bytes = json.dumps(
+            card.model_dump(mode="json", by_alias=True, exclude_none=True),
+            separators=(",", ":"),
+        ).encode("utf-8")
+        self._agent_card_etag = f'"{hashlib.sha256(self._agent_card_bytes).hexdigest()[:32]}"'
+        if getattr(self, "a2a_app", None) is not None:
+            self.a2a_app.agent_card = card
+
+    @property
+    def agent_card_etag(self) -> str:
+        """ETag of the serialized Agent Card"""
+        return self._agent_card_etag
+
+    def _get_agent_card(self) -> AgentCard:
+        """Returns the cached Agent Card for the Semantic Kernel Travel Agent."""
+        return self._agent_card
+
+    def agent_card_response(self, request: Request) -> Response:
+        """Serve the pre-serialized Agent Card with ETag validation.
+
+        Args:
+            request: Incoming request; its If-None-Match header is honoured
+
+        Returns:
+            304 when the client copy is current, otherwise the card JSON
+        """
+        headers = {"ETag": self._agent_card_etag, "Cache-Control": AGENT_CARD_CACHE_CONTROL}
+        if_none_match = request.headers.get("if-none-match", "")
+        if self._agent_card_etag in {tag.strip() for tag in if_none_match.split(",")} or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+        return Response(self._agent_card_bytes, media_type="application/json", headers=headers)
+
+    async def _handle_agent_card(self, request: Request) -> Response:
+        """Well-known Agent Card endpoint"""
+        return self.agent_card_response(request)
+
+    async def submit_batch(
+        self,
+        input_path: Path,
+        output_path: Path,
+        batch_id: str | None = None,
+        max_workers: int | None = None,
+        api_key: str | None = None,
+    ) -> dict:
+        """Run a JSONL batch of queries through the travel agent.
+
+        Finished items are checkpointed to the task store, so submitting the
+        same batch_id again resumes an interrupted batch.
+
+        Args:
+            input_path: JSONL file with one {"custom_id", "query"} object per line
+            output_path: Destination JSONL file for results
+            batch_id: Identifier of the batch; generated if omitted
+            max_workers: Number of concurrent workers
+            api_key: API key of the caller, charged for the batch's tokens
+
+        Returns:
+            Summary of the batch run
+        """
+        batch_id = batch_id or uuid.uuid4().hex
+        runner = BatchRunner(self.task_store, max_workers=max_workers, api_key=api_key)
+        self.batches[batch_id] = {"status": "running", "progress": runner.progress}
+        try:
+            summary = await runner.run(batch_id, Path(input_path), Path(output_path))
+        except Exception as e:
+            logger.error(f"Batch {batch_id} failed: {e}")
+            self.batches[batch_id] = {"status": "failed", "error": str(e), "progress": runner.progress}
+            raise
+        self.batches[batch_id] = {"status": "completed", "progress": runner.progress, "summary": summary}
+        return summary
+
+    def _start_batch(self, batch_id: str, max_workers: int | None, api_key: str | None = None) -> None:
+        """Run a spooled batch in the background"""
+        batch_path = self.batch_dir / batch_id
+        task = asyncio.create_task(
+            self.submit_batch(
+                batch_path / "input.jsonl",
+                batch_path / "output.jsonl",
+                batch_id=batch_id,
+                max_workers=max_workers,
+                api_key=api_key,
+            )
+        )
+        self._batch_tasks[batch_id] = task
+        task.add_done_callback(lambda _: self._batch_tasks.pop(batch_id, None))
+
+    async def _handle_batch_submit(self, request: Request) -> JSONResponse:
+        """Accept a JSONL request body and start it as a batch"""
+        body = await request.body()
+        if not body.strip():
+            return JSONResponse({"error": "Empty batch"}, status_code=400)
+        max_workers = request.query_params.get("max_workers")
+        if max_workers is not None:
+            try:
+                max_workers = int(max_workers)
+            except ValueError:
+                max_workers = 0
+            if not 1 <= max_workers <= MAX_BATCH_WORKERS:
+                return JSONResponse(
+                    {"error": f"max_workers must be an integer between 1 and {MAX_BATCH_WORKERS}"},
+                    status_code=400,
+                )
+        # A session-affine proxy assigns the id so it can route the batch's later requests
+        batch_id = request.headers.get("x-batch-id") or uuid.uuid4().hex
+        if not _BATCH_ID_PATTERN.fullmatch(batch_id):
+            return JSONResponse({"error": "X-Batch-Id must be 32 hex characters"}, status_code=400)
+        batch_path = self.batch_dir / batch_id
+        try:
+            batch_path.mkdir(parents=True)
+        except FileExistsError:
+            return JSONResponse({"error": f"Batch {batch_id} already exists"}, status_code=409)
+        (batch_path / "input.jsonl").write_bytes(body)
+        self._start_batch(batch_id, max_workers, request.headers.get("x-api-key"))
+        return JSONResponse({"batch_id": batch_id, "status": "running"}, status_code=202)
+
+    async def _handle_batch_resume(self, request: Request) -> JSONResponse:
+        """Resume a batch whose previous run was interrupted"""
+        batch_id = request.path_params["batch_id"]
+        if not (self.batch_dir / batch_id / "input.jsonl").exists():
+            return JSONResponse({"error": "Batch not found"}, status_code=404)
+        if batch_id in self._batch_tasks:
+            return JSONResponse({"batch_id": batch_id, "status": "running"})
+        self._start_batch(batch_id, None, request.headers.get("x-api-key"))
+        return JSONResponse({"batch_id": batch_id, "status": "running"}, status_code=202)
+
+    async def _handle_batch_status(self, request: Request) -> JSONResponse:
+        """Report the progress of a batch"""
+        batch_id = request.path_params["batch_id"]
+        if batch_id in self.batches:
+            return JSONResponse({"batch_id": batch_id, **self.batches[batch_id]})
+        if (self.batch_dir / batch_id / "input.jsonl").exists():
+            return JSONResponse({"batch_id": batch_id, "status": "interrupted"})
+        return JSONResponse({"error": "Batch not found"}, status_code=404)
+
+    async def _handle_batch_results(self, request: Request):
+        """Download the JSONL results of a finished batch"""
+        batch_id = request.path_params["batch_id"]
+        output_path = self.batch_dir / batch_id / "output.jsonl"
+        if not output_path.exists():
+            return JSONResponse({"error": "Results not available"}, status_code=404)
+        return FileResponse(output_path, media_type="application/x-ndjson")
+
+    async def _handle_queue_metrics(self, request: Request) -> JSONResponse:
+        """Depth and coalescing/drop counters of every running task's event queues"""
+        return JSONResponse(self.queue_manager.metrics())
+
     def get_starlette_app(self):
         """Get the Starlette app for mounting in FastAPI"""
-        return self.a2a_app.build()
+        app = self.a2a_app.build()
+        # Serve the cached card ahead of the SDK's handler, which re-serializes per request
+        for path in reversed(AGENT_CARD_WELL_KNOWN_PATHS):
+            app.router.routes.insert(0, Route(path, self._handle_agent_card, methods=["GET"]))
+        app.add_route("/batch", self._handle_batch_submit, methods=["POST"])
+        app.add_route("/batch/{batch_id}", self._handle_batch_status, methods=["GET"])
+        app.add_route("/batch/{batch_id}/resume", self._handle_batch_resume, methods=["POST"])
+        app.add_route("/batch/{batch_id}/results", self._handle_batch_results, methods=["GET"])
+        app.add_route("/metrics/queues", self._handle_queue_metrics, methods=["GET"])
+        return app
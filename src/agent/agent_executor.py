@@ -1,8 +1,11 @@
 import logging
 
+from typing import Any
+
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events.event_queue import EventQueue
 from a2a.types import (
+    Task,
     TaskArtifactUpdateEvent,
     TaskState,
     TaskStatus,
@@ -13,6 +16,8 @@ from a2a.utils import (
     new_task,
     new_text_artifact,
 )
+from .progress import ProgressCoalescer
+from .token_budget import TokenBudgetExceeded
 from .travel_agent import SemanticKernelTravelAgent
 
 
@@ -22,8 +27,22 @@ logger = logging.getLogger(__name__)
 class SemanticKernelTravelAgentExecutor(AgentExecutor):
     """SemanticKernelTravelAgent Executor for A2A Protocol"""
 
-    def __init__(self):
-        self.agent = SemanticKernelTravelAgent()
+    def __init__(self, progress_min_interval: float | None = None):
+        """Initialize the executor
+
+        Args:
+            progress_min_interval: Minimum seconds between tool progress events;
+                defaults to A2A_PROGRESS_MIN_INTERVAL_MS
+        """
+        self._agent: SemanticKernelTravelAgent | None = None
+        self.progress_min_interval = progress_min_interval
+
+    @property
+    def agent(self) -> SemanticKernelTravelAgent:
+        """The travel agent, built on first use or warm-up"""
+        if self._agent is None:
+            self._agent = SemanticKernelTravelAgent()
+        return self._agent
 
     async def execute(
         self,
@@ -37,16 +56,77 @@ class SemanticKernelTravelAgentExecutor(AgentExecutor):
             event_queue: Event queue for publishing task updates
         """
         query = context.get_user_input()
+        api_key = self._caller_api_key(context)
         task = context.current_task
         if not task:
             task = new_task(context.message)
             await event_queue.enqueue_event(task)
 
-        async for partial in self.agent.stream(query, task.contextId):
+        async def publish_trailing(steps: list[dict[str, Any]]) -> None:
+            await self._publish_progress(event_queue, task, 'Processing function calls...', steps)
+
+        coalescer = ProgressCoalescer(self.progress_min_interval, on_trailing=publish_trailing)
+
+        try:
+            await self._stream_task(query, task, event_queue, coalescer, api_key)
+        except TokenBudgetExceeded as e:
+            await coalescer.close()
+            await event_queue.enqueue_event(
+                TaskStatusUpdateEvent(
+                    status=TaskStatus(
+                        state=TaskState.failed,
+                        message=new_agent_text_message(
+                            str(e),
+                            task.contextId,
+                            task.id,
+                        ),
+                    ),
+                    final=True,
+                    contextId=task.contextId,
+                    taskId=task.id,
+                )
+            )
+        finally:
+            await coalescer.close()
+
+    @staticmethod
+    def _caller_api_key(context: RequestContext) -> str | None:
+        """The `X-API-Key` header of the HTTP request carrying the A2A call, if any
+
+        The A2A app's call context keeps the request headers (lower-cased) in
+        its state; the key identifies the tenant for token budgets.
+        """
+        call_context = context.call_context
+        if call_context is None:
+            return None
+        headers = call_context.state.get('headers') or {}
+        return headers.get('x-api-key')
+
+    async def _stream_task(
+        self,
+        query: str,
+        task: Task,
+        event_queue: EventQueue,
+        coalescer: ProgressCoalescer,
+        api_key: str | None = None,
+    ) -> None:
+        """Publish the agent's stream updates for a task as A2A events"""
+        async for partial in self.agent.stream(query, task.contextId, api_key=api_key):
+            if event_queue.is_closed():
+                # The consumer was disconnected (e.g. too slow); stop spending tokens on it
+                logger.warning(f'Event queue of task {task.id} is closed, stopping the agent stream')
+                return
             require_input = partial['require_user_input']
             is_done = partial['is_task_complete']
             text_content = partial['content']
 
+            if require_input or is_done:
+                # Let a trailing progress batch land before the final events
+                await coalescer.close()
+                await self._publish_progress(
+                    event_queue, task, 'Processing function calls...', coalescer.flush()
+                )
+
             if require_input:
                 await event_queue.enqueue_event(
                     TaskStatusUpdateEvent(
@@ -85,6 +165,13 @@ class SemanticKernelTravelAgentExecutor(AgentExecutor):
                         taskId=task.id,
                     )
                 )
+            elif 'progress' in partial:
+                await self._publish_progress(
+                    event_queue,
+                    task,
+                    text_content,
+                    coalescer.add(partial['progress']),
+                )
             else:
                 await event_queue.enqueue_event(
                     TaskStatusUpdateEvent(
@@ -102,6 +189,40 @@ class SemanticKernelTravelAgentExecutor(AgentExecutor):
                     )
                 )
 
+    async def _publish_progress(
+        self,
+        event_queue: EventQueue,
+        task: Task,
+        text_content: str,
+        steps: list[dict[str, Any]] | None,
+    ) -> None:
+        """Publish a batch of tool progress steps as a working status update.
+
+        Args:
+            event_queue: Event queue for publishing task updates
+            task: The task being executed
+            text_content: Human readable status text
+            steps: Coalesced progress steps; nothing is published when empty
+        """
+        if not steps:
+            return
+        await event_queue.enqueue_event(
+            TaskStatusUpdateEvent(
+                status=TaskStatus(
+                    state=TaskState.working,
+                    message=new_agent_text_message(
+                        text_content,
+                        task.contextId,
+                        task.id,
+                    ),
+                ),
+                final=False,
+                contextId=task.contextId,
+                taskId=task.id,
+                metadata={'progress': steps},
+            )
+        )
+
     async def cancel(
         self, context: RequestContext, event_queue: EventQueue
     ) -> None:
@@ -0,0 +1,386 @@
+"""Bulk trip-planning jobs for the A2A server.
+
+A batch is a JSONL file with one query per line::
+
+    {"custom_id": "req-1", "query": "Plan a day in Rome", "session_id": "optional"}
+
+Items run through a bounded pool of workers, each with its own
+`SemanticKernelTravelAgent` (an agent holds one conversation thread at a
+time). Every finished item is checkpointed to the A2A task store, so running
+the same batch again resumes where a crashed run stopped: items that completed
+are skipped and failed items are retried, up to `max_attempts` runs each.
+Results are written as JSONL in input order once all items are done.
+
+For jobs that do not need multi-agent tool calling, the same input can be
+converted to the provider's discounted batch API request format with
+`write_provider_batch_requests`; `LocalBatchProvider` processes such files
+locally for testing.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+
+from collections.abc import Awaitable, Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+from a2a.server.tasks import TaskStore
+from a2a.types import Task, TaskState, TaskStatus
+from a2a.utils import new_agent_text_message, new_text_artifact
+from pydantic import BaseModel, ValidationError
+
+from .travel_agent import (
+    TRAVEL_MANAGER_INSTRUCTIONS,
+    ResponseFormat,
+    SemanticKernelTravelAgent,
+)
+
+logger = logging.getLogger(__name__)
+
+_BATCH_NAMESPACE = uuid.UUID('6f1c2a53-3f57-4d3e-9a55-9b0c2a3c1e77')
+
+# Items in these states are skipped when a batch is resumed; failed items are
+# retried until they reach the attempt limit.
+_DONE_STATES = {
+    TaskState.completed,
+    TaskState.input_required,
+}
+
+
+class BatchItem(BaseModel):
+    """A single query of a batch."""
+
+    custom_id: str
+    query: str
+    session_id: str | None = None
+
+
+def read_batch_items(input_path: Path) -> Iterator[BatchItem]:
+    """Stream batch items from a JSONL file, skipping blank lines.
+
+    Args:
+        input_path: Path to the JSONL input.
+
+    Yields:
+        BatchItem: The parsed items, in file order.
+
+    Raises:
+        ValueError: If a line is not a valid batch item.
+    """
+    with open(input_path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield BatchItem.model_validate_json(line)
+            except ValidationError as e:
+                raise ValueError(f'Invalid batch item on line {line_number}: {e}') from e
+
+
+def batch_task_id(batch_id: str, custom_id: str) -> str:
+    """Deterministic task id of a batch item, stable across restarts."""
+    return str(uuid.uuid5(_BATCH_NAMESPACE, f'{batch_id}/{custom_id}'))
+
+
+class BatchRunner:
+    """Runs a batch through a bounded worker pool with task-store checkpoints."""
+
+    def __init__(
+        self,
+        task_store: TaskStore,
+        agent_factory: Callable[[], SemanticKernelTravelAgent] = SemanticKernelTravelAgent,
+        max_workers: int | None = None,
+        max_attempts: int | None = None,
+        api_key: str | None = None,
+    ):
+        """Initialize the runner.
+
+        Args:
+            task_store: Store used to checkpoint finished items.
+            agent_factory: Creates one agent per worker.
+            max_workers: Number of concurrent workers; defaults to A2A_BATCH_WORKERS or 4.
+            max_attempts: Runs of a failing item across resumes; defaults to
+                A2A_BATCH_MAX_ATTEMPTS or 3.
+            api_key: API key of the caller that submitted (or resumed) the
+                batch, charged for its tokens; it is not persisted.
+        """
+        self.task_store = task_store
+        self.api_key = api_key
+        self.agent_factory = agent_factory
+        self.max_workers = max_workers or int(os.getenv('A2A_BATCH_WORKERS', '4'))
+        self.max_attempts = max_attempts or int(os.getenv('A2A_BATCH_MAX_ATTEMPTS', '3'))
+        self.progress: dict[str, int] = {'total': 0, 'skipped': 0, 'retried': 0, 'completed': 0, 'failed': 0}
+
+    async def run(self, batch_id: str, input_path: Path, output_path: Path) -> dict[str, Any]:
+        """Run (or resume) a batch and write its results.
+
+        Args:
+            batch_id: Identifier of the batch; reuse it to resume.
+            input_path: JSONL file of batch items.
+            output_path: Destination JSONL file for results.
+
+        Returns:
+            dict: Summary counters and elapsed time.
+        """
+        started = time.perf_counter()
+        queue: asyncio.Queue[tuple[BatchItem, int] | None] = asyncio.Queue(maxsize=self.max_workers * 2)
+        workers = [
+            asyncio.create_task(self._worker(batch_id, queue))
+            for _ in range(self.max_workers)
+        ]
+        try:
+            for item in read_batch_items(input_path):
+                self.progress['total'] += 1
+                task = await self.task_store.get(batch_task_id(batch_id, item.custom_id))
+                attempts = (task.metadata or {}).get('attempts', 1) if task is not None else 0
+                if task is not None and (
+                    task.status.state in _DONE_STATES or attempts >= self.max_attempts
+                ):
+                    self.progress['skipped'] += 1
+                    continue
+                if task is not None:
+                    self.progress['retried'] += 1
+                await queue.put((item, attempts + 1))
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+        await self._write_results(batch_id, input_path, output_path)
+        summary = {
+            'batch_id': batch_id,
+            **self.progress,
+            'elapsed_seconds': round(time.perf_counter() - started, 3),
+            'output': str(output_path),
+        }
+        logger.info(f'Batch {batch_id} finished: {summary}')
+        return summary
+
+    async def _worker(self, batch_id: str, queue: 'asyncio.Queue[tuple[BatchItem, int] | None]') -> None:
+        """Process items until the sentinel is received.
+
+        A worker never exits on an item's error, so the producer cannot block
+        on a full queue that nobody drains.
+        """
+        agent = None
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            item, attempt = entry
+            task_id = batch_task_id(batch_id, item.custom_id)
+            state, text = TaskState.failed, ''
+            try:
+                if agent is None:
+                    agent = self.agent_factory()
+                response = await agent.invoke(item.query, item.session_id or task_id, api_key=self.api_key)
+                if response.get('is_task_complete'):
+                    state = TaskState.completed
+                else:
+                    state = TaskState.input_required
+                text = response.get('content', '')
+            except Exception as e:
+                logger.error(f'Batch {batch_id} item {item.custom_id} failed (attempt {attempt}): {e}')
+                text = str(e)
+            finally:
+                try:
+                    await self._checkpoint(batch_id, item, task_id, state, text, attempt)
+                except Exception as e:
+                    # The item is retried on the next resume
+                    logger.error(f'Batch {batch_id} item {item.custom_id} could not be checkpointed: {e}')
+                    state = TaskState.failed
+                self.progress['failed' if state == TaskState.failed else 'completed'] += 1
+
+    async def _checkpoint(
+        self,
+        batch_id: str,
+        item: BatchItem,
+        task_id: str,
+        state: TaskState,
+        text: str,
+        attempt: int,
+    ) -> None:
+        """Persist the outcome of one item as an A2A task."""
+        context_id = item.session_id or task_id
+        task = Task(
+            id=task_id,
+            contextId=context_id,
+            status=TaskStatus(
+                state=state,
+                message=new_agent_text_message(text, context_id, task_id),
+            ),
+            artifacts=[
+                new_text_artifact(
+                    name='current_result',
+                    description='Result of request to agent.',
+                    text=text,
+                )
+            ] if state != TaskState.failed else None,
+            metadata={'batch_id': batch_id, 'custom_id': item.custom_id, 'attempts': attempt},
+        )
+        await self.task_store.save(task)
+
+    async def _write_results(self, batch_id: str, input_path: Path, output_path: Path) -> None:
+        """Write one result line per input item, in input order."""
+        tmp_path = output_path.with_suffix(output_path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            for item in read_batch_items(input_path):
+                task_id = batch_task_id(batch_id, item.custom_id)
+                task = await self.task_store.get(task_id)
+                if task is None:
+                    record = {'custom_id': item.custom_id, 'task_id': task_id, 'status': 'missing', 'content': None}
+                else:
+                    message = task.status.message
+                    content = message.parts[0].root.text if message and message.parts else None
+                    record = {
+                        'custom_id': item.custom_id,
+                        'task_id': task_id,
+                        'status': task.status.state.value,
+                        'content': content,
+                    }
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, output_path)
+
+
+# region Provider Batch API
+
+
+def write_provider_batch_requests(
+    input_path: Path,
+    output_path: Path,
+    model: str | None = None,
+) -> int:
+    """Convert a batch to the provider's discounted batch API request format.
+
+    Each line becomes a `/chat/completions` request with the travel manager
+    instructions and the `ResponseFormat` JSON schema. Tool calling to the
+    specialist agents is not available in this mode.
+
+    Args:
+        input_path: JSONL file of batch items.
+        output_path: Destination request file.
+        model: Model or deployment name; defaults to AZURE_OPENAI_DEPLOYMENT_NAME.
+
+    Returns:
+        int: Number of requests written.
+    """
+    model = model or os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
+    response_format = {
+        'type': 'json_schema',
+        'json_schema': {
+            'name': ResponseFormat.__name__,
+            'schema': ResponseFormat.model_json_schema(),
+        },
+    }
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as out:
+        for item in read_batch_items(input_path):
+            request = {
+                'custom_id': item.custom_id,
+                'method': 'POST',
+                'url': '/chat/completions',
+                'body': {
+                    'model': model,
+                    'messages': [
+                        {'role': 'system', 'content': TRAVEL_MANAGER_INSTRUCTIONS},
+                        {'role': 'user', 'content': item.query},
+                    ],
+                    'response_format': response_format,
+                },
+            }
+            out.write(json.dumps(request, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def read_provider_batch_results(provider_output_path: Path, output_path: Path) -> int:
+    """Convert a provider batch output file to the batch result format.
+
+    Args:
+        provider_output_path: Output file downloaded from the provider.
+        output_path: Destination JSONL file for results.
+
+    Returns:
+        int: Number of results written.
+    """
+    count = 0
+    with open(provider_output_path, encoding='utf-8') as f, open(output_path, 'w', encoding='utf-8') as out:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            record = {'custom_id': entry.get('custom_id'), 'status': 'failed', 'content': None}
+            response = entry.get('response') or {}
+            if entry.get('error') or response.get('status_code') != 200:
+                record['content'] = json.dumps(entry.get('error') or response.get('body'))
+            else:
+                raw = response['body']['choices'][0]['message']['content']
+                try:
+                    structured = ResponseFormat.model_validate_json(raw)
+                    record['status'] = structured.status
+                    record['content'] = structured.message
+                except ValidationError:
+                    record['content'] = raw
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+class LocalBatchProvider:
+    """Local stand-in for the provider batch API.
+
+    Processes a request file line by line with `responder`, which receives the
+    chat messages and returns the assistant content, and writes an output file
+    in the provider's format.
+    """
+
+    def __init__(self, responder: Callable[[list[dict[str, str]]], Awaitable[str]] | None = None):
+        self.responder = responder or self._default_responder
+
+    @staticmethod
+    async def _default_responder(messages: list[dict[str, str]]) -> str:
+        return ResponseFormat(status='completed', message=messages[-1]['content']).model_dump_json()
+
+    async def process(self, request_path: Path, output_path: Path) -> int:
+        """Run every request in `request_path` and write the provider output file.
+
+        Returns:
+            int: Number of requests processed.
+        """
+        count = 0
+        with open(request_path, encoding='utf-8') as f, open(output_path, 'w', encoding='utf-8') as out:
+            for line in f:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                entry: dict[str, Any] = {
+                    'id': f'batch_req_{uuid.uuid4().hex}',
+                    'custom_id': request['custom_id'],
+                    'response': None,
+                    'error': None,
+                }
+                try:
+                    content = await self.responder(request['body']['messages'])
+                    entry['response'] = {
+                        'status_code': 200,
+                        'body': {
+                            'model': request['body'].get('model'),
+                            'choices': [{
+                                'index': 0,
+                                'message': {'role': 'assistant', 'content': content},
+                                'finish_reason': 'stop',
+                            }],
+                        },
+                    }
+                except Exception as e:
+                    entry['error'] = {'code': 'local_error', 'message': str(e)}
+                out.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                count += 1
+        return count
+
+
+# endregion
@@ -0,0 +1,61 @@
+"""Local, deterministic text embeddings.
+
+`HashingEmbedder` maps words and word bigrams into a fixed number of signed
+buckets (the hashing trick) and L2-normalizes the result. It needs no model
+or network, gives identical vectors on every machine, and captures enough
+lexical overlap for retrieval over a small guide corpus and for tests. Any
+object with `name`, `dim` and `embed(texts)` can replace it.
+"""
+
+import functools
+import hashlib
+import re
+
+from typing import Protocol
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+@functools.lru_cache(maxsize=65536)
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class Embedder(Protocol):
+    """Turns texts into L2-normalized float32 vectors."""
+
+    name: str
+    dim: int
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Return an array of shape (len(texts), dim)."""
+        ...
+
+
+class HashingEmbedder:
+    """Feature-hashing embedder over words and word bigrams.
+
+    Args:
+        dim: Number of buckets (vector dimension).
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f'hashing-{dim}'
+
+    def _bucket(self, feature: str) -> tuple[int, float]:
+        value = _feature_hash(feature)
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN.findall(text.lower())
+            features = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                bucket, sign = self._bucket(feature)
+                vectors[row, bucket] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
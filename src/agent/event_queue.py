@@ -0,0 +1,340 @@
+"""Bounded A2A event queues with coalescing and slow-consumer handling.
+
+The A2A request handler reads a task's events from an `EventQueue` and, for
+streaming requests, only as fast as the client receives them. A stalled
+streaming client therefore leaves the executor's events in memory, or blocks
+the executor, for the rest of the task. `BoundedEventQueue` applies a policy
+to every queue of a task, including the taps created for resubscribing
+clients:
+
+* At most `capacity` events are buffered.
+* A `working` status update that the consumer has not read yet is replaced by
+  the next one (tool progress steps of both are kept), so a slow consumer
+  gets the latest state instead of every intermediate one.
+* When the queue is full, the producer waits (``block``) or, for non-final
+  `working` updates, the event is dropped (``drop``). Final events are never
+  dropped.
+* A consumer that keeps the queue full, or reads nothing while events are
+  waiting, for `slow_consumer_timeout` seconds is disconnected: its queue is
+  closed and cleared, which ends its stream. When that is the task's main
+  queue, nobody records the task's remaining events, so the task is first
+  marked `failed` ("consumer too slow") in the task store; a resubscribing
+  tap that is disconnected leaves the task alone.
+
+`BoundedQueueManager` creates these queues for the `DefaultRequestHandler`
+and reports the depth of every task's queues.
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from a2a.server.events import Event, EventQueue, NoTaskQueue, QueueManager, TaskQueueExists
+from a2a.server.tasks import TaskStore
+from a2a.types import TaskState, TaskStatus, TaskStatusUpdateEvent
+from a2a.utils import new_agent_text_message
+
+logger = logging.getLogger(__name__)
+
+SLOW_CONSUMER_MESSAGE = 'Consumer too slow: the event stream was disconnected before the task finished'
+
+_TERMINAL_STATES = {TaskState.completed, TaskState.canceled, TaskState.failed, TaskState.rejected}
+
+
+@dataclass(frozen=True)
+class QueuePolicy:
+    """Limits applied to every event queue of a task.
+
+    Attributes:
+        capacity: Events buffered per queue.
+        overflow: `block` the producer or `drop` working updates when full.
+        coalesce: Replace unread `working` status updates with newer ones.
+        slow_consumer_timeout: Seconds a queue may stay full, or unread with
+            events waiting, before its consumer is disconnected.
+    """
+
+    capacity: int = 256
+    overflow: Literal['block', 'drop'] = 'block'
+    coalesce: bool = True
+    slow_consumer_timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> 'QueuePolicy':
+        """Build the policy from `A2A_EVENT_QUEUE_*` environment variables."""
+        overflow = os.getenv('A2A_EVENT_QUEUE_OVERFLOW', 'block').lower()
+        return cls(
+            capacity=int(os.getenv('A2A_EVENT_QUEUE_CAPACITY', '256')),
+            overflow='drop' if overflow == 'drop' else 'block',
+            coalesce=os.getenv('A2A_EVENT_QUEUE_COALESCE', 'true').lower() == 'true',
+            slow_consumer_timeout=float(os.getenv('A2A_SLOW_CONSUMER_TIMEOUT', '30')),
+        )
+
+
+def _is_working_update(event: Event) -> bool:
+    return (
+        isinstance(event, TaskStatusUpdateEvent)
+        and not event.final
+        and event.status.state == TaskState.working
+    )
+
+
+class BoundedEventQueue(EventQueue):
+    """`EventQueue` enforcing a `QueuePolicy`.
+
+    Args:
+        policy: Capacity, overflow and slow-consumer settings.
+        parent: Queue this one taps, if it is a child queue.
+        on_disconnect: Awaited before a main queue's slow consumer is
+            disconnected, e.g. to record the task as failed.
+    """
+
+    def __init__(
+        self,
+        policy: QueuePolicy,
+        parent: 'BoundedEventQueue | None' = None,
+        on_disconnect: Callable[[], Awaitable[None]] | None = None,
+    ):
+        super().__init__()
+        # Replaces the SDK's queue, which is unbounded in older releases
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=policy.capacity)
+        self.policy = policy
+        self.parent = parent
+        self.on_disconnect = on_disconnect
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.high_water = 0
+        self.blocked_seconds = 0.0
+        self.slow_consumer = False
+        self._tail: Event | None = None  # Last event put in the queue, while unread
+        self._full_since: float | None = None
+        self._last_read = time.monotonic()  # Last dequeue, or when the queue stopped being empty
+
+    @property
+    def depth(self) -> int:
+        """Events waiting for the consumer."""
+        return self.queue.qsize()
+
+    def _coalesce(self, event: Event) -> bool:
+        """Fold a working update into the unread working update at the tail."""
+        if not (self.policy.coalesce and self._tail is not None and _is_working_update(event)):
+            return False
+        tail = self._tail
+        if not _is_working_update(tail):
+            return False
+        progress = (tail.metadata or {}).get('progress', []) + (event.metadata or {}).get('progress', [])
+        tail.status = event.status
+        tail.metadata = {**(tail.metadata or {}), **(event.metadata or {})}
+        if progress:
+            tail.metadata['progress'] = progress
+        self.coalesced += 1
+        return True
+
+    def _is_stalled(self) -> bool:
+        """True once the queue has been full, or unread, for the slow-consumer timeout."""
+        now = time.monotonic()
+        if self.queue.empty():
+            self._last_read = now
+        if not self.queue.full():
+            self._full_since = None
+        elif self._full_since is None:
+            self._full_since = now
+        timeout = self.policy.slow_consumer_timeout
+        unread = not self.queue.empty() and now - self._last_read >= timeout
+        return unread or (self._full_since is not None and now - self._full_since >= timeout)
+
+    async def _put(self, event: Event) -> bool:
+        """Buffer one event according to the policy; False if the consumer was disconnected."""
+        if self.queue.full():
+            if self.policy.overflow == 'drop' and _is_working_update(event):
+                self.dropped += 1
+                return True
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(self.queue.put(event), self.policy.slow_consumer_timeout)
+            except (asyncio.TimeoutError, TimeoutError):
+                await self.disconnect_slow_consumer()
+                return False
+            finally:
+                self.blocked_seconds += time.monotonic() - started
+        else:
+            self.queue.put_nowait(event)
+        self._tail = event
+        self.enqueued += 1
+        self.high_water = max(self.high_water, self.queue.qsize())
+        return True
+
+    async def enqueue_event(self, event: Event) -> None:
+        """Enqueue an event to this queue and all its children, applying the policy."""
+        if self.is_closed():
+            return
+        if _is_working_update(event):
+            # Each queue owns its copy, so coalescing never changes an event
+            # another queue or the consumer already holds
+            event = event.model_copy()
+        if self._is_stalled():
+            await self.disconnect_slow_consumer()
+            return
+        if not self._coalesce(event) and not await self._put(event):
+            return
+        for child in list(self._children):
+            await child.enqueue_event(event)
+
+    async def dequeue_event(self, no_wait: bool = False) -> Event:
+        event = await super().dequeue_event(no_wait)
+        self._last_read = time.monotonic()
+        if event is self._tail:
+            self._tail = None
+        return event
+
+    def tap(self) -> 'BoundedEventQueue':
+        """Create a child queue, with the same policy, for a resubscribing consumer."""
+        queue = BoundedEventQueue(self.policy, parent=self)
+        self._children.append(queue)
+        return queue
+
+    async def disconnect_slow_consumer(self) -> None:
+        """Close and clear the queue so its consumer's stream ends."""
+        if self.slow_consumer:
+            return
+        self.slow_consumer = True
+        logger.warning(
+            f'Disconnecting slow A2A consumer: {self.depth}/{self.policy.capacity} events '
+            f'unread for {self.policy.slow_consumer_timeout}s'
+        )
+        if self.parent is not None and self in self.parent._children:
+            self.parent._children.remove(self)
+        elif self.parent is None and self.on_disconnect is not None:
+            try:
+                await self.on_disconnect()
+            except Exception as e:
+                logger.error(f'Could not record the slow-consumer disconnection: {e}')
+        # Discard what the consumer has not read, then close: the consumer sees
+        # a closed, empty queue and its stream ends
+        await self._close_immediately()
+
+    async def _close_immediately(self) -> None:
+        """Close this queue and its taps, discarding the events nobody has read.
+
+        `EventQueue.close()` waits until every queued event of the queue and
+        its taps is read (before Python 3.13), so a stalled tap would hang the
+        disconnection; releases of the SDK older than 0.3.5 have no
+        `close(immediate=True)`.
+        """
+        children, self._children = self._children, []
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+        self._tail = None
+        await self.close()
+        for child in children:
+            await child._close_immediately()
+
+    def metrics(self) -> dict[str, Any]:
+        """Depth and policy counters of this queue."""
+        return {
+            'depth': self.depth,
+            'capacity': self.policy.capacity,
+            'high_water': self.high_water,
+            'enqueued': self.enqueued,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'blocked_seconds': round(self.blocked_seconds, 3),
+            'slow_consumer_disconnected': self.slow_consumer,
+        }
+
+
+class BoundedQueueManager(QueueManager):
+    """In-memory `QueueManager` creating `BoundedEventQueue`s and exporting their depth.
+
+    Args:
+        policy: Policy of every queue; read from the environment by default.
+        task_store: Store in which a task whose main consumer was disconnected
+            is marked failed; without one the task is left as it was.
+    """
+
+    def __init__(self, policy: QueuePolicy | None = None, task_store: TaskStore | None = None):
+        self.policy = policy or QueuePolicy.from_env()
+        self.task_store = task_store
+        self._task_queue: dict[str, BoundedEventQueue] = {}
+        self._lock = asyncio.Lock()
+        self.totals = {'tasks': 0, 'coalesced': 0, 'dropped': 0, 'slow_consumers': 0}
+
+    async def add(self, task_id: str, queue: EventQueue) -> None:
+        async with self._lock:
+            if task_id in self._task_queue:
+                raise TaskQueueExists
+            if not isinstance(queue, BoundedEventQueue):
+                raise TypeError('BoundedQueueManager only manages BoundedEventQueue instances')
+            if queue.on_disconnect is None:
+                queue.on_disconnect = lambda: self._fail_task(task_id)
+            self._task_queue[task_id] = queue
+
+    async def get(self, task_id: str) -> EventQueue | None:
+        async with self._lock:
+            return self._task_queue.get(task_id)
+
+    async def tap(self, task_id: str) -> EventQueue | None:
+        async with self._lock:
+            queue = self._task_queue.get(task_id)
+            return queue.tap() if queue is not None else None
+
+    async def close(self, task_id: str) -> None:
+        async with self._lock:
+            if task_id not in self._task_queue:
+                raise NoTaskQueue
+            queue = self._task_queue.pop(task_id)
+            self._add_totals(queue)
+        await queue.close()
+
+    async def create_or_tap(self, task_id: str) -> EventQueue:
+        async with self._lock:
+            if task_id not in self._task_queue:
+                queue = BoundedEventQueue(self.policy, on_disconnect=lambda: self._fail_task(task_id))
+                self._task_queue[task_id] = queue
+                return queue
+            return self._task_queue[task_id].tap()
+
+    async def _fail_task(self, task_id: str) -> None:
+        """Mark a task failed because its main consumer was disconnected, unless it already ended."""
+        if self.task_store is None:
+            return
+        task = await self.task_store.get(task_id)
+        if task is None or task.status.state in _TERMINAL_STATES:
+            return
+        task.status = TaskStatus(
+            state=TaskState.failed,
+            message=new_agent_text_message(SLOW_CONSUMER_MESSAGE, task_id=task.id),
+        )
+        await self.task_store.save(task)
+
+    def _add_totals(self, queue: BoundedEventQueue) -> None:
+        self.totals['tasks'] += 1
+        for q in [queue, *queue._children]:
+            self.totals['coalesced'] += q.coalesced
+            self.totals['dropped'] += q.dropped
+            self.totals['slow_consumers'] += int(q.slow_consumer)
+
+    def metrics(self) -> dict[str, Any]:
+        """Per-task queue depth and counters for the main queue and each tap."""
+        tasks = {
+            task_id: {**queue.metrics(), 'taps': [child.metrics() for child in queue._children]}
+            for task_id, queue in list(self._task_queue.items())
+        }
+        return {
+            'policy': {
+                'capacity': self.policy.capacity,
+                'overflow': self.policy.overflow,
+                'coalesce': self.policy.coalesce,
+                'slow_consumer_timeout': self.policy.slow_consumer_timeout,
+            },
+            'active_tasks': len(tasks),
+            'max_depth': max((t['depth'] for t in tasks.values()), default=0),
+            'tasks': tasks,
+            'closed_tasks': dict(self.totals),
+        }
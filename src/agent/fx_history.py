@@ -0,0 +1,203 @@
+"""Local columnar store of historical exchange rates.
+
+Rates are kept per base currency as NumPy arrays - a sorted vector of day
+numbers and a `days x currencies` matrix of rates (NaN where the provider
+published nothing) - and persisted to one `.npz` file per base currency.
+The store also remembers which calendar days were already requested, so a
+range query only fetches the dates that are missing (weekends and holidays,
+for which the provider publishes no rates, are not fetched again).
+"""
+
+import logging
+import os
+import threading
+
+from collections.abc import Callable
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rates for a date range: {'YYYY-MM-DD': {'EUR': 0.91, ...}, ...}
+RangeFetcher = Callable[[str, date, date], dict[str, dict[str, float]]]
+
+
+def _day(value: date) -> int:
+    return value.toordinal()
+
+
+def _date(day: int) -> date:
+    return date.fromordinal(int(day))
+
+
+def _missing_ranges(requested: np.ndarray, covered: np.ndarray) -> list[tuple[int, int]]:
+    """Group the requested days not in `covered` into contiguous (start, end) ranges."""
+    missing = requested[~np.isin(requested, covered, assume_unique=True)]
+    if missing.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(missing) > 1)
+    starts = np.concatenate(([missing[0]], missing[breaks + 1]))
+    ends = np.concatenate((missing[breaks], [missing[-1]]))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+class _Series:
+    """Arrays of one base currency."""
+
+    def __init__(
+        self,
+        days: np.ndarray | None = None,
+        currencies: list[str] | None = None,
+        rates: np.ndarray | None = None,
+        covered: np.ndarray | None = None,
+    ):
+        self.days = days if days is not None else np.empty(0, dtype=np.int32)
+        self.currencies = currencies or []
+        self.rates = rates if rates is not None else np.empty((0, 0), dtype=np.float64)
+        self.covered = covered if covered is not None else np.empty(0, dtype=np.int32)
+
+    def merge(self, fetched: dict[str, dict[str, float]], requested: np.ndarray) -> None:
+        """Merge fetched rates and mark the requested days as covered."""
+        currencies = list(self.currencies)
+        for day_rates in fetched.values():
+            currencies.extend(code for code in day_rates if code not in currencies)
+        column = {code: index for index, code in enumerate(currencies)}
+
+        new_days = np.array([_day(date.fromisoformat(d)) for d in fetched], dtype=np.int32)
+        new_rates = np.full((len(new_days), len(currencies)), np.nan)
+        for row, day_rates in enumerate(fetched.values()):
+            for code, rate in day_rates.items():
+                new_rates[row, column[code]] = rate
+
+        old_rates = np.full((len(self.days), len(currencies)), np.nan)
+        old_rates[:, : len(self.currencies)] = self.rates
+
+        days = np.concatenate((self.days, new_days))
+        rates = np.vstack((old_rates, new_rates))
+        # Newer fetches win for duplicate days: keep the last occurrence
+        order = np.argsort(days, kind='stable')[::-1]
+        _, first = np.unique(days[order], return_index=True)
+        keep = order[first]
+
+        self.days = days[keep]
+        self.rates = rates[keep]
+        self.currencies = currencies
+        self.covered = np.union1d(self.covered, requested).astype(np.int32)
+
+
+class FxHistoryStore:
+    """Historical exchange rates per base currency, backed by `.npz` files.
+
+    Args:
+        directory: Where the per-base-currency files are kept.
+        fetcher: Returns the provider's rates for `(base, start, end)`.
+    """
+
+    def __init__(self, directory: str | Path, fetcher: RangeFetcher):
+        self.directory = Path(directory)
+        self.fetcher = fetcher
+        self._series: dict[str, _Series] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, base: str) -> Path:
+        return self.directory / f'{base}.npz'
+
+    def _load(self, base: str) -> _Series:
+        series = self._series.get(base)
+        if series is not None:
+            return series
+        path = self._path(base)
+        if path.exists():
+            with np.load(path, allow_pickle=False) as data:
+                series = _Series(
+                    days=data['days'],
+                    currencies=data['currencies'].tolist(),
+                    rates=data['rates'],
+                    covered=data['covered'],
+                )
+        else:
+            series = _Series()
+        self._series[base] = series
+        return series
+
+    def _save(self, base: str, series: _Series) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path(base).with_suffix('.tmp.npz')
+        np.savez_compressed(
+            tmp_path,
+            days=series.days,
+            currencies=np.array(series.currencies, dtype='U3'),
+            rates=series.rates,
+            covered=series.covered,
+        )
+        os.replace(tmp_path, self._path(base))
+
+    def ensure_range(self, base: str, start: date, end: date) -> int:
+        """Fetch the days of [start, end] not yet in the store.
+
+        Today is never marked covered, since its rates may not be published yet.
+
+        Returns:
+            int: Number of provider requests made.
+        """
+        base = base.upper()
+        with self._lock:
+            series = self._load(base)
+            requested = np.arange(_day(start), _day(end) + 1, dtype=np.int32)
+            ranges = _missing_ranges(requested, series.covered)
+            if not ranges:
+                return 0
+            fetched: dict[str, dict[str, float]] = {}
+            for range_start, range_end in ranges:
+                fetched.update(self.fetcher(base, _date(range_start), _date(range_end)))
+            covered = requested[
+                np.isin(requested, np.concatenate([np.arange(s, e + 1) for s, e in ranges]))
+                & (requested < _day(date.today()))
+            ]
+            series.merge(fetched, covered)
+            self._save(base, series)
+            logger.info(f'Fetched {len(ranges)} missing FX range(s) for {base}')
+            return len(ranges)
+
+    def series(self, base: str, target: str, start: date, end: date) -> tuple[np.ndarray, np.ndarray]:
+        """Return (day numbers, rates) of `base`->`target` within [start, end]."""
+        base, target = base.upper(), target.upper()
+        self.ensure_range(base, start, end)
+        with self._lock:
+            series = self._load(base)
+            if target not in series.currencies:
+                return np.empty(0, dtype=np.int32), np.empty(0)
+            column = series.rates[:, series.currencies.index(target)]
+            mask = (series.days >= _day(start)) & (series.days <= _day(end)) & ~np.isnan(column)
+            return series.days[mask], column[mask]
+
+    def summarize(self, base: str, target: str, start: date, end: date) -> dict[str, float | str | int] | None:
+        """Min, max, average, change and linear trend of a rate over a date range.
+
+        Returns:
+            dict | None: Summary statistics, or None when there are no rates in the range.
+        """
+        days, values = self.series(base, target, start, end)
+        if values.size == 0:
+            return None
+        low, high = int(np.argmin(values)), int(np.argmax(values))
+        offsets = (days - days[0]).astype(np.float64)
+        slope = float(np.polyfit(offsets, values, 1)[0]) if values.size > 1 else 0.0
+        returns = np.diff(values) / values[:-1]
+        return {
+            'observations': int(values.size),
+            'first_date': _date(days[0]).isoformat(),
+            'first': float(values[0]),
+            'last_date': _date(days[-1]).isoformat(),
+            'last': float(values[-1]),
+            'min': float(values[low]),
+            'min_date': _date(days[low]).isoformat(),
+            'max': float(values[high]),
+            'max_date': _date(days[high]).isoformat(),
+            'average': float(values.mean()),
+            'change_pct': float((values[-1] / values[0] - 1) * 100),
+            'trend_per_day': slope,
+            'volatility_pct': float(returns.std() * 100) if returns.size else 0.0,
+        }
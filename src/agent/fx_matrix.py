@@ -0,0 +1,81 @@
+"""Cross-rate matrix for converting many amounts in one shot.
+
+A single fetch of all rates against one base currency is enough to derive
+every cross rate: with `r[c]` units of `c` per unit of the base,
+`cross[i, j] = r[j] / r[i]` converts currency `i` into currency `j`.
+Conversions of a whole expense list are then a single vectorized lookup.
+"""
+
+import json
+import re
+
+import numpy as np
+
+_LINE_PATTERN = re.compile(r'^\s*([-+]?\d[\d,]*(?:\.\d+)?)\s*([A-Za-z]{3})\b\s*(.*)$')
+
+
+class CrossRateMatrix:
+    """Cross rates between all currencies quoted against one base currency.
+
+    Args:
+        base: Base currency code of `rates`.
+        rates: Units of each currency per unit of `base`.
+    """
+
+    def __init__(self, base: str, rates: dict[str, float]):
+        self.base = base.upper()
+        self.currencies = [self.base] + sorted(code for code in rates if code != self.base)
+        self.index = {code: i for i, code in enumerate(self.currencies)}
+        self.per_base = np.array([1.0] + [rates[code] for code in self.currencies[1:]])
+        self.matrix = self.per_base[np.newaxis, :] / self.per_base[:, np.newaxis]
+
+    def rate(self, currency_from: str, currency_to: str) -> float:
+        """Units of `currency_to` per unit of `currency_from`."""
+        return float(self.matrix[self.index[currency_from.upper()], self.index[currency_to.upper()]])
+
+    def convert(self, amounts: np.ndarray, currencies: list[str], target: str) -> np.ndarray:
+        """Convert amounts given in `currencies` into `target` in one vectorized step.
+
+        Raises:
+            KeyError: If a currency is not quoted.
+        """
+        rows = np.fromiter((self.index[code.upper()] for code in currencies), dtype=np.intp, count=len(currencies))
+        return amounts * self.matrix[rows, self.index[target.upper()]]
+
+
+def parse_expenses(expenses: str) -> list[dict]:
+    """Parse an expense list.
+
+    Accepts a JSON array of `{"amount", "currency", "description"}` objects,
+    or lines / semicolon-separated entries like `120 EUR hotel`.
+
+    Raises:
+        ValueError: If an entry cannot be parsed.
+    """
+    text = expenses.strip()
+    if text.startswith('['):
+        parsed = []
+        for item in json.loads(text):
+            if not isinstance(item, dict) or 'amount' not in item or 'currency' not in item:
+                raise ValueError(f'Expense must be an object with amount and currency: {item!r}')
+            parsed.append({
+                'description': str(item.get('description', '')),
+                'amount': float(item['amount']),
+                'currency': str(item['currency']).upper(),
+            })
+        return parsed
+
+    parsed = []
+    for entry in re.split(r'[;\n]', text):
+        if not entry.strip():
+            continue
+        match = _LINE_PATTERN.match(entry)
+        if match is None:
+            raise ValueError(f'Cannot parse expense: {entry.strip()!r}')
+        amount, currency, description = match.groups()
+        parsed.append({
+            'description': description.strip(),
+            'amount': float(amount.replace(',', '')),
+            'currency': currency.upper(),
+        })
+    return parsed
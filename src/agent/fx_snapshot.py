@@ -0,0 +1,211 @@
+"""Exchange rate snapshot shared across processes through a memory-mapped file.
+
+One refresher fetches all rates against a reference currency and writes them
+to a small fixed-layout binary file; every worker process maps the file and
+reads rates without copying or parsing. The file is replaced atomically
+(write to a temporary file, then rename), so readers always see a complete
+snapshot, and a worker that starts while the provider is unreachable can
+still answer from the last snapshot.
+
+Layout (little-endian)::
+
+    header  8s  magic b'FXSNAP01'
+            10s rate date, YYYY-MM-DD
+            3s  reference currency
+            3x  padding
+            I   number of currencies
+            d   fetch time (unix seconds)
+    entries count x (4s currency code, d units per reference currency)
+
+Run a standalone refresher with ``python -m src.agent.fx_snapshot``. Inside
+the app, every process may start a `SnapshotRefresher`; an exclusive lock on
+`<path>.lock` makes sure only one of them fetches.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; every refresher then fetches
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'FXSNAP01'
+HEADER = struct.Struct('<8s10s3s3xId')
+ENTRY_DTYPE = np.dtype([('code', 'S4'), ('rate', '<f8')])
+REFERENCE_CURRENCY = 'EUR'
+
+
+def write_snapshot(
+    path: str | Path,
+    rates: dict[str, float],
+    rate_date: str,
+    base: str = REFERENCE_CURRENCY,
+    fetched_at: float | None = None,
+) -> None:
+    """Atomically replace the snapshot file.
+
+    Args:
+        path (str | Path): Snapshot file.
+        rates (dict[str, float]): Units of each currency per unit of `base`.
+        rate_date (str): Date the rates are for, YYYY-MM-DD.
+        base (str): Reference currency of `rates`.
+        fetched_at (float | None): Fetch time; defaults to now.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entries = np.empty(len(rates) + 1, dtype=ENTRY_DTYPE)
+    entries[0] = (base.encode('ascii'), 1.0)
+    for i, (code, rate) in enumerate(sorted(rates.items()), start=1):
+        entries[i] = (code.encode('ascii'), rate)
+    header = HEADER.pack(
+        MAGIC, rate_date.encode('ascii'), base.encode('ascii'), len(entries), fetched_at or time.time()
+    )
+
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(entries.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class FxSnapshotReader:
+    """Zero-copy reader of the snapshot file.
+
+    The mapping is reopened when the file is replaced; a mapping of the
+    previous file stays valid until then.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._identity: tuple[int, int] | None = None
+        self._mmap: mmap.mmap | None = None
+        self._entries: np.ndarray | None = None
+        self._header: tuple | None = None
+        self._lock = threading.Lock()
+
+    def _refresh_mapping(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if identity == self._identity:
+            return self._entries is not None
+        with open(self.path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = HEADER.unpack_from(mapped, 0)
+        if header[0] != MAGIC:
+            mapped.close()
+            logger.warning(f'Ignoring FX snapshot with unknown format: {self.path}')
+            return False
+        self._entries = np.frombuffer(mapped, dtype=ENTRY_DTYPE, count=header[3], offset=HEADER.size)
+        self._header = header
+        self._mmap = mapped  # The previous mapping is released once no array refers to it
+        self._identity = identity
+        return True
+
+    def read(self, base: str) -> tuple[str, float, dict[str, float]] | None:
+        """Return (rate date, age in seconds, rates) for a base currency.
+
+        Cross rates are derived from the reference currency, so any quoted
+        currency can be the base.
+
+        Returns:
+            tuple | None: The rates, or None when there is no usable snapshot.
+        """
+        with self._lock:
+            if not self._refresh_mapping():
+                return None
+            entries, header = self._entries, self._header
+        codes = np.char.decode(entries['code'], 'ascii').tolist()
+        matches = np.flatnonzero(entries['code'] == base.upper().encode('ascii'))
+        if matches.size == 0:
+            return None
+        cross = entries['rate'] / entries['rate'][matches[0]]
+        rates = {code: rate for code, rate in zip(codes, cross.tolist()) if code != base.upper()}
+        return header[1].decode('ascii'), time.time() - header[4], rates
+
+
+class SnapshotRefresher:
+    """Keeps the snapshot file fresh; only the process holding `<path>.lock` fetches.
+
+    Args:
+        path (str | Path): Snapshot file.
+        api_url (str): Frankfurter base URL.
+        interval (float): Seconds between refreshes.
+    """
+
+    def __init__(self, path: str | Path, api_url: str, interval: float = 600.0):
+        self.path = Path(path)
+        self.api_url = api_url
+        self.interval = interval
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        if self._lock_file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._lock_file = open(self.path.with_name(self.path.name + '.lock'), 'a')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def refresh(self) -> None:
+        """Fetch the latest rates and replace the snapshot."""
+        response = httpx.get(f'{self.api_url}/latest', params={'from': REFERENCE_CURRENCY}, timeout=10.0)
+        response.raise_for_status()
+        payload = response.json()
+        write_snapshot(self.path, payload.get('rates', {}), payload.get('date', ''), REFERENCE_CURRENCY)
+        logger.info(f"FX snapshot refreshed ({len(payload.get('rates', {}))} currencies, {payload.get('date')})")
+
+    def run(self) -> None:
+        """Refresh every `interval` seconds while holding the refresher lock."""
+        while not self._stop.is_set():
+            if self._acquire():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning(f'FX snapshot refresh failed: {e}')
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        """Run the refresher in a daemon thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name='fx-snapshot-refresher', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the refresher thread and release the lock."""
+        self._stop.set()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    SnapshotRefresher(
+        os.getenv('FX_SNAPSHOT_PATH', 'data/fx_snapshot.bin'),
+        os.getenv('FRANKFURTER_API_URL', 'https://api.frankfurter.app'),
+        float(os.getenv('FX_SNAPSHOT_INTERVAL', '600')),
+    ).run()
@@ -0,0 +1,183 @@
+"""In-memory index of points of interest for the activity planner.
+
+The dataset (JSON Lines, one place per line) is loaded into columnar NumPy
+arrays. Lookups combine an inverted index of sorted row ids per city,
+category and tag, a fixed-size geo grid for "near X" queries and vectorized
+price / distance filters, so a top-k query touches only candidate rows.
+"""
+
+import json
+import logging
+import math
+
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATASET = Path(__file__).resolve().parent / 'data' / 'pois.jsonl'
+
+# Geo grid cell size in degrees (about 1.1 km of latitude)
+GRID_DEGREES = 0.01
+EARTH_RADIUS_KM = 6371.0
+# Largest "near X" radius; wider searches are clamped to it
+MAX_RADIUS_KM = 50.0
+
+
+def _term(kind: str, value: str) -> str:
+    return f'{kind}:{value.strip().lower()}'
+
+
+class PoiIndex:
+    """Columnar, indexed store of points of interest.
+
+    Args:
+        records: Places with `name`, `city`, `category`, `tags`, `lat`, `lon`,
+            `price_level` (0 free - 4 expensive) and `rating`.
+    """
+
+    def __init__(self, records: list[dict]):
+        self.names = [record['name'] for record in records]
+        self.cities = sorted({record['city'] for record in records})
+        self.categories = sorted({record['category'] for record in records})
+        city_ids = {city: i for i, city in enumerate(self.cities)}
+        category_ids = {category: i for i, category in enumerate(self.categories)}
+
+        self.city = np.array([city_ids[r['city']] for r in records], dtype=np.int16)
+        self.category = np.array([category_ids[r['category']] for r in records], dtype=np.int16)
+        self.lat = np.array([r['lat'] for r in records], dtype=np.float64)
+        self.lon = np.array([r['lon'] for r in records], dtype=np.float64)
+        self.price = np.array([r.get('price_level', 0) for r in records], dtype=np.int8)
+        self.rating = np.array([r.get('rating', 0.0) for r in records], dtype=np.float32)
+        self.tags = [tuple(r.get('tags', ())) for r in records]
+
+        postings: dict[str, list[int]] = {}
+        grid: dict[tuple[int, int], list[int]] = {}
+        for row, record in enumerate(records):
+            terms = [_term('city', record['city']), _term('category', record['category'])]
+            terms += [_term('tag', tag) for tag in record.get('tags', ())]
+            for term in terms:
+                postings.setdefault(term, []).append(row)
+            grid.setdefault(self._cell(record['lat'], record['lon']), []).append(row)
+        self.postings = {term: np.array(rows, dtype=np.int32) for term, rows in postings.items()}
+        self.grid = {cell: np.array(rows, dtype=np.int32) for cell, rows in grid.items()}
+        self.grid_cells = np.array(list(self.grid), dtype=np.int64).reshape(-1, 2)
+        self.by_name = {name.lower(): row for row, name in enumerate(self.names)}
+
+    @classmethod
+    def load(cls, path: str | Path = DEFAULT_DATASET) -> 'PoiIndex':
+        """Load a JSON Lines dataset."""
+        with open(path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        logger.info(f'Loaded {len(records)} points of interest from {path}')
+        return cls(records)
+
+    @staticmethod
+    def _cell(lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / GRID_DEGREES), math.floor(lon / GRID_DEGREES)
+
+    def _near_rows(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Rows in the grid cells overlapping a circle.
+
+        Small boxes probe each of their cells; once a box spans more cells
+        than are occupied, the occupied cells are filtered instead.
+        """
+        lat_cells = math.ceil(radius_km / 111.0 / GRID_DEGREES)
+        lon_cells = math.ceil(radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01)) / GRID_DEGREES)
+        center_lat, center_lon = self._cell(lat, lon)
+        if (2 * lat_cells + 1) * (2 * lon_cells + 1) > len(self.grid):
+            inside = (np.abs(self.grid_cells[:, 0] - center_lat) <= lat_cells) & (
+                np.abs(self.grid_cells[:, 1] - center_lon) <= lon_cells
+            )
+            cells = [tuple(cell) for cell in self.grid_cells[inside].tolist()]
+        else:
+            cells = [
+                (i, j)
+                for i in range(center_lat - lat_cells, center_lat + lat_cells + 1)
+                for j in range(center_lon - lon_cells, center_lon + lon_cells + 1)
+            ]
+        parts = [self.grid[cell] for cell in cells if cell in self.grid]
+        return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int32)
+
+    def _distances_km(self, rows: np.ndarray, lat: float, lon: float) -> np.ndarray:
+        lat1, lon1 = math.radians(lat), math.radians(lon)
+        lat2, lon2 = np.radians(self.lat[rows]), np.radians(self.lon[rows])
+        a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+    def resolve_location(self, near: str) -> tuple[float, float] | None:
+        """Coordinates of "lat,lon" or of a known place name."""
+        try:
+            lat, lon = (float(part) for part in near.split(','))
+            return lat, lon
+        except ValueError:
+            pass
+        row = self.by_name.get(near.strip().lower())
+        if row is None:
+            matches = [r for name, r in self.by_name.items() if near.strip().lower() in name]
+            row = matches[0] if matches else None
+        return (float(self.lat[row]), float(self.lon[row])) if row is not None else None
+
+    def search(
+        self,
+        city: str | None = None,
+        category: str | None = None,
+        tags: list[str] | None = None,
+        near: tuple[float, float] | None = None,
+        radius_km: float = 2.0,
+        min_price: int = 0,
+        max_price: int = 4,
+        k: int = 5,
+    ) -> list[dict]:
+        """Top-k places matching all filters.
+
+        Results are ranked by rating, or by distance when `near` is given.
+        `radius_km` is clamped to `MAX_RADIUS_KM`.
+        """
+        candidates: np.ndarray | None = None
+        terms = []
+        if city:
+            terms.append(_term('city', city))
+        if category:
+            terms.append(_term('category', category))
+        terms += [_term('tag', tag) for tag in tags or () if tag.strip()]
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                return []
+            candidates = posting if candidates is None else np.intersect1d(candidates, posting, assume_unique=True)
+
+        distances = None
+        if near is not None:
+            radius_km = min(max(radius_km, 0.0), MAX_RADIUS_KM)
+            nearby = self._near_rows(near[0], near[1], radius_km)
+            candidates = nearby if candidates is None else np.intersect1d(candidates, nearby, assume_unique=True)
+        if candidates is None:
+            candidates = np.arange(len(self.names), dtype=np.int32)
+
+        mask = (self.price[candidates] >= min_price) & (self.price[candidates] <= max_price)
+        candidates = candidates[mask]
+        if near is not None:
+            distances = self._distances_km(candidates, near[0], near[1])
+            within = distances <= radius_km
+            candidates, distances = candidates[within], distances[within]
+            order = np.argsort(distances, kind='stable')[:k]
+        else:
+            order = np.argsort(-self.rating[candidates], kind='stable')[:k]
+
+        results = []
+        for position in order:
+            row = int(candidates[position])
+            result = {
+                'name': self.names[row],
+                'city': self.cities[self.city[row]],
+                'category': self.categories[self.category[row]],
+                'tags': list(self.tags[row]),
+                'price_level': int(self.price[row]),
+                'rating': round(float(self.rating[row]), 1),
+            }
+            if distances is not None:
+                result['distance_km'] = round(float(distances[position]), 2)
+            results.append(result)
+        return results
@@ -0,0 +1,153 @@
+"""Structured tool-progress reporting for streamed agent turns."""
+
+import asyncio
+import os
+import time
+
+from typing import Any, Awaitable, Callable
+
+from semantic_kernel.contents import FunctionCallContent, FunctionResultContent
+
+
+MAX_RESULT_PREVIEW_CHARS = 500
+
+
+def _preview(value: Any, limit: int = MAX_RESULT_PREVIEW_CHARS) -> str:
+    """Render a tool argument/result as a bounded string."""
+    text = value if isinstance(value, str) else str(value)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+class ProgressTracker:
+    """Turns Semantic Kernel intermediate messages into progress steps.
+
+    Each step is a JSON-serializable dict describing a tool call or a tool
+    result, including the elapsed time of that step.
+    """
+
+    def __init__(self):
+        self._started_at = time.perf_counter()
+        self._call_started: dict[str, float] = {}
+        self._pending: list[dict[str, Any]] = []
+
+    def observe(self, items: list[Any]) -> None:
+        """Record progress steps for the items of one intermediate message.
+
+        Args:
+            items: The `items` of a `ChatMessageContent`.
+        """
+        now = time.perf_counter()
+        for item in items:
+            if isinstance(item, FunctionCallContent):
+                self._call_started[item.id or item.name or ''] = now
+                self._pending.append({
+                    'type': 'tool_call',
+                    'tool': item.name,
+                    'call_id': item.id,
+                    'arguments': _preview(item.arguments or {}),
+                    'elapsed_ms': round((now - self._started_at) * 1000, 1),
+                })
+            elif isinstance(item, FunctionResultContent):
+                call_started = self._call_started.pop(
+                    item.id or item.name or '', self._started_at
+                )
+                self._pending.append({
+                    'type': 'tool_result',
+                    'tool': item.name,
+                    'call_id': item.id,
+                    'result': _preview(item.result),
+                    'elapsed_ms': round((now - call_started) * 1000, 1),
+                })
+
+    def drain(self) -> list[dict[str, Any]]:
+        """Return and clear the steps observed since the previous drain."""
+        steps, self._pending = self._pending, []
+        return steps
+
+
+class ProgressCoalescer:
+    """Batches progress steps so a chatty stream does not flood the event queue.
+
+    Steps are buffered and released at most once per `min_interval` seconds.
+    `flush` releases whatever is buffered regardless of the interval. With an
+    `on_trailing` callback, steps held back by the interval are also released
+    once it has elapsed, so the last step of a long tool call is not hidden
+    until the next event arrives.
+
+    Args:
+        min_interval: Minimum seconds between batches; defaults to
+            A2A_PROGRESS_MIN_INTERVAL_MS.
+        on_trailing: Publishes a batch released by the trailing timer.
+    """
+
+    def __init__(
+        self,
+        min_interval: float | None = None,
+        on_trailing: Callable[[list[dict[str, Any]]], Awaitable[None]] | None = None,
+    ):
+        if min_interval is None:
+            min_interval = float(os.getenv('A2A_PROGRESS_MIN_INTERVAL_MS', '250')) / 1000
+        self.min_interval = min_interval
+        self.on_trailing = on_trailing
+        self._buffer: list[dict[str, Any]] = []
+        self._last_emit = float('-inf')
+        self._trailing: asyncio.Task | None = None
+        self._trailing_fired = False
+
+    def add(self, steps: list[dict[str, Any]]) -> list[dict[str, Any]] | None:
+        """Buffer steps and return a batch if the interval has elapsed.
+
+        Args:
+            steps: New progress steps.
+
+        Returns:
+            list | None: The steps to publish now, or None to keep buffering.
+        """
+        self._buffer.extend(steps)
+        if not self._buffer:
+            return None
+        wait = self._last_emit + self.min_interval - time.monotonic()
+        if wait > 0:
+            self._schedule_trailing(wait)
+            return None
+        return self.flush()
+
+    def flush(self) -> list[dict[str, Any]] | None:
+        """Release every buffered step."""
+        if self._trailing is not None and not self._trailing_fired:
+            self._trailing.cancel()
+            self._trailing = None
+        if not self._buffer:
+            return None
+        batch, self._buffer = self._buffer, []
+        self._last_emit = time.monotonic()
+        return batch
+
+    async def close(self) -> None:
+        """Cancel a pending trailing flush, or wait for one being published."""
+        trailing, self._trailing = self._trailing, None
+        if trailing is None:
+            return
+        if self._trailing_fired:
+            await trailing
+        else:
+            trailing.cancel()
+
+    def _schedule_trailing(self, delay: float) -> None:
+        if self.on_trailing is not None and self._trailing is None:
+            self._trailing_fired = False
+            self._trailing = asyncio.create_task(self._trailing_flush(delay))
+
+    async def _trailing_flush(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._trailing_fired = True
+        try:
+            batch = self.flush()
+            if batch:
+                await self.on_trailing(batch)
+        finally:
+            if self._trailing is asyncio.current_task():
+                self._trailing = None
+        if self._buffer:
+            # Steps added while the batch was being published
+            self._schedule_trailing(max(0.0, self._last_emit + self.min_interval - time.monotonic()))
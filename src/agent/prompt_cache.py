@@ -0,0 +1,211 @@
+"""Prompt prefix assembly and prompt-cache accounting.
+
+Azure OpenAI / OpenAI cache the longest byte-identical prefix of a request
+(system prompt, tool definitions, response schema). Any drift in that prefix
+between turns - reordered tools, trailing whitespace, a regenerated schema -
+turns every turn into a cache miss. This module keeps the prefix canonical and
+records the cached-token counts reported back in the usage data.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_instructions(*parts: str) -> str:
+    """Join instruction fragments into a byte-stable system prompt.
+
+    Args:
+        *parts: Instruction sentences or paragraphs.
+
+    Returns:
+        str: The instructions with collapsed whitespace, joined by single spaces.
+    """
+    return ' '.join(' '.join(part.split()) for part in parts if part and part.strip())
+
+
+def canonical_json(value: Any) -> str:
+    """Serialize a value to JSON with sorted keys and no insignificant whitespace."""
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+@dataclass(frozen=True)
+class PromptPrefix:
+    """The cacheable front of a request for a single agent.
+
+    Attributes:
+        agent_name: Name of the agent the prefix belongs to.
+        instructions: Normalized system prompt.
+        tools: Tool schemas, in the order they are sent to the provider.
+        response_schema: JSON schema of the structured response, if any.
+    """
+
+    agent_name: str
+    instructions: str
+    tools: tuple[str, ...] = ()
+    response_schema: str | None = None
+
+    @classmethod
+    def build(
+        cls,
+        agent_name: str,
+        instructions: str,
+        tools: list[dict[str, Any]] | None = None,
+        response_format: type[BaseModel] | dict[str, Any] | None = None,
+    ) -> 'PromptPrefix':
+        """Build a prefix with every component canonically serialized.
+
+        Tool order is preserved rather than sorted: the provider caches the
+        bytes as sent, so an order change must show up as a new fingerprint.
+
+        Args:
+            agent_name: Name of the agent.
+            instructions: System prompt.
+            tools: Tool definitions in request order.
+            response_format: Pydantic model or JSON schema used as structured output.
+
+        Returns:
+            PromptPrefix: The canonical prefix.
+        """
+        tool_schemas = tuple(canonical_json(tool) for tool in tools or [])
+        schema = None
+        if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+            schema = canonical_json(response_format.model_json_schema())
+        elif isinstance(response_format, dict):
+            schema = canonical_json(response_format)
+        return cls(
+            agent_name=agent_name,
+            instructions=normalize_instructions(instructions),
+            tools=tool_schemas,
+            response_schema=schema,
+        )
+
+    @property
+    def fingerprint(self) -> str:
+        """Short SHA-256 of the prefix; changes whenever the cacheable bytes change."""
+        digest = hashlib.sha256()
+        digest.update(self.instructions.encode('utf-8'))
+        for tool in self.tools:
+            digest.update(b'\x00')
+            digest.update(tool.encode('utf-8'))
+        if self.response_schema:
+            digest.update(b'\x01')
+            digest.update(self.response_schema.encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+
+def _usage_value(usage: Any, name: str) -> int:
+    """Read a token count from an SK/OpenAI usage object or dict."""
+    if usage is None:
+        return 0
+    if isinstance(usage, dict):
+        return int(usage.get(name) or 0)
+    return int(getattr(usage, name, 0) or 0)
+
+
+def cached_tokens_from_usage(usage: Any) -> int:
+    """Extract the cached prompt token count from a usage payload.
+
+    Handles both the flat `cached_tokens` field and the OpenAI
+    `prompt_tokens_details.cached_tokens` shape.
+    """
+    if usage is None:
+        return 0
+    details = (
+        usage.get('prompt_tokens_details')
+        if isinstance(usage, dict)
+        else getattr(usage, 'prompt_tokens_details', None)
+    )
+    if details is not None:
+        return _usage_value(details, 'cached_tokens')
+    return _usage_value(usage, 'cached_tokens')
+
+
+@dataclass
+class _AgentCacheStats:
+    turns: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    ttft_total: float = 0.0
+    ttft_samples: int = 0
+    fingerprints: set[str] = field(default_factory=set)
+
+
+class PromptCacheStats:
+    """Thread-safe accumulator of prompt-cache usage per agent."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents: dict[str, _AgentCacheStats] = {}
+
+    def register_prefix(self, prefix: PromptPrefix) -> None:
+        """Remember a prefix fingerprint; warn if an agent's prefix drifted."""
+        with self._lock:
+            stats = self._agents.setdefault(prefix.agent_name, _AgentCacheStats())
+            if stats.fingerprints and prefix.fingerprint not in stats.fingerprints:
+                logger.warning(
+                    f'Prompt prefix for {prefix.agent_name} changed '
+                    f'({prefix.fingerprint}); provider prompt cache will miss'
+                )
+            stats.fingerprints.add(prefix.fingerprint)
+
+    def record_usage(self, agent_name: str, usage: Any) -> None:
+        """Record the usage reported for one completed turn."""
+        if usage is None:
+            return
+        with self._lock:
+            stats = self._agents.setdefault(agent_name, _AgentCacheStats())
+            stats.turns += 1
+            stats.prompt_tokens += _usage_value(usage, 'prompt_tokens')
+            stats.completion_tokens += _usage_value(usage, 'completion_tokens')
+            stats.cached_tokens += cached_tokens_from_usage(usage)
+
+    def record_first_token(self, agent_name: str, started_at: float) -> None:
+        """Record time to first token for a streamed turn.
+
+        Args:
+            agent_name: Name of the agent.
+            started_at: `time.perf_counter()` value taken when the request was sent.
+        """
+        elapsed = time.perf_counter() - started_at
+        with self._lock:
+            stats = self._agents.setdefault(agent_name, _AgentCacheStats())
+            stats.ttft_total += elapsed
+            stats.ttft_samples += 1
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return a JSON-serializable view of the collected statistics."""
+        with self._lock:
+            return {
+                name: {
+                    'turns': s.turns,
+                    'prompt_tokens': s.prompt_tokens,
+                    'cached_tokens': s.cached_tokens,
+                    'completion_tokens': s.completion_tokens,
+                    'cache_hit_ratio': (
+                        round(s.cached_tokens / s.prompt_tokens, 4)
+                        if s.prompt_tokens
+                        else 0.0
+                    ),
+                    'avg_ttft_ms': (
+                        round(s.ttft_total / s.ttft_samples * 1000, 2)
+                        if s.ttft_samples
+                        else None
+                    ),
+                    'prefix_fingerprints': sorted(s.fingerprints),
+                }
+                for name, s in self._agents.items()
+            }
+
+
+prompt_cache_stats = PromptCacheStats()
@@ -0,0 +1,344 @@
+"""Incremental, tolerant parsing of the structured `ResponseFormat` output.
+
+The model streams its structured answer as JSON text. `ResponseFormatParser`
+buffers the chunks and, at the end, validates them with the model's strict
+`model_validate_json`, which is fast and handles well-formed output. Only
+when that fails (truncated, malformed or non-JSON output) does it run its
+tolerant scanner to recover `status` and the message. The scanner also runs
+while streaming, but only when the caller asks for `status` or the partial
+message, and then only over the chunks it has not seen yet. String values
+are decoded incrementally: runs of plain characters are copied in bulk and an
+escape sequence split across chunks is carried over to the next one, so
+streaming the message costs time proportional to its length.
+"""
+
+import logging
+import re
+import time
+
+from typing import Any, get_args
+
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Scanner states
+_START = 0
+_KEY_OR_END = 1
+_IN_KEY = 2
+_COLON = 3
+_VALUE = 4
+_IN_STRING = 5
+_IN_SCALAR = 6
+_IN_NESTED = 7
+_COMMA_OR_END = 8
+_DONE = 9
+
+
+# Characters that end a run of plain string content
+_STRING_SPECIAL = re.compile(r'["\\]')
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+
+
+class ResponseFormatParser:
+    """Streaming parser for a flat JSON object such as `ResponseFormat`.
+
+    Feed text with `feed`; read `status` at any point; call `result` once the
+    stream ends. Only top-level string values are captured - nested values are
+    skipped - which is all `ResponseFormat` needs.
+    """
+
+    def __init__(self, model: type[BaseModel]):
+        self.model = model
+        self.allowed_status = set(get_args(model.model_fields['status'].annotation))
+        self.values: dict[str, str] = {}
+        self.complete = False
+        self.raw_parts: list[str] = []
+        self.parse_seconds = 0.0
+        self.status_latency: float | None = None
+        self.fast_path: bool | None = None  # Whether `result` used strict validation
+
+        self._status: str | None = None
+        self._scanned_parts = 0
+        self._started_at: float | None = None
+        self._state = _START
+        self._current_key: str | None = None
+        self._pieces: list[str] = []  # Decoded pieces of the string being read
+        self._escape = ''  # Escape sequence not complete yet, e.g. '\\u00'
+        self._high_surrogate = ''  # Waiting for the low half of a surrogate pair
+        self._message_pieces: list[str] | None = None
+        self._delta_from = 0
+        self._escaped = False
+        self._depth = 0
+        self._nested_in_string = False
+
+    def feed(self, text: str) -> None:
+        """Buffer the next chunk of model output; it is scanned on demand."""
+        if not text:
+            return
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+        self.raw_parts.append(text)
+
+    @property
+    def status(self) -> str | None:
+        """The `status` value, once it has been streamed completely."""
+        self._scan()
+        return self._status
+
+    def _scan(self) -> None:
+        """Run the tolerant scanner over the chunks fed since the last scan."""
+        if self._scanned_parts == len(self.raw_parts):
+            return
+        started = time.perf_counter()
+        for text in self.raw_parts[self._scanned_parts:]:
+            self._scan_text(text)
+        self._scanned_parts = len(self.raw_parts)
+        self.parse_seconds += time.perf_counter() - started
+
+    def _scan_text(self, text: str) -> None:
+        i, end = 0, len(text)
+        while i < end and self._state != _DONE:
+            if self._state not in (_IN_KEY, _IN_STRING):
+                self._step(text[i])
+                i += 1
+            elif self._escape:
+                if self._escape_char(text[i]):
+                    i += 1
+            else:
+                match = _STRING_SPECIAL.search(text, i)
+                stop = match.start() if match else end
+                if stop > i:
+                    self._append(text[i:stop])
+                    i = stop
+                elif text[i] == '\\':
+                    self._escape = '\\'
+                    i += 1
+                else:
+                    self._close_string()
+                    i += 1
+
+    def _append(self, decoded: str) -> None:
+        self._flush_surrogate()
+        self._pieces.append(decoded)
+
+    def _flush_surrogate(self) -> None:
+        """Emit a high surrogate that was not followed by its low half."""
+        if self._high_surrogate:
+            self._pieces.append(self._high_surrogate)
+            self._high_surrogate = ''
+
+    def _escape_char(self, char: str) -> bool:
+        """Extend the pending escape sequence; False if `char` must be scanned again."""
+        sequence = self._escape + char
+        if len(sequence) == 2:
+            if char == 'u':
+                self._escape = sequence
+            else:
+                self._escape = ''
+                self._append(_ESCAPES.get(char, char))
+            return True
+        if char not in _HEX_DIGITS:
+            # Malformed \u escape: keep its text and rescan the character
+            self._escape = ''
+            self._append(sequence[:-1])
+            return False
+        if len(sequence) < 6:
+            self._escape = sequence
+            return True
+        self._escape = ''
+        code = int(sequence[2:], 16)
+        if 0xD800 <= code <= 0xDBFF:
+            self._flush_surrogate()
+            self._high_surrogate = chr(code)
+        elif 0xDC00 <= code <= 0xDFFF and self._high_surrogate:
+            high, self._high_surrogate = ord(self._high_surrogate), ''
+            self._pieces.append(chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)))
+        else:
+            self._append(chr(code))
+        return True
+
+    def _close_string(self) -> None:
+        if self._escape:
+            self._append(self._escape)
+            self._escape = ''
+        self._flush_surrogate()
+        value = ''.join(self._pieces)
+        if self._state == _IN_KEY:
+            self._current_key = value
+            self._state = _COLON
+        else:
+            self._store(value)
+            self._state = _COMMA_OR_END
+
+    def _start_string(self, state: int) -> None:
+        self._pieces = []
+        self._escape = ''
+        self._high_surrogate = ''
+        if state == _IN_STRING and self._current_key == 'message':
+            self._message_pieces = self._pieces
+            self._delta_from = 0
+        self._state = state
+
+    def _step(self, char: str) -> None:
+        state = self._state
+        if state == _START:
+            if char == '{':
+                self._state = _KEY_OR_END
+        elif state == _KEY_OR_END:
+            if char == '"':
+                self._start_string(_IN_KEY)
+            elif char == '}':
+                self._finish_object()
+        elif state == _COLON:
+            if char == ':':
+                self._state = _VALUE
+        elif state == _VALUE:
+            if char == '"':
+                self._start_string(_IN_STRING)
+            elif char in '{[':
+                self._depth = 1
+                self._state = _IN_NESTED
+            elif not char.isspace():
+                self._state = _IN_SCALAR
+        elif state == _IN_SCALAR:
+            if char == ',':
+                self._state = _KEY_OR_END
+            elif char == '}':
+                self._finish_object()
+        elif state == _IN_NESTED:
+            self._skip_nested(char)
+        elif state == _COMMA_OR_END:
+            if char == ',':
+                self._state = _KEY_OR_END
+            elif char == '}':
+                self._finish_object()
+
+    def _skip_nested(self, char: str) -> None:
+        if self._nested_in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == '\\':
+                self._escaped = True
+            elif char == '"':
+                self._nested_in_string = False
+        elif char == '"':
+            self._nested_in_string = True
+        elif char in '{[':
+            self._depth += 1
+        elif char in '}]':
+            self._depth -= 1
+            if self._depth == 0:
+                self._state = _COMMA_OR_END
+
+    def _store(self, value: str) -> None:
+        key = self._current_key
+        if key is None:
+            return
+        self.values[key] = value
+        if key == 'status' and value in self.allowed_status and self._status is None:
+            self._set_status(value)
+
+    def _set_status(self, value: str) -> None:
+        self._status = value
+        if self._started_at is not None:
+            self.status_latency = time.perf_counter() - self._started_at
+
+    def _finish_object(self) -> None:
+        self.complete = True
+        self._state = _DONE
+
+    @property
+    def partial_message(self) -> str:
+        """The `message` value decoded so far, even if still streaming.
+
+        This joins the whole message; while streaming use `take_message_delta`.
+        """
+        self._scan()
+        if self._message_pieces is None:
+            return self.values.get('message', '')
+        return ''.join(self._message_pieces)
+
+    def take_message_delta(self) -> str:
+        """The `message` text decoded since the previous call.
+
+        An escape sequence or surrogate pair split across chunks is held back
+        until it is complete.
+        """
+        self._scan()
+        pieces = self._message_pieces
+        if pieces is None or self._delta_from == len(pieces):
+            return ''
+        delta = ''.join(pieces[self._delta_from:])
+        self._delta_from = len(pieces)
+        return delta
+
+    def result(self) -> BaseModel | None:
+        """Build the model from what has been parsed.
+
+        Returns:
+            The model instance, recovered from truncated or plain-text output
+            where possible, or None if there was no output at all.
+        """
+        raw = ''.join(self.raw_parts)
+        if not raw.strip():
+            return None
+
+        started = time.perf_counter()
+        try:
+            parsed = self.model.model_validate_json(raw)
+        except ValidationError:
+            parsed = None
+        finally:
+            self.parse_seconds += time.perf_counter() - started
+        self.fast_path = parsed is not None
+        if parsed is not None:
+            if self._status is None:
+                self._set_status(parsed.status)
+            return parsed
+
+        self._scan()
+        if self.complete:
+            try:
+                return self.model.model_validate(self.values)
+            except ValueError:
+                logger.warning('Structured response did not validate; recovering partial answer')
+        elif self._state == _START:
+            # No JSON object at all - treat the text as the message.
+            logger.warning('Structured response was not JSON; using raw text')
+            return self.model(message=raw.strip())
+        else:
+            logger.warning('Structured response was truncated; recovering partial answer')
+
+        data: dict[str, Any] = {'message': self.partial_message or ''}
+        if self._status:
+            data['status'] = self._status
+        return self.model.model_validate(data)
+
+    def timings(self) -> dict[str, float | None]:
+        """Parse timings in milliseconds, and whether strict validation sufficed."""
+        return {
+            'fast_path': self.fast_path,
+            'parse_ms': round(self.parse_seconds * 1000, 3),
+            'status_latency_ms': (
+                round(self.status_latency * 1000, 3)
+                if self.status_latency is not None
+                else None
+            ),
+        }
+
+
+def parse_response_format(model: type[BaseModel], text: str | None) -> BaseModel | None:
+    """Parse a complete structured response, strictly first and tolerantly on failure.
+
+    Args:
+        model: The response model, e.g. `ResponseFormat`.
+        text: The full model output.
+
+    Returns:
+        The model instance or None if nothing could be recovered.
+    """
+    parser = ResponseFormatParser(model)
+    parser.feed(text or '')
+    return parser.result()
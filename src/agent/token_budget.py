@@ -0,0 +1,311 @@
+"""Token accounting and budgets per session and per API key.
+
+Every agent turn reports the tokens it used in the Semantic Kernel usage
+data: the TravelManagerAgent's own completions plus those of the specialist
+agents it called as plugins. `TokenBudgets` adds them up per session and per
+tenant (API key) over a fixed window and decides how the next turn of that
+session may run:
+
+* ``normal``: below `degrade_at` of every budget.
+* ``degraded``: close to (or, with ``on_exceeded='degrade'``, over) a budget;
+  the turn runs with a shorter chat history and, when configured, a cheaper
+  deployment.
+* ``rejected``: over a budget with ``on_exceeded='reject'``; the turn is
+  refused until the window resets.
+
+API keys are never stored; tenants are identified by a short hash of the key.
+The key is taken as the caller presents it: per-tenant budgets only hold
+against callers who cannot pick another key, so they need an authentication
+layer in front of the app that validates `X-API-Key`.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from .prompt_cache import _usage_value
+
+logger = logging.getLogger(__name__)
+
+Scope = Literal['session', 'tenant']
+ANONYMOUS_TENANT = 'anonymous'
+
+
+def tenant_id(api_key: str | None) -> str:
+    """Stable, non-reversible identifier of the tenant owning an API key."""
+    if not api_key:
+        return ANONYMOUS_TENANT
+    return 'key-' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+
+class TokenBudgetExceeded(Exception):
+    """Raised when a turn is rejected because a token budget is spent."""
+
+    def __init__(self, decision: 'BudgetDecision'):
+        super().__init__(
+            f'Token budget exceeded for {decision.scope} {decision.key}: '
+            f'{decision.used}/{decision.limit} tokens; retry in {decision.retry_after:.0f}s'
+        )
+        self.decision = decision
+
+
+@dataclass(frozen=True)
+class BudgetDecision:
+    """How the next turn may run, and the budget that decided it.
+
+    Attributes:
+        mode: `normal`, `degraded` or `rejected`.
+        scope: Scope of the most used budget, if any budget applies.
+        key: Session id or tenant id of that budget.
+        used: Tokens used in the current window.
+        limit: Tokens allowed per window.
+        retry_after: Seconds until the window resets.
+    """
+
+    mode: Literal['normal', 'degraded', 'rejected']
+    scope: Scope | None = None
+    key: str | None = None
+    used: int = 0
+    limit: int | None = None
+    retry_after: float = 0.0
+
+    @property
+    def degraded(self) -> bool:
+        return self.mode == 'degraded'
+
+    @property
+    def rejected(self) -> bool:
+        return self.mode == 'rejected'
+
+
+class _Usage:
+    __slots__ = (
+        'window_start', 'window_tokens', 'prompt_tokens', 'completion_tokens', 'sub_agent_tokens',
+        'turns', 'degraded', 'rejected',
+    )
+
+    def __init__(self, now: float):
+        self.window_start = now
+        self.window_tokens = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.sub_agent_tokens = 0
+        self.turns = 0
+        self.degraded = 0
+        self.rejected = 0
+
+    def roll(self, now: float, window: float) -> None:
+        if now - self.window_start >= window:
+            self.window_start = now - (now - self.window_start) % window
+            self.window_tokens = 0
+
+
+class TokenBudgets:
+    """Thread-safe token accounting with per-session and per-tenant budgets.
+
+    Args:
+        session_tokens: Tokens a session may use per window; None for no limit.
+        tenant_tokens: Tokens an API key may use per window; None for no limit.
+        window_seconds: Length of the budget window.
+        degrade_at: Fraction of a budget above which turns are degraded.
+        on_exceeded: `reject` or `degrade` once a budget is spent.
+        max_sessions: Number of sessions, and of tenants, tracked; the least
+            recently used are dropped. Tenant ids come from an unauthenticated
+            header, so they are capped like sessions.
+    """
+
+    def __init__(
+        self,
+        session_tokens: int | None = None,
+        tenant_tokens: int | None = None,
+        window_seconds: float = 3600.0,
+        degrade_at: float = 0.8,
+        on_exceeded: Literal['reject', 'degrade'] = 'reject',
+        max_sessions: int = 10000,
+    ):
+        self.limits: dict[Scope, int | None] = {'session': session_tokens, 'tenant': tenant_tokens}
+        self.window_seconds = window_seconds
+        self.degrade_at = degrade_at
+        self.on_exceeded = on_exceeded
+        self.max_sessions = max_sessions
+        self.overrides: dict[tuple[Scope, str], int | None] = {}
+        self._usage: dict[Scope, OrderedDict[str, _Usage]] = {'session': OrderedDict(), 'tenant': OrderedDict()}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'TokenBudgets':
+        """Build budgets from `TOKEN_BUDGET_*` environment variables (0 means no limit)."""
+        session_tokens = int(os.getenv('TOKEN_BUDGET_SESSION_TOKENS', '0'))
+        tenant_tokens = int(os.getenv('TOKEN_BUDGET_API_KEY_TOKENS', '0'))
+        on_exceeded = os.getenv('TOKEN_BUDGET_ON_EXCEEDED', 'reject').lower()
+        return cls(
+            session_tokens=session_tokens or None,
+            tenant_tokens=tenant_tokens or None,
+            window_seconds=float(os.getenv('TOKEN_BUDGET_WINDOW_SECONDS', '3600')),
+            degrade_at=float(os.getenv('TOKEN_BUDGET_DEGRADE_AT', '0.8')),
+            on_exceeded='degrade' if on_exceeded == 'degrade' else 'reject',
+        )
+
+    def _entry(self, scope: Scope, key: str, now: float) -> _Usage:
+        entries = self._usage[scope]
+        usage = entries.get(key)
+        if usage is None:
+            usage = entries[key] = _Usage(now)
+            if len(entries) > self.max_sessions:
+                entries.popitem(last=False)
+        else:
+            entries.move_to_end(key)
+            usage.roll(now, self.window_seconds)
+        return usage
+
+    def limit(self, scope: Scope, key: str) -> int | None:
+        """Effective per-window limit of one session or tenant."""
+        return self.overrides.get((scope, key), self.limits[scope])
+
+    def set_limit(self, scope: Scope, key: str, tokens: int | None) -> None:
+        """Override the budget of one session or tenant; None removes the override."""
+        with self._lock:
+            if tokens is None:
+                self.overrides.pop((scope, key), None)
+            else:
+                self.overrides[(scope, key)] = tokens
+
+    def check(self, session_id: str, api_key: str | None = None) -> BudgetDecision:
+        """Decide how the next turn may run, without recording anything."""
+        now = time.monotonic()
+        worst: BudgetDecision = BudgetDecision('normal')
+        worst_ratio = -1.0
+        with self._lock:
+            for scope, key in (('session', session_id), ('tenant', tenant_id(api_key))):
+                limit = self.limit(scope, key)
+                if not limit:
+                    continue
+                usage = self._usage[scope].get(key)
+                if usage is not None:
+                    usage.roll(now, self.window_seconds)
+                used = usage.window_tokens if usage else 0
+                ratio = used / limit
+                if ratio <= worst_ratio:
+                    continue
+                worst_ratio = ratio
+                if ratio >= 1.0:
+                    mode = 'rejected' if self.on_exceeded == 'reject' else 'degraded'
+                elif ratio >= self.degrade_at:
+                    mode = 'degraded'
+                else:
+                    mode = 'normal'
+                retry_after = self.window_seconds - (now - usage.window_start) if usage else 0.0
+                worst = BudgetDecision(mode, scope, key, used, limit, max(retry_after, 0.0))
+        return worst
+
+    def enforce(self, session_id: str, api_key: str | None = None) -> BudgetDecision:
+        """Check the budgets for a turn that is about to run and count the decision.
+
+        Raises:
+            TokenBudgetExceeded: If the turn is rejected.
+        """
+        decision = self.check(session_id, api_key)
+        if decision.mode != 'normal':
+            now = time.monotonic()
+            with self._lock:
+                for usage in (self._entry('session', session_id, now), self._entry('tenant', tenant_id(api_key), now)):
+                    if decision.rejected:
+                        usage.rejected += 1
+                    else:
+                        usage.degraded += 1
+            logger.info(f'Token budget {decision.mode} for {decision.scope} {decision.key} ({decision.used}/{decision.limit})')
+        if decision.rejected:
+            raise TokenBudgetExceeded(decision)
+        return decision
+
+    def record(
+        self,
+        session_id: str,
+        api_key: str | None,
+        usage: Any,
+        fallback_tokens: int = 0,
+        sub_agent_usage: Iterable[Any] = (),
+    ) -> int:
+        """Add the usage of one completed turn to its session and tenant.
+
+        Args:
+            session_id: Session of the turn.
+            api_key: API key of the caller, if any.
+            usage: SK/OpenAI usage object or dict of the TravelManagerAgent; may be None.
+            fallback_tokens: Estimated tokens counted when no usage was reported.
+            sub_agent_usage: Usage of each specialist agent call made during the turn.
+
+        Returns:
+            int: Tokens counted.
+        """
+        prompt_tokens = _usage_value(usage, 'prompt_tokens')
+        completion_tokens = _usage_value(usage, 'completion_tokens')
+        if usage is None:
+            prompt_tokens = fallback_tokens
+        sub_agent_tokens = 0
+        for call_usage in sub_agent_usage:
+            call_prompt = _usage_value(call_usage, 'prompt_tokens')
+            call_completion = _usage_value(call_usage, 'completion_tokens')
+            prompt_tokens += call_prompt
+            completion_tokens += call_completion
+            sub_agent_tokens += call_prompt + call_completion
+        now = time.monotonic()
+        with self._lock:
+            for entry in (self._entry('session', session_id, now), self._entry('tenant', tenant_id(api_key), now)):
+                entry.window_tokens += prompt_tokens + completion_tokens
+                entry.prompt_tokens += prompt_tokens
+                entry.completion_tokens += completion_tokens
+                entry.sub_agent_tokens += sub_agent_tokens
+                entry.turns += 1
+        return prompt_tokens + completion_tokens
+
+    def snapshot(self, top: int = 20) -> dict[str, Any]:
+        """Return a JSON-serializable view of budgets and the heaviest users."""
+        now = time.monotonic()
+
+        def describe(scope: Scope, key: str, usage: _Usage) -> dict[str, Any]:
+            usage.roll(now, self.window_seconds)
+            limit = self.limit(scope, key)
+            return {
+                'key': key,
+                'window_tokens': usage.window_tokens,
+                'limit': limit,
+                'remaining': max(limit - usage.window_tokens, 0) if limit else None,
+                'prompt_tokens': usage.prompt_tokens,
+                'completion_tokens': usage.completion_tokens,
+                'sub_agent_tokens': usage.sub_agent_tokens,
+                'turns': usage.turns,
+                'degraded': usage.degraded,
+                'rejected': usage.rejected,
+                'window_resets_in': round(max(self.window_seconds - (now - usage.window_start), 0.0), 1),
+            }
+
+        with self._lock:
+            result: dict[str, Any] = {
+                'limits': {
+                    'session_tokens': self.limits['session'],
+                    'api_key_tokens': self.limits['tenant'],
+                    'window_seconds': self.window_seconds,
+                    'degrade_at': self.degrade_at,
+                    'on_exceeded': self.on_exceeded,
+                },
+                'overrides': [
+                    {'scope': scope, 'key': key, 'tokens': tokens}
+                    for (scope, key), tokens in self.overrides.items()
+                ],
+            }
+            for scope, name in (('session', 'sessions'), ('tenant', 'api_keys')):
+                entries = [describe(scope, key, usage) for key, usage in self._usage[scope].items()]
+                entries.sort(key=lambda entry: entry['window_tokens'], reverse=True)
+                result[name] = {'tracked': len(entries), 'top': entries[:top]}
+        return result
+
+
+token_budgets = TokenBudgets.from_env()
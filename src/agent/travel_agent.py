@@ -1,37 +1,59 @@
 import asyncio
 import logging
 import os
+import time
 
-from collections.abc import AsyncIterable
+from collections import OrderedDict
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager, suppress
+from contextvars import ContextVar
 from enum import Enum
+from datetime import date, timedelta
+from pathlib import Path
 from typing import TYPE_CHECKING, Annotated, Any, Literal
 
 import httpx
-import openai
 
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
 from dotenv import load_dotenv
 from pydantic import BaseModel
 from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread
+from semantic_kernel.connectors.ai.function_calling_utils import (
+    kernel_function_metadata_to_function_call_format,
+)
 from semantic_kernel.connectors.ai.open_ai import (
     AzureChatCompletion,
     OpenAIChatCompletion,
     OpenAIChatPromptExecutionSettings,
 )
 from semantic_kernel.contents import (
+    ChatHistoryTruncationReducer,
     FunctionCallContent,
     FunctionResultContent,
-    StreamingChatMessageContent,
     StreamingTextContent,
 )
+from semantic_kernel.filters import FilterTypes
 from semantic_kernel.functions import KernelArguments, kernel_function
 
+from src.auth import get_token_manager
+
+from .progress import ProgressTracker
+from .prompt_cache import PromptPrefix, normalize_instructions, prompt_cache_stats
+from .response_parser import ResponseFormatParser, parse_response_format
+from .token_budget import BudgetDecision, token_budgets
+
 
 if TYPE_CHECKING:
     from semantic_kernel.connectors.ai.chat_completion_client_base import (
         ChatCompletionClientBase,
     )
     from semantic_kernel.contents import ChatMessageContent
+    from semantic_kernel.filters import FunctionInvocationContext
+
+    from .fx_history import FxHistoryStore
+    from .fx_matrix import CrossRateMatrix
+    from .fx_snapshot import FxSnapshotReader
+    from .poi_index import PoiIndex
+    from .vector_index import VectorIndex
 
 logger = logging.getLogger(__name__)
 
@@ -52,11 +74,14 @@ service_id = 'default'
 
 def get_chat_completion_service(
     service_name: ChatServices,
+    deployment_name: str | None = None,
 ) -> 'ChatCompletionClientBase':
     """Return an appropriate chat completion service based on the service name.
 
     Args:
         service_name (ChatServices): Service name.
+        deployment_name (str | None): Deployment (Azure OpenAI) or model (OpenAI)
+            to use instead of the configured default.
 
     Returns:
         ChatCompletionClientBase: Configured chat completion service.
@@ -65,20 +90,25 @@ def get_chat_completion_service(
         ValueError: If the service name is not supported or required environment variables are missing.
     """
     if service_name == ChatServices.AZURE_OPENAI:
-        return _get_azure_openai_chat_completion_service()
+        return _get_azure_openai_chat_completion_service(deployment_name)
     if service_name == ChatServices.OPENAI:
-        return _get_openai_chat_completion_service()
+        return _get_openai_chat_completion_service(deployment_name)
     raise ValueError(f'Unsupported service name: {service_name}')
 
 
-def _get_azure_openai_chat_completion_service() -> AzureChatCompletion:
+def _get_azure_openai_chat_completion_service(
+    deployment_name: str | None = None,
+) -> AzureChatCompletion:
     """Return Azure OpenAI chat completion service with managed identity.
 
+    Args:
+        deployment_name (str | None): Deployment to use instead of AZURE_OPENAI_DEPLOYMENT_NAME.
+
     Returns:
         AzureChatCompletion: The configured Azure OpenAI service.
     """
     endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
-    deployment_name = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
+    deployment_name = deployment_name or os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
     api_version = os.getenv('AZURE_OPENAI_API_VERSION')
     api_key = os.getenv('AZURE_OPENAI_API_KEY')
 
@@ -91,10 +121,12 @@ def _get_azure_openai_chat_completion_service() -> AzureChatCompletion:
 
     # Use managed identity if no API key is provided
     if not api_key:
-        # Create Azure credential for managed identity
-        credential = DefaultAzureCredential()
-        token_provider = get_bearer_token_provider(
-            credential, "https://cognitiveservices.azure.com/.default"
+        # Imported here: the OpenAI SDK is slow to import
+        import openai
+
+        # Tokens come from the shared, proactively refreshed token cache
+        token_provider = get_token_manager().bearer_token_provider(
+            "https://cognitiveservices.azure.com/.default"
         )
         
         # Create OpenAI client with managed identity
@@ -120,15 +152,20 @@ def _get_azure_openai_chat_completion_service() -> AzureChatCompletion:
         )
 
 
-def _get_openai_chat_completion_service() -> OpenAIChatCompletion:
+def _get_openai_chat_completion_service(
+    model_id: str | None = None,
+) -> OpenAIChatCompletion:
     """Return OpenAI chat completion service.
 
+    Args:
+        model_id (str | None): Model to use instead of OPENAI_MODEL_ID.
+
     Returns:
         OpenAIChatCompletion: Configured OpenAI service.
     """
     return OpenAIChatCompletion(
         service_id=service_id,
-        ai_model_id=os.getenv('OPENAI_MODEL_ID'),
+        ai_model_id=model_id or os.getenv('OPENAI_MODEL_ID'),
         api_key=os.getenv('OPENAI_API_KEY'),
     )
 
@@ -141,9 +178,140 @@ def _get_openai_chat_completion_service() -> OpenAIChatCompletion:
 class CurrencyPlugin:
     """A simple currency plugin that leverages Frankfurter for exchange rates.
 
-    The Plugin is used by the `currency_exchange_agent`.
+    The Plugin is used by the `currency_exchange_agent`. Rates are fetched
+    for a whole base currency at once over a pooled connection and cached
+    per (date, base); 'latest' rates expire after `LATEST_RATES_TTL` seconds.
+    'latest' rates are read from the shared snapshot file first (see
+    `fx_snapshot`), which also serves as fallback when Frankfurter is down.
     """
 
+    LATEST_RATES_TTL = 600
+    SNAPSHOT_MAX_AGE = 1800
+    # Frankfurter thins out long ranges, so history is fetched in chunks
+    HISTORY_CHUNK_DAYS = 90
+
+    _client: httpx.Client | None = None
+    _rates_cache: dict[tuple[str, str], tuple[float, dict[str, float]]] = {}
+    _history_store: 'FxHistoryStore | None' = None
+    _matrix_cache: dict[str, tuple[float, 'CrossRateMatrix']] = {}
+    _snapshot_reader: 'FxSnapshotReader | None' = None
+    # Frankfurter's reference currency; one fetch against it yields every cross rate
+    MATRIX_BASE = 'EUR'
+
+    @classmethod
+    def _http_client(cls) -> httpx.Client:
+        if cls._client is None:
+            cls._client = httpx.Client(
+                base_url=os.getenv('FRANKFURTER_API_URL', 'https://api.frankfurter.app'),
+                timeout=10.0,
+            )
+        return cls._client
+
+    @classmethod
+    def snapshot_rates(cls, base: str) -> tuple[str, float, dict[str, float]] | None:
+        """Return (rate date, age in seconds, rates) from the shared snapshot file, if any."""
+        if cls._snapshot_reader is None:
+            from .fx_snapshot import FxSnapshotReader
+
+            cls._snapshot_reader = FxSnapshotReader(os.getenv('FX_SNAPSHOT_PATH', 'data/fx_snapshot.bin'))
+        try:
+            return cls._snapshot_reader.read(base)
+        except Exception as e:
+            logger.warning(f'Could not read FX snapshot: {e}')
+            return None
+
+    @classmethod
+    def get_rates(cls, base: str, date: str = 'latest') -> dict[str, float]:
+        """Return all rates for a base currency, from cache when fresh.
+
+        Args:
+            base (str): Base currency code, e.g. USD.
+            date (str): Date (YYYY-MM-DD) or 'latest'.
+
+        Returns:
+            dict[str, float]: Rates keyed by target currency code.
+        """
+        base = base.upper()
+        key = (date, base)
+        cached = cls._rates_cache.get(key)
+        if cached is not None and (
+            date != 'latest' or time.monotonic() - cached[0] < cls.LATEST_RATES_TTL
+        ):
+            return cached[1]
+
+        snapshot = cls.snapshot_rates(base) if date == 'latest' else None
+        if snapshot is not None and snapshot[1] < cls.SNAPSHOT_MAX_AGE:
+            return snapshot[2]
+
+        try:
+            response = cls._http_client().get(f'/{date}', params={'from': base})
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            if snapshot is None:
+                raise
+            logger.warning(f'Frankfurter unavailable ({e}); using FX snapshot of {snapshot[0]}')
+            return snapshot[2]
+        rates = response.json().get('rates', {})
+        cls._rates_cache[key] = (time.monotonic(), rates)
+        return rates
+
+    @classmethod
+    def fetch_rate_range(cls, base: str, start: date, end: date) -> dict[str, dict[str, float]]:
+        """Fetch all rates of a base currency for a date range.
+
+        Args:
+            base (str): Base currency code, e.g. USD.
+            start (date): First date.
+            end (date): Last date.
+
+        Returns:
+            dict[str, dict[str, float]]: Rates keyed by date, then target currency code.
+        """
+        rates: dict[str, dict[str, float]] = {}
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=cls.HISTORY_CHUNK_DAYS - 1), end)
+            response = cls._http_client().get(
+                f'/{chunk_start.isoformat()}..{chunk_end.isoformat()}', params={'from': base}
+            )
+            response.raise_for_status()
+            rates.update(response.json().get('rates', {}))
+            chunk_start = chunk_end + timedelta(days=1)
+        return rates
+
+    @classmethod
+    def cross_rates(cls, date: str = 'latest') -> 'CrossRateMatrix':
+        """Return the cross-rate matrix for a date, derived from one base-currency fetch.
+
+        Args:
+            date (str): Date (YYYY-MM-DD) or 'latest'.
+
+        Returns:
+            CrossRateMatrix: Cross rates between all quoted currencies.
+        """
+        cached = cls._matrix_cache.get(date)
+        if cached is not None and (
+            date != 'latest' or time.monotonic() - cached[0] < cls.LATEST_RATES_TTL
+        ):
+            return cached[1]
+
+        from .fx_matrix import CrossRateMatrix
+
+        matrix = CrossRateMatrix(cls.MATRIX_BASE, cls.get_rates(cls.MATRIX_BASE, date))
+        cls._matrix_cache[date] = (time.monotonic(), matrix)
+        return matrix
+
+    @classmethod
+    def history_store(cls) -> 'FxHistoryStore':
+        """Return the shared historical rate store, created on first use."""
+        if cls._history_store is None:
+            from .fx_history import FxHistoryStore
+
+            cls._history_store = FxHistoryStore(
+                os.getenv('FX_HISTORY_DIR', 'data/fx_history'), cls.fetch_rate_range
+            )
+        return cls._history_store
+
     @kernel_function(
         description='Retrieves exchange rate between currency_from and currency_to using Frankfurter API'
     )
@@ -158,20 +326,230 @@ class CurrencyPlugin:
         date: Annotated[str, "Date or 'latest'"] = 'latest',
     ) -> str:
         try:
-            response = httpx.get(
-                f'https://api.frankfurter.app/{date}',
-                params={'from': currency_from, 'to': currency_to},
-                timeout=10.0,
-            )
-            response.raise_for_status()
-            data = response.json()
-            if 'rates' not in data or currency_to not in data['rates']:
+            if currency_from.upper() == currency_to.upper():
+                return f'1 {currency_from} = 1 {currency_to}'
+            rates = self.get_rates(currency_from, date)
+            if currency_to.upper() not in rates:
                 return f'Could not retrieve rate for {currency_from} to {currency_to}'
-            rate = data['rates'][currency_to]
+            rate = rates[currency_to.upper()]
             return f'1 {currency_from} = {rate} {currency_to}'
         except Exception as e:
             return f'Currency API call failed: {e!s}'
 
+    @kernel_function(
+        description=(
+            'Converts a whole list of expenses in different currencies into one target currency in a '
+            'single call, returning each converted item and the total. Use this for budgets and '
+            'itinerary cost totals instead of converting items one by one.'
+        )
+    )
+    def convert_expenses(
+        self,
+        expenses: Annotated[
+            str,
+            'Expenses as a JSON array of {"description", "amount", "currency"} objects, '
+            "or entries like '120 EUR hotel; 45 CHF train' separated by semicolons or newlines",
+        ],
+        target_currency: Annotated[str, 'Currency code to total in, e.g. USD'],
+        date: Annotated[str, "Date or 'latest'"] = 'latest',
+    ) -> str:
+        import numpy as np
+
+        from .fx_matrix import parse_expenses
+
+        try:
+            items = parse_expenses(expenses)
+        except (ValueError, KeyError, TypeError) as e:
+            return f'Could not read the expense list: {e!s}'
+        if not items:
+            return 'No expenses to convert'
+
+        target = target_currency.upper()
+        try:
+            matrix = self.cross_rates(date)
+        except Exception as e:
+            return f'Currency API call failed: {e!s}'
+        unknown = sorted(({item['currency'] for item in items} | {target}) - set(matrix.index))
+        if unknown:
+            return f"No exchange rates available for: {', '.join(unknown)}"
+
+        amounts = np.array([item['amount'] for item in items])
+        converted = matrix.convert(amounts, [item['currency'] for item in items], target)
+        lines = [
+            f"- {item['description'] or 'item'}: {item['amount']:,.2f} {item['currency']} = {value:,.2f} {target}"
+            for item, value in zip(items, converted.tolist())
+        ]
+        lines.append(f'Total: {converted.sum():,.2f} {target} (rates: {date})')
+        return '\n'.join(lines)
+
+    @kernel_function(
+        description=(
+            'Summarizes how the exchange rate between currency_from and currency_to moved over a '
+            'date range: min, max, average, overall change, trend and volatility, in one call. '
+            'Use this instead of asking for the rate day by day.'
+        )
+    )
+    def get_exchange_rate_history(
+        self,
+        currency_from: Annotated[str, 'Currency code to convert from, e.g. USD'],
+        currency_to: Annotated[str, 'Currency code to convert to, e.g. JPY'],
+        start_date: Annotated[str, 'First date, YYYY-MM-DD'],
+        end_date: Annotated[str, "Last date, YYYY-MM-DD or 'today'"] = 'today',
+    ) -> str:
+        try:
+            start = date.fromisoformat(start_date)
+            end = date.today() if end_date == 'today' else date.fromisoformat(end_date)
+            if start > end:
+                start, end = end, start
+            summary = self.history_store().summarize(currency_from, currency_to, start, end)
+            if summary is None:
+                return f'No rates available for {currency_from} to {currency_to} between {start} and {end}'
+            pair = f'{currency_from.upper()}/{currency_to.upper()}'
+            return (
+                f"{pair} from {summary['first_date']} to {summary['last_date']} "
+                f"({summary['observations']} trading days): "
+                f"first {summary['first']:.6g}, last {summary['last']:.6g}, "
+                f"change {summary['change_pct']:+.2f}%; "
+                f"min {summary['min']:.6g} on {summary['min_date']}, "
+                f"max {summary['max']:.6g} on {summary['max_date']}, "
+                f"average {summary['average']:.6g}; "
+                f"trend {summary['trend_per_day']:+.4g} per day, "
+                f"daily volatility {summary['volatility_pct']:.2f}%"
+            )
+        except ValueError as e:
+            return f'Invalid date range: {e!s}'
+        except Exception as e:
+            return f'Currency API call failed: {e!s}'
+
+
+class PointsOfInterestPlugin:
+    """Looks up attractions, museums, parks, markets and food spots in a local dataset.
+
+    The Plugin is used by the `activity_planner_agent` so recommendations are
+    grounded in known places. The index is loaded on first use from
+    `POI_DATASET_PATH` (JSON Lines; a small bundled dataset by default).
+    """
+
+    _index: 'PoiIndex | None' = None
+
+    @classmethod
+    def index(cls) -> 'PoiIndex':
+        """Return the shared POI index, loading it on first use."""
+        if cls._index is None:
+            from .poi_index import DEFAULT_DATASET, PoiIndex
+
+            cls._index = PoiIndex.load(os.getenv('POI_DATASET_PATH') or DEFAULT_DATASET)
+        return cls._index
+
+    @kernel_function(
+        description=(
+            'Finds real places to visit in a city: attractions, museums, parks, markets, food, '
+            'shopping, tours. Filters by category, tags, price level and distance from a place, '
+            'and returns the top matches. Use it before recommending places.'
+        )
+    )
+    def find_places(
+        self,
+        city: Annotated[str, 'City name, e.g. Paris'] = '',
+        category: Annotated[
+            str, 'One of attraction, museum, park, market, food, shopping, tour; empty for any'
+        ] = '',
+        tags: Annotated[str, 'Comma-separated tags, e.g. "free,views" or "street-food"'] = '',
+        near: Annotated[str, 'A place name or "lat,lon" to search around; empty for anywhere'] = '',
+        radius_km: Annotated[float, 'Search radius around `near` in km, at most 50'] = 2.0,
+        max_price_level: Annotated[int, 'Maximum price level, 0 (free) to 4 (expensive)'] = 4,
+        limit: Annotated[int, 'Maximum number of places'] = 5,
+    ) -> str:
+        try:
+            index = self.index()
+            location = None
+            if near:
+                location = index.resolve_location(near)
+                if location is None:
+                    return f'Unknown location: {near}'
+            results = index.search(
+                city=city or None,
+                category=category or None,
+                tags=[tag for tag in tags.split(',') if tag.strip()],
+                near=location,
+                radius_km=radius_km,
+                max_price=max_price_level,
+                k=max(1, min(limit, 20)),
+            )
+        except Exception as e:
+            return f'Place lookup failed: {e!s}'
+        if not results:
+            return 'No matching places in the local dataset'
+        return '\n'.join(
+            f"- {place['name']} ({place['category']}, {place['city']}; "
+            f"price {'$' * place['price_level'] or 'free'}; rating {place['rating']}"
+            + (f"; {place['distance_km']} km away" if 'distance_km' in place else '')
+            + f"; {', '.join(place['tags'])})"
+            for place in results
+        )
+
+
+class DestinationGuidePlugin:
+    """Searches a corpus of destination guides through a local vector index.
+
+    The Plugin is used by the `activity_planner_agent` for practical questions
+    about a destination (transport, etiquette, tipping, neighbourhoods). The
+    index in `GUIDE_INDEX_DIR` is built offline or by `prepare` during
+    start-up, never while answering a request, and opened on first use.
+    """
+
+    _index: 'VectorIndex | None' = None
+
+    @staticmethod
+    def directory() -> Path:
+        return Path(os.getenv('GUIDE_INDEX_DIR', 'data/guide_index'))
+
+    @classmethod
+    def prepare(cls) -> 'VectorIndex':
+        """Build the index from the bundled guides if it is missing or stale, and open it."""
+        from .vector_index import ensure_index
+
+        ensure_index(cls.directory())
+        return cls.index()
+
+    @classmethod
+    def index(cls) -> 'VectorIndex':
+        """Return the shared guide index, opening it on first use."""
+        if cls._index is None:
+            from .vector_index import VectorIndex
+
+            directory = cls.directory()
+            if not (directory / 'meta.json').exists():
+                raise FileNotFoundError(
+                    f'guide index {directory} is not built; run python -m src.agent.vector_index'
+                )
+            cls._index = VectorIndex(directory)
+        return cls._index
+
+    @kernel_function(
+        description=(
+            'Searches destination travel guides for practical advice: getting around, tickets, '
+            'etiquette, tipping, food customs, neighbourhoods and safety. Returns the most '
+            'relevant guide passages.'
+        )
+    )
+    def search_guides(
+        self,
+        query: Annotated[str, 'What the traveler wants to know, e.g. "how to pay for the subway"'],
+        destination: Annotated[str, 'City name to restrict the search to; empty for any'] = '',
+        limit: Annotated[int, 'Maximum number of passages'] = 3,
+    ) -> str:
+        try:
+            index = self.index()
+            limit = max(1, min(limit, 10))
+            # Only the destination's guides are scored, so the filter cannot empty the top k
+            results = index.search(query, k=limit, destination=destination.strip())
+        except Exception as e:
+            return f'Guide search failed: {e!s}'
+        if not results:
+            return f'No guide for {destination}' if destination.strip() else 'No matching guide passages'
+        return '\n\n'.join(f"[{r['title']}] {r['text']}" for r in results)
+
 
 # endregion
 
@@ -185,32 +563,187 @@ class ResponseFormat(BaseModel):
     message: str
 
 
+# endregion
+
+# region Agent Instructions
+
+# The instructions are part of the cacheable request prefix. Keep them as
+# module-level constants so every turn sends byte-identical system prompts.
+
+CURRENCY_EXCHANGE_INSTRUCTIONS = normalize_instructions(
+    'You specialize in handling currency-related requests from travelers. '
+    'This includes providing current exchange rates, converting amounts between different currencies, '
+    'explaining fees or charges related to currency exchange, and giving advice on the best practices for exchanging currency. '
+    'Your goal is to assist travelers promptly and accurately with all currency-related questions.'
+)
+
+ACTIVITY_PLANNER_INSTRUCTIONS = normalize_instructions(
+    'You specialize in planning and recommending activities for travelers. '
+    'This includes suggesting sightseeing options, local events, dining recommendations, '
+    'booking tickets for attractions, advising on travel itineraries, and ensuring activities '
+    'align with traveler preferences and schedule. '
+    'Look up places with the find_places function and recommend the places it returns; '
+    'only fall back to general knowledge when it has no matches. '
+    'For practical questions about a destination, such as transport, tickets, etiquette or tipping, '
+    'use the search_guides function and answer from the passages it returns. '
+    'Keep recommendations brief: name, why it fits, and practical notes. '
+    'Your goal is to create enjoyable and personalized experiences for travelers.'
+)
+
+TRAVEL_MANAGER_INSTRUCTIONS = normalize_instructions(
+    "Your role is to carefully analyze the traveler's request and forward it to the appropriate agent based on the "
+    'specific details of the query. '
+    'Forward any requests involving monetary amounts, currency exchange rates, currency conversions, fees related '
+    'to currency exchange, financial transactions, or payment methods to the CurrencyExchangeAgent. '
+    'Forward requests related to planning activities, sightseeing recommendations, dining suggestions, event '
+    'booking, itinerary creation, or any experiential aspects of travel that do not explicitly involve monetary '
+    'transactions to the ActivityPlannerAgent. '
+    'Your primary goal is precise and efficient delegation to ensure travelers receive accurate and specialized '
+    'assistance promptly.'
+)
+
+
+def _estimate_tokens(*texts: str) -> int:
+    """Rough token count (4 characters per token), used when no usage is reported."""
+    return sum(len(text) for text in texts) // 4
+
+
+# Usage of the specialist agent calls made during the current turn
+_sub_agent_usage: ContextVar[list[Any] | None] = ContextVar('sub_agent_usage', default=None)
+
+
+@contextmanager
+def _collect_sub_agent_usage() -> Iterator[list[Any]]:
+    """Collect the usage of the specialist agents called during a turn."""
+    collected: list[Any] = []
+    token = _sub_agent_usage.set(collected)
+    try:
+        yield collected
+    finally:
+        # A stream closed from another context cannot reset; the list is simply dropped
+        with suppress(ValueError):
+            _sub_agent_usage.reset(token)
+
+
+async def _record_sub_agent_usage(
+    context: 'FunctionInvocationContext',
+    next: Callable[['FunctionInvocationContext'], Awaitable[None]],
+) -> None:
+    """Kernel filter adding the usage of agents invoked as plugins to the turn.
+
+    An agent plugin returns the agent's `ChatMessageContent`, whose metadata
+    carries the usage of its completion; when none is reported it is
+    estimated from the request and the answer. Plain plugins return no
+    metadata and are ignored.
+    """
+    await next(context)
+    value = context.result.value if context.result is not None else None
+    metadata = getattr(value, 'metadata', None)
+    if not isinstance(metadata, dict):
+        return
+    usage = metadata.get('usage')
+    if usage is not None:
+        prompt_cache_stats.record_usage(context.function.plugin_name, usage)
+    else:
+        usage = {
+            'prompt_tokens': _estimate_tokens(str(context.arguments.get('messages', ''))),
+            'completion_tokens': _estimate_tokens(str(value)),
+        }
+    collected = _sub_agent_usage.get()
+    if collected is not None:
+        collected.append(usage)
+
+
+def _build_prompt_prefix(agent: ChatCompletionAgent) -> PromptPrefix:
+    """Describe the cacheable prefix an agent sends on every turn.
+
+    Args:
+        agent (ChatCompletionAgent): The configured agent.
+
+    Returns:
+        PromptPrefix: Instructions, tool schemas and response schema of the agent.
+    """
+    tools = [
+        kernel_function_metadata_to_function_call_format(metadata)
+        for metadata in agent.kernel.get_full_list_of_function_metadata()
+    ]
+    response_format = None
+    if agent.arguments is not None:
+        settings = agent.arguments.execution_settings or {}
+        for execution_settings in settings.values():
+            response_format = getattr(execution_settings, 'response_format', None)
+            if response_format is not None:
+                break
+    return PromptPrefix.build(
+        agent_name=agent.name,
+        instructions=agent.instructions or '',
+        tools=tools,
+        response_format=response_format,
+    )
+
+
 # endregion
 
 # region Semantic Kernel Agent
 
 
+class _Session:
+    """Chat history of one session and the lock its turns run under."""
+
+    __slots__ = ('thread', 'lock', 'active')
+
+    def __init__(self, thread: ChatHistoryAgentThread):
+        self.thread = thread
+        self.lock = asyncio.Lock()
+        # Turns running or waiting; a session with none may be evicted
+        self.active = 0
+
+
 class SemanticKernelTravelAgent:
-    """Wraps Semantic Kernel-based agents to handle Travel related tasks."""
+    """Wraps Semantic Kernel-based agents to handle Travel related tasks.
+
+    Every session has its own thread, so concurrent turns of different
+    sessions (e.g. multiplexed over one WebSocket) never touch each other's
+    history, and the turns of one session run one at a time.
+    """
 
     agent: ChatCompletionAgent
-    thread: ChatHistoryAgentThread = None
     SUPPORTED_CONTENT_TYPES = ['text', 'text/plain']
 
     def __init__(self):
         # Configure the chat completion service explicitly
-        # It uses Azure OpenAI by default. Please change to ChatServices.OPENAI in case you want to use OpenAI service.
-        chat_service = get_chat_completion_service(ChatServices.AZURE_OPENAI)
+        # It uses Azure OpenAI by default. Set CHAT_COMPLETION_SERVICE=openai to use the OpenAI service.
+        self.chat_service_name = ChatServices(os.getenv('CHAT_COMPLETION_SERVICE', ChatServices.AZURE_OPENAI.value))
+        chat_service = get_chat_completion_service(self.chat_service_name)
+
+        self.agent = self._build_agents(chat_service, register_prefixes=True)
 
+        # Turns over a token budget keep only the last messages of the history
+        # and, when a cheaper deployment is configured, run on it
+        self.degraded_history_messages = int(os.getenv('TOKEN_BUDGET_DEGRADED_HISTORY', '6'))
+        self.degraded_deployment = os.getenv('AZURE_OPENAI_DEGRADED_DEPLOYMENT_NAME')
+        self._degraded_agent: ChatCompletionAgent | None = None
+
+        # Threads of the most recently used sessions
+        self.max_sessions = int(os.getenv('AGENT_MAX_SESSIONS', '1000'))
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+
+    def _build_agents(
+        self, chat_service: 'ChatCompletionClientBase', register_prefixes: bool = False
+    ) -> ChatCompletionAgent:
+        """Build the TravelManagerAgent and its specialist agents on a chat service.
+
+        Args:
+            chat_service (ChatCompletionClientBase): Service used by every agent.
+            register_prefixes (bool): Record the agents' prompt prefixes for cache accounting.
+
+        Returns:
+            ChatCompletionAgent: The TravelManagerAgent.
+        """
         currency_exchange_agent = ChatCompletionAgent(
             service=chat_service,
             name='CurrencyExchangeAgent',
-            instructions=(
-                'You specialize in handling currency-related requests from travelers. '
-                'This includes providing current exchange rates, converting amounts between different currencies, '
-                'explaining fees or charges related to currency exchange, and giving advice on the best practices for exchanging currency. '
-                'Your goal is to assist travelers promptly and accurately with all currency-related questions.'
-            ),
+            instructions=CURRENCY_EXCHANGE_INSTRUCTIONS,
             plugins=[CurrencyPlugin()],
         )
 
@@ -218,30 +751,15 @@ class SemanticKernelTravelAgent:
         activity_planner_agent = ChatCompletionAgent(
             service=chat_service,
             name='ActivityPlannerAgent',
-            instructions=(
-                'You specialize in planning and recommending activities for travelers. '
-                'This includes suggesting sightseeing options, local events, dining recommendations, '
-                'booking tickets for attractions, advising on travel itineraries, and ensuring activities '
-                'align with traveler preferences and schedule. '
-                'Your goal is to create enjoyable and personalized experiences for travelers.'
-            ),
+            instructions=ACTIVITY_PLANNER_INSTRUCTIONS,
+            plugins=[PointsOfInterestPlugin(), DestinationGuidePlugin()],
         )
 
         # Define the main TravelManagerAgent to delegate tasks to the appropriate agents
-        self.agent = ChatCompletionAgent(
+        travel_manager_agent = ChatCompletionAgent(
             service=chat_service,
             name='TravelManagerAgent',
-            instructions=(
-                "Your role is to carefully analyze the traveler's request and forward it to the appropriate agent based on the "
-                'specific details of the query. '
-                'Forward any requests involving monetary amounts, currency exchange rates, currency conversions, fees related '
-                'to currency exchange, financial transactions, or payment methods to the CurrencyExchangeAgent. '
-                'Forward requests related to planning activities, sightseeing recommendations, dining suggestions, event '
-                'booking, itinerary creation, or any experiential aspects of travel that do not explicitly involve monetary '
-                'transactions to the ActivityPlannerAgent. '
-                'Your primary goal is precise and efficient delegation to ensure travelers receive accurate and specialized '
-                'assistance promptly.'
-            ),
+            instructions=TRAVEL_MANAGER_INSTRUCTIONS,
             plugins=[currency_exchange_agent, activity_planner_agent],
             arguments=KernelArguments(
                 settings=OpenAIChatPromptExecutionSettings(
@@ -249,24 +767,77 @@ class SemanticKernelTravelAgent:
                 )
             ),
         )
+        # Count the specialist agents' tokens against the turn's budgets
+        travel_manager_agent.kernel.add_filter(FilterTypes.FUNCTION_INVOCATION, _record_sub_agent_usage)
+
+        if register_prefixes:
+            for agent in (currency_exchange_agent, activity_planner_agent, travel_manager_agent):
+                prompt_cache_stats.register_prefix(_build_prompt_prefix(agent))
+        return travel_manager_agent
+
+    async def _prepare_turn(
+        self, session_id: str, api_key: str | None, thread: ChatHistoryAgentThread
+    ) -> tuple[ChatCompletionAgent, BudgetDecision]:
+        """Apply the token budgets of a session before a turn runs.
 
-    async def invoke(self, user_input: str, session_id: str) -> dict[str, Any]:
+        Args:
+            session_id (str): Unique identifier for the session.
+            api_key (str | None): API key of the caller, if any.
+            thread (ChatHistoryAgentThread): Thread of the session, trimmed when degraded.
+
+        Returns:
+            tuple: The agent to run the turn with and the budget decision.
+
+        Raises:
+            TokenBudgetExceeded: If a budget is spent and over-budget turns are rejected.
+        """
+        decision = token_budgets.enforce(session_id, api_key)
+        if not decision.degraded:
+            return self.agent, decision
+
+        await thread.reduce()
+        if self.degraded_deployment:
+            if self._degraded_agent is None:
+                self._degraded_agent = self._build_agents(
+                    get_chat_completion_service(self.chat_service_name, self.degraded_deployment)
+                )
+            return self._degraded_agent, decision
+        return self.agent, decision
+
+    async def invoke(
+        self, user_input: str, session_id: str, api_key: str | None = None
+    ) -> dict[str, Any]:
         """Handle synchronous tasks (like tasks/send).
 
         Args:
             user_input (str): User input message.
             session_id (str): Unique identifier for the session.
+            api_key (str | None): API key of the caller, for per-tenant token budgets.
 
         Returns:
             dict: A dictionary containing the content, task completion status,
             and user input requirement.
-        """
-        await self._ensure_thread_exists(session_id)
 
-        # Use SK's get_response for a single shot
-        response = await self.agent.get_response(
-            messages=user_input,
-            thread=self.thread,
+        Raises:
+            TokenBudgetExceeded: If the session or API key is over its token budget.
+        """
+        async with self._session_thread(session_id) as thread:
+            agent, _ = await self._prepare_turn(session_id, api_key, thread)
+
+            # Use SK's get_response for a single shot
+            with _collect_sub_agent_usage() as sub_agent_usage:
+                response = await agent.get_response(
+                    messages=user_input,
+                    thread=thread,
+                )
+        usage = response.content.metadata.get('usage')
+        prompt_cache_stats.record_usage(agent.name, usage)
+        token_budgets.record(
+            session_id,
+            api_key,
+            usage,
+            _estimate_tokens(user_input, str(response.content)),
+            sub_agent_usage,
         )
         return self._get_agent_response(response.content)
 
@@ -274,71 +845,124 @@ class SemanticKernelTravelAgent:
         self,
         user_input: str,
         session_id: str,
+        include_text_deltas: bool = False,
+        api_key: str | None = None,
     ) -> AsyncIterable[dict[str, Any]]:
         """For streaming tasks we yield the SK agent's invoke_stream progress.
 
         Args:
             user_input (str): User input message.
             session_id (str): Unique identifier for the session.
+            include_text_deltas (bool): Also yield the answer text as it is
+                generated, as `delta` updates.
+            api_key (str | None): API key of the caller, for per-tenant token budgets.
 
         Yields:
             dict: A dictionary containing the content, task completion status,
-            and user input requirement.
+            and user input requirement. Working updates emitted during function
+            calling also carry a `progress` list of tool call/result steps.
+            With `include_text_deltas`, updates carrying a `delta` string are
+            yielded while the answer message streams.
+
+        Raises:
+            TokenBudgetExceeded: If the session or API key is over its token budget.
         """
-        await self._ensure_thread_exists(session_id)
-
-        plugin_notice_seen = False
-        plugin_event = asyncio.Event()
-
-        text_notice_seen = False
-        chunks: list[StreamingChatMessageContent] = []
-
-        async def _handle_intermediate_message(
-            message: 'ChatMessageContent',
-        ) -> None:
-            """Handle intermediate messages from the agent."""
-            nonlocal plugin_notice_seen
-            if not plugin_notice_seen:
-                plugin_notice_seen = True
-                plugin_event.set()
-            # An example of handling intermediate messages during function calling
-            for item in message.items or []:
-                if isinstance(item, FunctionResultContent):
-                    logger.info(
-                        f'SK Function Result:> {item.result} for function: {item.name}'
-                    )
-                elif isinstance(item, FunctionCallContent):
-                    logger.info(
-                        f'SK Function Call:> {item.name} with arguments: {item.arguments}'
+        async with self._session_thread(session_id) as thread:
+            agent, _ = await self._prepare_turn(session_id, api_key, thread)
+
+            plugin_notice_seen = False
+            plugin_event = asyncio.Event()
+
+            text_notice_seen = False
+            parser = ResponseFormatParser(ResponseFormat)
+            usage = None
+            progress = ProgressTracker()
+
+            async def _handle_intermediate_message(
+                message: 'ChatMessageContent',
+            ) -> None:
+                """Handle intermediate messages from the agent."""
+                nonlocal plugin_notice_seen
+                if not plugin_notice_seen:
+                    plugin_notice_seen = True
+                    plugin_event.set()
+                progress.observe(message.items or [])
+                for item in message.items or []:
+                    if isinstance(item, FunctionResultContent):
+                        logger.info(
+                            f'SK Function Result:> {item.result} for function: {item.name}'
+                        )
+                    elif isinstance(item, FunctionCallContent):
+                        logger.info(
+                            f'SK Function Call:> {item.name} with arguments: {item.arguments}'
+                        )
+                    else:
+                        logger.info(f'SK Message:> {item}')
+
+            started_at = time.perf_counter()
+            with _collect_sub_agent_usage() as sub_agent_usage:
+                # Charge the turn however it ends: completed, cancelled, orphaned or failed
+                try:
+                    async for chunk in agent.invoke_stream(
+                        messages=user_input,
+                        thread=thread,
+                        on_intermediate_message=_handle_intermediate_message,
+                    ):
+                        steps = progress.drain()
+                        if plugin_event.is_set() or steps:
+                            yield {
+                                'is_task_complete': False,
+                                'require_user_input': False,
+                                'content': 'Processing function calls...',
+                                'progress': steps,
+                            }
+                            plugin_event.clear()
+
+                        if any(isinstance(i, StreamingTextContent) for i in chunk.items):
+                            if not text_notice_seen:
+                                prompt_cache_stats.record_first_token(
+                                    agent.name, started_at
+                                )
+                                yield {
+                                    'is_task_complete': False,
+                                    'require_user_input': False,
+                                    'content': 'Building the output...',
+                                }
+                                text_notice_seen = True
+                            parser.feed(chunk.message.content)
+                            if include_text_deltas:
+                                delta = parser.take_message_delta()
+                                if delta:
+                                    yield {
+                                        'is_task_complete': False,
+                                        'require_user_input': False,
+                                        'content': 'Building the output...',
+                                        'delta': delta,
+                                    }
+                        if chunk.message.metadata.get('usage') is not None:
+                            usage = chunk.message.metadata['usage']
+                finally:
+                    token_budgets.record(
+                        session_id,
+                        api_key,
+                        usage,
+                        _estimate_tokens(user_input, *parser.raw_parts),
+                        sub_agent_usage,
                     )
-                else:
-                    logger.info(f'SK Message:> {item}')
 
-        async for chunk in self.agent.invoke_stream(
-            messages=user_input,
-            thread=self.thread,
-            on_intermediate_message=_handle_intermediate_message,
-        ):
-            if plugin_event.is_set():
+            steps = progress.drain()
+            if steps:
                 yield {
                     'is_task_complete': False,
                     'require_user_input': False,
                     'content': 'Processing function calls...',
+                    'progress': steps,
                 }
-                plugin_event.clear()
-
-            if any(isinstance(i, StreamingTextContent) for i in chunk.items):
-                if not text_notice_seen:
-                    yield {
-                        'is_task_complete': False,
-                        'require_user_input': False,
-                        'content': 'Building the output...',
-                    }
-                    text_notice_seen = True
-                chunks.append(chunk.message)
 
-        if chunks:
-            yield self._get_agent_response(sum(chunks[1:], chunks[0]))
+            if parser.raw_parts:
+                prompt_cache_stats.record_usage(agent.name, usage)
+                logger.debug(f'Structured response parse timings: {parser.timings()}')
+                yield self._map_structured_response(parser.result())
 
     def _get_agent_response(
         self, message: 'ChatMessageContent'
@@ -351,10 +975,21 @@ class SemanticKernelTravelAgent:
         Returns:
             dict: A dictionary containing the content, task completion status, and user input requirement.
         """
-        structured_response = ResponseFormat.model_validate_json(
-            message.content
+        return self._map_structured_response(
+            parse_response_format(ResponseFormat, message.content)
         )
 
+    def _map_structured_response(
+        self, structured_response: ResponseFormat | None
+    ) -> dict[str, Any]:
+        """Maps a parsed structured response to the task status dictionary.
+
+        Args:
+            structured_response (ResponseFormat | None): The parsed response, if any.
+
+        Returns:
+            dict: A dictionary containing the content, task completion status, and user input requirement.
+        """
         default_response = {
             'is_task_complete': False,
             'require_user_input': True,
@@ -383,15 +1018,46 @@ class SemanticKernelTravelAgent:
 
         return default_response
 
-    async def _ensure_thread_exists(self, session_id: str) -> None:
-        """Ensure the thread exists for the given session ID.
+    @asynccontextmanager
+    async def _session_thread(self, session_id: str) -> AsyncIterator[ChatHistoryAgentThread]:
+        """Hold the thread of a session for one turn, creating it on first use.
 
         Args:
             session_id (str): Unique identifier for the session.
+
+        Yields:
+            ChatHistoryAgentThread: The session's thread, used by no other turn meanwhile.
         """
-        if self.thread is None or self.thread.id != session_id:
-            await self.thread.delete() if self.thread else None
-            self.thread = ChatHistoryAgentThread(thread_id=session_id)
+        session = self._sessions.get(session_id)
+        if session is None:
+            # The reducer only trims the history when a turn is degraded
+            session = self._sessions[session_id] = _Session(
+                ChatHistoryAgentThread(
+                    chat_history=ChatHistoryTruncationReducer(
+                        target_count=self.degraded_history_messages
+                    ),
+                    thread_id=session_id,
+                )
+            )
+        else:
+            self._sessions.move_to_end(session_id)
+        session.active += 1
+        self._evict_sessions()
+        try:
+            async with session.lock:
+                yield session.thread
+        finally:
+            session.active -= 1
+
+    def _evict_sessions(self) -> None:
+        """Drop the least recently used idle sessions beyond `max_sessions`."""
+        excess = len(self._sessions) - self.max_sessions
+        for session_id in list(self._sessions):
+            if excess <= 0:
+                break
+            if not self._sessions[session_id].active:
+                del self._sessions[session_id]
+                excess -= 1
 
 
 # endregion
@@ -0,0 +1,410 @@
+"""Memory-mapped vector index for retrieving destination guide passages.
+
+An index is a directory:
+
+    vectors.f32      row-major float32 matrix (count x dim), memory-mapped
+    documents.jsonl  one passage per row: text, title, source
+    meta.json        dimension, count, embedder name, IVF settings and a
+                     hash of the passages it was built from
+    ivf.npz          optional coarse quantizer: centroids, row ids grouped
+                     by cluster and the offsets of each cluster
+
+Exact search is a batched dot product of the (normalized) queries with the
+matrix, streamed in blocks of rows so memory stays bounded for large
+corpora. With a coarse quantizer, each query only scores the rows of its
+`nprobe` nearest clusters. A search can be restricted to the passages of some
+guides (e.g. one destination); only those rows are scored.
+
+Build an index offline from a directory of Markdown / text guides::
+
+    python -m src.agent.vector_index --corpus src/agent/data/guides --out data/guide_index
+
+Each build writes to its own temporary directory and swaps it in under an
+exclusive lock on `<out>.lock`, so processes building the same index at once
+neither mix their files nor repeat a build another process has finished.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import unicodedata
+
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from .embeddings import Embedder, HashingEmbedder
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; concurrent builds are then not serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent / 'data' / 'guides'
+BLOCK_ROWS = 65536
+
+# Other names travelers use for a guide's destination, normalized
+DESTINATION_ALIASES = {
+    'nyc': 'new york',
+    'big apple': 'new york',
+    'roma': 'rome',
+    'londres': 'london',
+    'barca': 'barcelona',
+}
+
+
+def normalize_place(name: str) -> str:
+    """Lowercase, strip accents and punctuation, and collapse whitespace."""
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', text.lower()).split())
+
+
+def destination_matches(destination: str, title: str) -> bool:
+    """Whether a destination as written by a user names the guide `title`.
+
+    The normalized title, or an alias of it, must appear as whole words in the
+    destination, so "New York City", "NYC" and "Tokyo, Japan" match the guides
+    titled "New York" and "Tokyo".
+    """
+    wanted = f' {normalize_place(destination)} '
+    title = normalize_place(title)
+    if not title:
+        return False
+    names = [title] + [alias for alias, target in DESTINATION_ALIASES.items() if target == title]
+    return any(f' {name} ' in wanted for name in names)
+
+
+def chunk_guides(corpus_dir: str | Path, max_chars: int = 400) -> list[dict]:
+    """Split every guide into passages of whole paragraphs of up to `max_chars`.
+
+    The first Markdown heading of a file is used as its title.
+    """
+    passages = []
+    for path in sorted(Path(corpus_dir).glob('**/*')):
+        if path.suffix not in ('.md', '.txt') or not path.is_file():
+            continue
+        text = path.read_text(encoding='utf-8')
+        heading = re.search(r'^#\s+(.+)$', text, re.MULTILINE)
+        title = heading.group(1).strip() if heading else path.stem
+        buffer = ''
+        for paragraph in re.split(r'\n\s*\n', text):
+            paragraph = paragraph.strip()
+            if not paragraph or paragraph.startswith('# '):
+                continue
+            if buffer and len(buffer) + len(paragraph) > max_chars:
+                passages.append({'title': title, 'source': path.name, 'text': buffer})
+                buffer = ''
+            buffer = f'{buffer}\n\n{paragraph}' if buffer else paragraph
+        if buffer:
+            passages.append({'title': title, 'source': path.name, 'text': buffer})
+    return passages
+
+
+def corpus_hash(passages: list[dict]) -> str:
+    """Digest of the passages an index is built from."""
+    digest = hashlib.sha256()
+    for passage in passages:
+        digest.update(json.dumps(passage, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def _kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on normalized vectors; returns normalized centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(k):
+            members = vectors[assignment == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+def build_index(
+    passages: list[dict],
+    out_dir: str | Path,
+    embedder: Embedder | None = None,
+    nlist: int = 0,
+    batch_size: int = 256,
+    train_sample: int = 50000,
+) -> Path:
+    """Embed passages into an index directory, replacing any previous index.
+
+    Args:
+        passages: Dicts with `text` plus any metadata to return with results.
+        out_dir: Index directory.
+        embedder: Embedding function; the deterministic hashing embedder by default.
+        nlist: Number of IVF clusters; 0 builds an exact-search index only.
+        batch_size: Passages embedded per batch.
+        train_sample: Maximum number of vectors used to train the quantizer.
+
+    Returns:
+        Path: The index directory.
+    """
+    out = Path(out_dir)
+    with _build_lock(out):
+        _build_locked(passages, out, embedder or HashingEmbedder(), nlist, batch_size, train_sample)
+    return out
+
+
+def ensure_index(
+    out_dir: str | Path,
+    corpus_dir: str | Path = DEFAULT_CORPUS,
+    embedder: Embedder | None = None,
+) -> Path:
+    """Build the index from `corpus_dir` unless it is already built from it.
+
+    An index built from other passages (the guides changed since) is rebuilt.
+    Safe to call from several processes at once: one builds while the others
+    wait on the lock and then find the finished index.
+    """
+    out = Path(out_dir)
+    passages = chunk_guides(corpus_dir)
+    digest = corpus_hash(passages)
+    if _built_from(out, digest):
+        return out
+    with _build_lock(out):
+        if not _built_from(out, digest):
+            _build_locked(passages, out, embedder or HashingEmbedder())
+    return out
+
+
+def _built_from(out: Path, digest: str) -> bool:
+    """Whether the index at `out` exists and was built from passages with this hash."""
+    try:
+        meta = json.loads((out / 'meta.json').read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return False
+    return meta.get('corpus_hash') == digest
+
+
+@contextmanager
+def _build_lock(out: Path):
+    """Hold an exclusive lock on `<out>.lock` (a no-op without fcntl)."""
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(out.with_name(out.name + '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def _build_locked(
+    passages: list[dict],
+    out: Path,
+    embedder: Embedder,
+    nlist: int = 0,
+    batch_size: int = 256,
+    train_sample: int = 50000,
+) -> None:
+    """Build into a private temporary directory and swap it in; the caller holds the lock."""
+    tmp = Path(tempfile.mkdtemp(prefix=f'.{out.name}.building-', dir=out.parent))
+    try:
+        _write_index(passages, tmp, embedder, nlist, batch_size, train_sample)
+        old = None
+        if out.exists():
+            old = out.with_name(f'.{out.name}.old-{os.getpid()}')
+            os.replace(out, old)
+        os.replace(tmp, out)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+    logger.info(f'Built vector index with {len(passages)} passages at {out}')
+
+
+def _write_index(
+    passages: list[dict],
+    tmp: Path,
+    embedder: Embedder,
+    nlist: int,
+    batch_size: int,
+    train_sample: int,
+) -> None:
+    """Write the vectors, documents, quantizer and metadata into `tmp`."""
+    # np.memmap cannot map an empty file, so an empty corpus keeps one zero row
+    vectors = np.memmap(
+        tmp / 'vectors.f32', dtype=np.float32, mode='w+', shape=(max(len(passages), 1), embedder.dim)
+    )
+    for start in range(0, len(passages), batch_size):
+        batch = passages[start:start + batch_size]
+        vectors[start:start + len(batch)] = embedder.embed([p['text'] for p in batch])
+    vectors.flush()
+
+    with open(tmp / 'documents.jsonl', 'w', encoding='utf-8') as f:
+        for passage in passages:
+            f.write(json.dumps(passage, ensure_ascii=False) + '\n')
+
+    meta = {
+        'dim': embedder.dim,
+        'count': len(passages),
+        'embedder': embedder.name,
+        'nlist': 0,
+        'corpus_hash': corpus_hash(passages),
+    }
+    if nlist and len(passages) >= nlist:
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(len(passages), size=min(train_sample, len(passages)), replace=False))
+        centroids = _kmeans(np.asarray(vectors[sample_rows]), nlist)
+        assignment = np.concatenate([
+            np.argmax(np.asarray(vectors[start:start + BLOCK_ROWS]) @ centroids.T, axis=1)
+            for start in range(0, len(passages), BLOCK_ROWS)
+        ])
+        rows = np.argsort(assignment, kind='stable').astype(np.int64)
+        offsets = np.searchsorted(assignment[rows], np.arange(nlist + 1)).astype(np.int64)
+        np.savez(tmp / 'ivf.npz', centroids=centroids, rows=rows, offsets=offsets)
+        meta['nlist'] = nlist
+    del vectors
+
+    (tmp / 'meta.json').write_text(json.dumps(meta), encoding='utf-8')
+
+
+class VectorIndex:
+    """Read-only, memory-mapped vector index."""
+
+    def __init__(self, directory: str | Path, embedder: Embedder | None = None):
+        self.directory = Path(directory)
+        self.meta = json.loads((self.directory / 'meta.json').read_text(encoding='utf-8'))
+        self.embedder = embedder or HashingEmbedder(self.meta['dim'])
+        if self.embedder.name != self.meta['embedder']:
+            raise ValueError(
+                f"Index was built with {self.meta['embedder']}, not {self.embedder.name}"
+            )
+        count, dim = self.meta['count'], self.meta['dim']
+        self.vectors = np.memmap(
+            self.directory / 'vectors.f32', dtype=np.float32, mode='r', shape=(max(count, 1), dim)
+        )[:count]
+        with open(self.directory / 'documents.jsonl', encoding='utf-8') as f:
+            self.documents = [json.loads(line) for line in f]
+        self._title_rows: dict[str, np.ndarray] | None = None
+        self.centroids = self.ivf_rows = self.ivf_offsets = None
+        if self.meta.get('nlist'):
+            with np.load(self.directory / 'ivf.npz') as ivf:
+                self.centroids, self.ivf_rows, self.ivf_offsets = ivf['centroids'], ivf['rows'], ivf['offsets']
+
+    def __len__(self) -> int:
+        return self.meta['count']
+
+    def rows_for_destination(self, destination: str) -> np.ndarray:
+        """Rows of the passages from guides whose title names `destination`."""
+        if self._title_rows is None:
+            rows_by_title: dict[str, list[int]] = {}
+            for row, document in enumerate(self.documents):
+                rows_by_title.setdefault(document.get('title', ''), []).append(row)
+            self._title_rows = {title: np.array(rows, dtype=np.int64) for title, rows in rows_by_title.items()}
+        matches = [rows for title, rows in self._title_rows.items() if destination_matches(destination, title)]
+        return np.sort(np.concatenate(matches)) if matches else np.empty(0, np.int64)
+
+    def search_vectors(
+        self,
+        queries: np.ndarray,
+        k: int = 5,
+        nprobe: int | None = None,
+        rows: np.ndarray | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k rows by dot product for a batch of query vectors.
+
+        Args:
+            queries: Array of shape (q, dim).
+            k: Results per query.
+            nprobe: Clusters scanned per query with the coarse quantizer;
+                None (or no quantizer) scans all rows exactly.
+            rows: Restrict the search to these rows (scored exactly), so a
+                filter applies before the top-k cut rather than after it.
+
+        Returns:
+            tuple: (scores, rows), each of shape (q, k'), best first, k' <= k.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        k = min(k, len(self) if rows is None else len(rows))
+        if k == 0:
+            return np.empty((len(queries), 0), np.float32), np.empty((len(queries), 0), np.int64)
+        if rows is not None:
+            return self._search_rows(queries, k, np.asarray(rows, dtype=np.int64))
+        if self.centroids is not None and nprobe:
+            return self._search_ivf(queries, k, nprobe)
+
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), k), dtype=np.int64)
+        for start in range(0, len(self), BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + BLOCK_ROWS])
+            block_rows = np.broadcast_to(np.arange(start, start + len(block)), (len(queries), len(block)))
+            scores = np.concatenate((best_scores, queries @ block.T), axis=1)
+            rows = np.concatenate((best_rows, block_rows), axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_rows, order, axis=1)
+
+    def _search_rows(self, queries: np.ndarray, k: int, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), k), dtype=np.int64)
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block_rows = rows[start:start + BLOCK_ROWS]
+            scores = np.concatenate((best_scores, queries @ np.asarray(self.vectors[block_rows]).T), axis=1)
+            candidates = np.concatenate(
+                (best_rows, np.broadcast_to(block_rows, (len(queries), len(block_rows)))), axis=1
+            )
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(candidates, top, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_rows, order, axis=1)
+
+    def _search_ivf(self, queries: np.ndarray, k: int, nprobe: int) -> tuple[np.ndarray, np.ndarray]:
+        nprobe = min(nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        all_rows = np.zeros((len(queries), k), dtype=np.int64)
+        for q, clusters in enumerate(probes):
+            rows = np.concatenate([
+                self.ivf_rows[self.ivf_offsets[c]:self.ivf_offsets[c + 1]] for c in clusters
+            ])
+            if rows.size == 0:
+                continue
+            rows.sort()
+            scores = np.asarray(self.vectors[rows]) @ queries[q]
+            top = np.argsort(-scores)[:k]
+            all_scores[q, :len(top)] = scores[top]
+            all_rows[q, :len(top)] = rows[top]
+        return all_scores, all_rows
+
+    def search(self, query: str, k: int = 5, nprobe: int | None = None, destination: str = '') -> list[dict]:
+        """Top-k passages for a text query, with their scores.
+
+        With `destination`, only passages from guides naming it are searched.
+        """
+        rows = self.rows_for_destination(destination) if destination else None
+        scores, rows = self.search_vectors(self.embedder.embed([query]), k, nprobe, rows)
+        return [
+            dict(self.documents[row], score=round(float(score), 4))
+            for score, row in zip(scores[0].tolist(), rows[0].tolist())
+            if score > -np.inf
+        ]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Build the destination guide vector index')
+    parser.add_argument('--corpus', default=str(DEFAULT_CORPUS), help='Directory of .md/.txt guides')
+    parser.add_argument('--out', default=os.getenv('GUIDE_INDEX_DIR', 'data/guide_index'))
+    parser.add_argument('--nlist', type=int, default=0, help='IVF clusters (0 = exact search only)')
+    parser.add_argument('--dim', type=int, default=384, help='Hashing embedder dimension')
+    args = parser.parse_args()
+    build_index(chunk_guides(args.corpus), args.out, HashingEmbedder(args.dim), nlist=args.nlist)
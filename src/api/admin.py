@@ -0,0 +1,39 @@
+import os
+import secrets
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from pydantic import BaseModel
+
+from src.agent.token_budget import token_budgets
+
+
+def require_admin(x_admin_key: Optional[str] = Header(default=None)) -> None:
+    """Allow the request only with the ADMIN_API_KEY in the X-Admin-Key header"""
+    admin_key = os.getenv("ADMIN_API_KEY")
+    if not admin_key:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_API_KEY not set)")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, admin_key):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+class BudgetOverride(BaseModel):
+    """Per-window token budget of one session or API key; null removes the override"""
+    tokens: Optional[int] = None
+
+
+@router.get("/token-budgets")
+async def get_token_budgets(top: int = 20):
+    """Token budgets, overrides and the heaviest sessions and API keys in the current window"""
+    return token_budgets.snapshot(top=top)
+
+
+@router.put("/token-budgets/{scope}/{key}")
+async def set_token_budget(scope: Literal["session", "api_key"], key: str, override: BudgetOverride):
+    """Override the token budget of a session id or an API key id (as listed by GET)"""
+    budget_scope = "tenant" if scope == "api_key" else "session"
+    token_budgets.set_limit(budget_scope, key, override.tokens)
+    return {"scope": scope, "key": key, "limit": token_budgets.limit(budget_scope, key)}
@@ -1,28 +1,69 @@
+import asyncio
+import json
+import os
+import threading
 import uuid
 import logging
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, WebSocket
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from src.agent.travel_agent import SemanticKernelTravelAgent
+from src.agent.prompt_cache import prompt_cache_stats
+from src.agent.token_budget import TokenBudgetExceeded, token_budgets
+from src.api.multiplex import MultiplexedChatConnection
+from src.api.streaming import StreamTurn, StreamTurnRegistry
+
+if TYPE_CHECKING:
+    from src.agent.travel_agent import SemanticKernelTravelAgent
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-# Initialize travel agent
-travel_agent = SemanticKernelTravelAgent()
+# X-API-Key only selects the tenant whose token budget a turn is charged to.
+# It is not validated here; deploy behind a layer that authenticates it.
+
+# Travel agent, created on first use (importing it loads Semantic Kernel, OpenAI and Azure SDKs)
+_travel_agent: Optional["SemanticKernelTravelAgent"] = None
+_travel_agent_lock = threading.Lock()
+
+
+def get_travel_agent() -> "SemanticKernelTravelAgent":
+    """Return the shared travel agent, creating it on first use.
+
+    Blocks while the agent is built; on the event loop use `load_travel_agent`.
+    """
+    global _travel_agent
+    if _travel_agent is None:
+        with _travel_agent_lock:
+            if _travel_agent is None:
+                from src.agent.travel_agent import SemanticKernelTravelAgent
+
+                _travel_agent = SemanticKernelTravelAgent()
+    return _travel_agent
+
+
+async def load_travel_agent() -> "SemanticKernelTravelAgent":
+    """Return the shared travel agent, building it (or waiting for the warm-up) off the event loop"""
+    if _travel_agent is not None:
+        return _travel_agent
+    return await asyncio.to_thread(get_travel_agent)
 
 # In-memory session store
 active_sessions: Dict[str, str] = {}
 
+# Running and recently finished streamed turns
+stream_turns = StreamTurnRegistry()
+
 
 class ChatMessage(BaseModel):
     """Chat message model"""
     message: str
     session_id: str = None
+    turn_id: Optional[str] = None
+    last_event_id: Optional[int] = None
 
 
 class ChatResponse(BaseModel):
@@ -33,8 +74,17 @@ class ChatResponse(BaseModel):
     requires_input: bool
 
 
+def _budget_exceeded(error: TokenBudgetExceeded) -> HTTPException:
+    """429 response for a turn rejected by a token budget"""
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": str(int(error.decision.retry_after) + 1)},
+    )
+
+
 @router.post("/message", response_model=ChatResponse)
-async def send_message(chat_message: ChatMessage):
+async def send_message(chat_message: ChatMessage, x_api_key: Optional[str] = Header(default=None)):
     """Send a message to the travel agent and get a response"""
     try:
         # Generate session ID if not provided
@@ -44,7 +94,8 @@ async def send_message(chat_message: ChatMessage):
         active_sessions[session_id] = session_id
         
         # Get response from agent
-        response = await travel_agent.invoke(chat_message.message, session_id)
+        travel_agent = await load_travel_agent()
+        response = await travel_agent.invoke(chat_message.message, session_id, api_key=x_api_key)
         
         return ChatResponse(
             response=response.get('content', 'No response available'),
@@ -53,64 +104,138 @@ async def send_message(chat_message: ChatMessage):
             requires_input=response.get('require_user_input', True)
         )
         
+    except TokenBudgetExceeded as e:
+        raise _budget_exceeded(e)
     except Exception as e:
         logger.error(f"Error processing chat message: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/stream")
-async def stream_message(chat_message: ChatMessage):
-    """Stream a response from the travel agent"""
+async def stream_message(chat_message: ChatMessage, x_api_key: Optional[str] = Header(default=None)):
+    """Stream a response from the travel agent as Server-Sent Events.
+
+    Each event carries a `type`: `status` (with optional tool `progress`),
+    `delta` (answer text as it is generated), `final`, `error` or `cancelled`.
+    Sending the same `turn_id` again with `last_event_id` resumes a dropped
+    stream instead of re-running the turn.
+    """
     try:
         # Generate session ID if not provided
         session_id = chat_message.session_id or str(uuid.uuid4())
         
         # Store session
         active_sessions[session_id] = session_id
-        
+
+        turn = stream_turns.get(chat_message.turn_id) if chat_message.turn_id else None
+        if turn is None:
+            # Reject over-budget turns before the stream starts
+            decision = token_budgets.check(session_id, x_api_key)
+            if decision.rejected:
+                raise _budget_exceeded(TokenBudgetExceeded(decision))
+            turn_id = chat_message.turn_id or str(uuid.uuid4())
+            turn = stream_turns.start(
+                turn_id,
+                session_id,
+                lambda: _stream_events(chat_message.message, session_id, turn_id, x_api_key),
+            )
+        last_event_id = chat_message.last_event_id if chat_message.last_event_id is not None else -1
+
         async def generate_response():
             """Generate streaming response"""
-            try:
-                async for partial in travel_agent.stream(
-                    chat_message.message, session_id
-                ):
-                    # Format as SSE (Server-Sent Events)
-                    content = partial.get('content', '')
-                    is_complete = partial.get('is_task_complete', False)
-                    requires_input = partial.get('require_user_input', False)
-                    
-                    response_data = {
-                        "content": content,
-                        "session_id": session_id,
-                        "is_complete": is_complete,
-                        "requires_input": requires_input
-                    }
-                    
-                    yield f"data: {response_data}\n\n"
-                    
-                    if is_complete:
-                        break
-                        
-            except Exception as e:
-                logger.error(f"Error in streaming response: {e}")
-                yield f"data: {{\"error\": \"{str(e)}\"}}\n\n"
-        
+            async for event_id, event in turn.subscribe(after=last_event_id):
+                yield f"id: {event_id}\ndata: {json.dumps(event)}\n\n"
+
         return StreamingResponse(
             generate_response(),
-            media_type="text/plain",
+            media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
+                "X-Accel-Buffering": "no",
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Headers": "*"
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error setting up streaming: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/stream/{turn_id}/cancel")
+async def cancel_stream(turn_id: str):
+    """Cancel a running streamed turn"""
+    if stream_turns.cancel(turn_id):
+        return {"message": f"Turn {turn_id} cancelled"}
+    raise HTTPException(status_code=404, detail="Turn not running")
+
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """Multiplex streamed turns of several sessions over one WebSocket.
+
+    See `src.api.multiplex` for the frame protocol. The API key for token
+    budgets is taken from the `X-API-Key` header of the upgrade request.
+    Turns of different sessions run concurrently on their own agent threads;
+    behind the session-affine proxy a connection only carries the sessions
+    its replica owns (see `src.routing.proxy`).
+    """
+    api_key = websocket.headers.get("x-api-key")
+
+    def start_turn(message: str, session_id: str, turn_id: str) -> StreamTurn:
+        decision = token_budgets.check(session_id, api_key)
+        if decision.rejected:
+            raise TokenBudgetExceeded(decision)
+        active_sessions[session_id] = session_id
+        return stream_turns.start(
+            turn_id,
+            session_id,
+            lambda: _stream_events(message, session_id, turn_id, api_key),
+        )
+
+    connection = MultiplexedChatConnection(
+        websocket,
+        stream_turns,
+        start_turn,
+        max_turns=int(os.getenv("CHAT_WS_MAX_TURNS", "8")),
+        send_queue_size=int(os.getenv("CHAT_WS_SEND_QUEUE", "256")),
+        ping_interval=float(os.getenv("CHAT_WS_PING_INTERVAL", "20")),
+        send_timeout=float(os.getenv("CHAT_WS_SEND_TIMEOUT", "30")),
+    )
+    await connection.run()
+
+
+async def _stream_events(message: str, session_id: str, turn_id: str, api_key: Optional[str] = None):
+    """Translate agent stream updates into chat stream events"""
+    travel_agent = await load_travel_agent()
+    async for partial in travel_agent.stream(
+        message, session_id, include_text_deltas=True, api_key=api_key
+    ):
+        is_complete = partial.get('is_task_complete', False)
+        requires_input = partial.get('require_user_input', False)
+        event = {
+            "type": "status",
+            "turn_id": turn_id,
+            "session_id": session_id,
+            "content": partial.get('content', ''),
+            "is_complete": is_complete,
+            "requires_input": requires_input,
+        }
+        if 'delta' in partial:
+            event["type"] = "delta"
+            event["delta"] = partial['delta']
+        elif is_complete or requires_input:
+            event["type"] = "final"
+        if 'progress' in partial:
+            event["progress"] = partial['progress']
+        yield event
+        if is_complete:
+            break
+
+
 @router.get("/sessions")
 async def get_active_sessions():
     """Get list of active chat sessions"""
@@ -125,3 +250,9 @@ async def clear_session(session_id: str):
         return {"message": f"Session {session_id} cleared"}
     else:
         raise HTTPException(status_code=404, detail="Session not found")
+
+
+@router.get("/prompt-cache")
+async def get_prompt_cache_stats():
+    """Get prompt prefix fingerprints and cached-token usage per agent"""
+    return {"agents": prompt_cache_stats.snapshot()}
@@ -0,0 +1,257 @@
+"""Multiplexed chat sessions over a single WebSocket.
+
+Every frame is a JSON object with a `type`. A connection carries any number
+of concurrent turns, each identified by its turn `id`, for any sessions.
+
+Client to server:
+    send       {"type": "send", "message", "session_id"?, "id"?, "last_event_id"?}
+               starts a turn; an `id` of a known turn resumes it after `last_event_id`
+    cancel     {"type": "cancel", "id"}
+    ping/pong  liveness; every ping is answered with a pong
+
+Server to client:
+    accepted   {"type": "accepted", "id", "session_id"}
+    partial    {"type": "partial", "id", "session_id", "event_id", "content", "delta"?, "progress"?}
+    complete   {"type": "complete", "id", "session_id", "event_id", "content", "is_complete", "requires_input"}
+    cancelled  {"type": "cancelled", "id"}
+    error      {"type": "error", "id"?, "error"}
+    ping/pong
+
+Turns run in the shared `StreamTurnRegistry`, so a turn started over the
+WebSocket can be resumed with `POST /chat/stream` after a disconnect, and an
+abandoned turn is cancelled by the registry like an abandoned SSE stream.
+
+Outgoing frames go through a bounded per-connection queue drained by one
+writer. When the queue is full, the partial frames of a turn are merged
+(deltas concatenated, progress steps appended) until there is room, so a slow
+client receives fewer, larger frames instead of buffering every token; final
+frames are never dropped. A client that does not accept a frame within
+`send_timeout` or does not send anything, pongs included, for
+`ping_interval + ping_timeout` is disconnected.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from src.api.streaming import StreamTurn, StreamTurnRegistry
+
+logger = logging.getLogger(__name__)
+
+# Close codes (RFC 6455)
+POLICY_VIOLATION = 1008
+TRY_AGAIN_LATER = 1013
+
+
+def _merge_partials(pending: Dict[str, Any], frame: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine two partial frames of the same turn into one"""
+    merged = {**pending, **frame}
+    if "delta" in pending or "delta" in frame:
+        merged["delta"] = pending.get("delta", "") + frame.get("delta", "")
+    if "progress" in pending or "progress" in frame:
+        merged["progress"] = pending.get("progress", []) + frame.get("progress", [])
+    return merged
+
+
+class MultiplexedChatConnection:
+    """Serves one WebSocket carrying chat turns of several sessions."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        turns: StreamTurnRegistry,
+        start_turn: Callable[[str, str, str], StreamTurn],
+        max_turns: int = 8,
+        send_queue_size: int = 256,
+        ping_interval: float = 20.0,
+        ping_timeout: float = 20.0,
+        send_timeout: float = 30.0,
+    ):
+        """Initialize the connection.
+
+        Args:
+            websocket: The accepted-to-be WebSocket
+            turns: Registry the turns run in
+            start_turn: Starts a turn from (message, session_id, turn_id); may raise to refuse it
+            max_turns: Turns that may stream concurrently on this connection
+            send_queue_size: Frames buffered for the client before partials are merged
+            ping_interval: Seconds between server pings
+            ping_timeout: Extra seconds of client silence tolerated after a ping
+            send_timeout: Seconds a single frame may take to send
+        """
+        self.websocket = websocket
+        self.turns = turns
+        self.start_turn = start_turn
+        self.max_turns = max_turns
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.send_timeout = send_timeout
+        self.forwarders: Dict[str, asyncio.Task] = {}
+        self.frames_sent = 0
+        self.frames_merged = 0
+        self.last_seen = time.monotonic()
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=send_queue_size)
+        self._closed = asyncio.Event()
+        self._close_code: Optional[int] = None
+        self._close_reason = ""
+
+    async def run(self) -> None:
+        """Accept the WebSocket and serve it until either side closes it"""
+        await self.websocket.accept()
+        writer = asyncio.create_task(self._write())
+        pinger = asyncio.create_task(self._ping())
+        reader = asyncio.create_task(self._read())
+        closed = asyncio.create_task(self._closed.wait())
+        try:
+            await asyncio.wait([writer, reader, closed], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in [reader, writer, pinger, closed, *self.forwarders.values()]:
+                task.cancel()
+            if self._close_code is not None:
+                try:
+                    await self.websocket.close(code=self._close_code, reason=self._close_reason)
+                except RuntimeError:
+                    pass  # Already closed by the client
+            logger.info(
+                f"Chat WebSocket closed: {self.frames_sent} frames sent, "
+                f"{self.frames_merged} partials merged"
+            )
+
+    def close(self, code: int, reason: str) -> None:
+        """Close the connection from the server side"""
+        if not self._closed.is_set():
+            logger.warning(f"Closing chat WebSocket: {reason}")
+            self._close_code, self._close_reason = code, reason
+            self._closed.set()
+
+    async def _read(self) -> None:
+        """Handle client frames until the client disconnects"""
+        try:
+            while True:
+                text = await self.websocket.receive_text()
+                self.last_seen = time.monotonic()
+                try:
+                    frame = json.loads(text)
+                    if not isinstance(frame, dict):
+                        raise ValueError("frame must be a JSON object")
+                except ValueError as e:
+                    await self._outbox.put({"type": "error", "error": f"Invalid frame: {e}"})
+                    continue
+                await self._handle(frame)
+        except WebSocketDisconnect:
+            pass
+
+    async def _handle(self, frame: Dict[str, Any]) -> None:
+        frame_type = frame.get("type")
+        if frame_type == "send":
+            await self._send(frame)
+        elif frame_type == "cancel":
+            turn_id = frame.get("id")
+            if not self.turns.cancel(turn_id):
+                await self._outbox.put({"type": "error", "id": turn_id, "error": "Turn not running"})
+        elif frame_type == "ping":
+            await self._outbox.put({"type": "pong", "ts": frame.get("ts")})
+        elif frame_type == "pong":
+            pass
+        else:
+            await self._outbox.put({"type": "error", "error": f"Unknown frame type: {frame_type}"})
+
+    async def _send(self, frame: Dict[str, Any]) -> None:
+        """Start or resume a turn and forward its events"""
+        turn_id = frame.get("id") or str(uuid.uuid4())
+        if turn_id in self.forwarders:
+            await self._outbox.put({"type": "error", "id": turn_id, "error": "Turn already streaming"})
+            return
+        if len(self.forwarders) >= self.max_turns:
+            await self._outbox.put(
+                {"type": "error", "id": turn_id, "error": f"At most {self.max_turns} concurrent turns per connection"}
+            )
+            return
+
+        turn = self.turns.get(turn_id)
+        after = frame.get("last_event_id", -1) if turn is not None else -1
+        if turn is None:
+            message = frame.get("message")
+            if not isinstance(message, str) or not message:
+                await self._outbox.put({"type": "error", "id": turn_id, "error": "A send frame needs a message"})
+                return
+            session_id = frame.get("session_id") or str(uuid.uuid4())
+            try:
+                turn = self.start_turn(message, session_id, turn_id)
+            except Exception as e:
+                await self._outbox.put({"type": "error", "id": turn_id, "session_id": session_id, "error": str(e)})
+                return
+
+        await self._outbox.put({"type": "accepted", "id": turn_id, "session_id": turn.session_id})
+        task = asyncio.create_task(self._forward(turn, after))
+        self.forwarders[turn_id] = task
+        task.add_done_callback(lambda _: self.forwarders.pop(turn_id, None))
+
+    def _frame(self, turn: StreamTurn, event_id: int, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Translate a chat stream event into a WebSocket frame"""
+        event_type = event.get("type")
+        frame: Dict[str, Any] = {"id": turn.turn_id, "session_id": turn.session_id, "event_id": event_id}
+        if event_type in ("error", "cancelled"):
+            frame["type"] = event_type
+            if "error" in event:
+                frame["error"] = event["error"]
+            return frame
+        frame["type"] = "complete" if event_type == "final" else "partial"
+        frame["content"] = event.get("content", "")
+        for key in ("delta", "progress"):
+            if key in event:
+                frame[key] = event[key]
+        if frame["type"] == "complete":
+            frame["is_complete"] = event.get("is_complete", False)
+            frame["requires_input"] = event.get("requires_input", False)
+        return frame
+
+    async def _forward(self, turn: StreamTurn, after: int) -> None:
+        """Queue the frames of one turn, merging partials while the queue is full"""
+        pending: Optional[Dict[str, Any]] = None
+        async for event_id, event in turn.subscribe(after=after):
+            frame = self._frame(turn, event_id, event)
+            if frame["type"] == "partial":
+                if pending is not None:
+                    frame = _merge_partials(pending, frame)
+                    self.frames_merged += 1
+                if self._outbox.full():
+                    pending = frame
+                    continue
+                pending = None
+            elif pending is not None:
+                await self._outbox.put(pending)
+                pending = None
+            await self._outbox.put(frame)
+        if pending is not None:
+            await self._outbox.put(pending)
+
+    async def _write(self) -> None:
+        """Send queued frames one at a time, disconnecting clients that stop reading"""
+        while True:
+            frame = await self._outbox.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(json.dumps(frame)), self.send_timeout)
+            except asyncio.TimeoutError:
+                self.close(TRY_AGAIN_LATER, f"Client did not read a frame within {self.send_timeout}s")
+                return
+            except (WebSocketDisconnect, RuntimeError):
+                return
+            self.frames_sent += 1
+
+    async def _ping(self) -> None:
+        """Ping the client and disconnect it when it has been silent too long"""
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            if time.monotonic() - self.last_seen > self.ping_interval + self.ping_timeout:
+                self.close(POLICY_VIOLATION, "No pong received")
+                return
+            try:
+                self._outbox.put_nowait({"type": "ping", "ts": time.time()})
+            except asyncio.QueueFull:
+                pass  # The writer is behind; the send timeout handles stalled clients
@@ -0,0 +1,126 @@
+"""Warm-up stage and readiness reporting.
+
+`/health` only says the process is alive. Readiness is reported separately:
+on startup a warm-up stage builds the agents, fetches Azure AD tokens, opens
+pooled connections and primes caches, and `/ready` stays 503 until every
+required step has succeeded.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupStep:
+    """A named warm-up action and its outcome."""
+
+    def __init__(self, name: str, action: Callable[[], Awaitable[Any]], required: bool = True):
+        """Initialize the step.
+
+        Args:
+            name: Dependency name reported by /ready
+            action: Coroutine function performing the warm-up
+            required: Whether the pod is unready while this step has not succeeded
+        """
+        self.name = name
+        self.action = action
+        self.required = required
+        self.ready = False
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.detail: Any = None
+
+    async def run(self) -> None:
+        """Run the action, recording duration and errors"""
+        start = time.perf_counter()
+        try:
+            self.detail = await self.action()
+            self.ready = True
+            self.error = None
+        except Exception as e:
+            self.ready = False
+            self.error = str(e)
+            log = logger.error if self.required else logger.warning
+            log(f"Warm-up step {self.name} failed: {e}")
+        finally:
+            self.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Readiness report entry"""
+        report = {
+            "ready": self.ready,
+            "required": self.required,
+            "duration_ms": self.duration_ms,
+        }
+        if self.error:
+            report["error"] = self.error
+        if self.detail is not None:
+            report["detail"] = self.detail
+        return report
+
+
+class ReadinessState:
+    """Runs warm-up steps and reports readiness per dependency."""
+
+    def __init__(self):
+        self.steps: List[WarmupStep] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add_step(self, name: str, action: Callable[[], Awaitable[Any]], required: bool = True) -> None:
+        """Register a warm-up step; steps run concurrently"""
+        self.steps.append(WarmupStep(name, action, required))
+
+    def start(self, retry_interval: float = 10.0) -> asyncio.Task:
+        """Start the warm-up in the background.
+
+        Failed required steps are retried every `retry_interval` seconds until
+        they succeed, so a pod becomes ready once its dependencies recover.
+        """
+        self.started_at = time.perf_counter()
+        self._task = asyncio.create_task(self._run(retry_interval))
+        return self._task
+
+    async def stop(self) -> None:
+        """Cancel a warm-up still in progress"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self, retry_interval: float) -> None:
+        pending = list(self.steps)
+        while True:
+            await asyncio.gather(*(step.run() for step in pending))
+            pending = [step for step in pending if step.required and not step.ready]
+            if not pending:
+                break
+            await asyncio.sleep(retry_interval)
+        self.finished_at = time.perf_counter()
+        logger.info(f"Warm-up complete in {self.warmup_ms:.0f} ms")
+
+    @property
+    def is_ready(self) -> bool:
+        """True when every required step has succeeded"""
+        return bool(self.steps) and all(step.ready for step in self.steps if step.required)
+
+    @property
+    def warmup_ms(self) -> Optional[float]:
+        """Total warm-up duration, once finished"""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at) * 1000, 1)
+
+    def report(self) -> Dict[str, Any]:
+        """Readiness report for /ready"""
+        return {
+            "status": "ready" if self.is_ready else "warming_up",
+            "warmup_ms": self.warmup_ms,
+            "dependencies": {step.name: step.to_dict() for step in self.steps},
+        }
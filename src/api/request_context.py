@@ -0,0 +1,26 @@
+"""Middleware publishing per-request context to lower layers.
+
+The endpoint serving the current request is kept in a context variable so
+that code far from the route handler (for example Cosmos DB accounting) can
+attribute its work to the endpoint without threading it through every call.
+The variable lives in `src.observability`; this module only sets it.
+"""
+
+from src.observability import current_endpoint
+
+
+class EndpointContextMiddleware:
+    """ASGI middleware setting `current_endpoint` to "METHOD /path" for each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_endpoint.set(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_endpoint.reset(token)
@@ -0,0 +1,148 @@
+"""Resumable streaming turns for the chat API.
+
+A streamed chat turn runs in a background task that appends events to a
+per-turn buffer. Subscribers read the buffer from any offset, so a client
+whose connection dropped can reconnect with the same `turn_id` and the id of
+the last event it saw, and continue without re-running the turn. A turn is
+cancelled explicitly, or when no subscriber has been attached for
+`orphan_timeout` seconds.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StreamTurn:
+    """Event buffer and background task of one streamed turn."""
+
+    def __init__(self, turn_id: str, session_id: str):
+        self.turn_id = turn_id
+        self.session_id = session_id
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        self.subscribers = 0
+        self.detached_at: Optional[float] = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, event: Dict[str, Any]) -> None:
+        """Append an event and wake subscribers."""
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def close(self) -> None:
+        """Mark the turn finished."""
+        async with self._changed:
+            self.done = True
+            self.finished_at = time.monotonic()
+            self._changed.notify_all()
+
+    async def subscribe(self, after: int = -1) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Yield `(event_id, event)` for events after `after` until the turn ends.
+
+        Args:
+            after: Id of the last event the subscriber already has
+        """
+        index = after + 1
+        self.subscribers += 1
+        self.detached_at = None
+        try:
+            while True:
+                async with self._changed:
+                    while index >= len(self.events) and not self.done:
+                        await self._changed.wait()
+                    pending = self.events[index:]
+                    done = self.done
+                for event in pending:
+                    yield index, event
+                    index += 1
+                if done and index >= len(self.events):
+                    return
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0:
+                self.detached_at = time.monotonic()
+
+
+class StreamTurnRegistry:
+    """Tracks running and recently finished streamed turns."""
+
+    def __init__(self, orphan_timeout: float = 15.0, retention: float = 60.0):
+        """Initialize the registry.
+
+        Args:
+            orphan_timeout: Seconds a running turn may have no subscriber before it is cancelled
+            retention: Seconds a finished turn stays available for replay
+        """
+        self.orphan_timeout = orphan_timeout
+        self.retention = retention
+        self.turns: Dict[str, StreamTurn] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    def get(self, turn_id: str) -> Optional[StreamTurn]:
+        """Return a known turn."""
+        return self.turns.get(turn_id)
+
+    def start(
+        self,
+        turn_id: str,
+        session_id: str,
+        producer: Callable[[], AsyncIterable[Dict[str, Any]]],
+    ) -> StreamTurn:
+        """Start a turn whose events come from `producer`.
+
+        Args:
+            turn_id: Client supplied turn identifier
+            session_id: Session the turn belongs to
+            producer: Factory of the async iterable of events
+
+        Returns:
+            The running turn
+        """
+        turn = StreamTurn(turn_id, session_id)
+        self.turns[turn_id] = turn
+
+        async def run():
+            try:
+                async for event in producer():
+                    await turn.publish(event)
+            except asyncio.CancelledError:
+                await turn.publish({"type": "cancelled", "session_id": session_id})
+                raise
+            except Exception as e:
+                logger.error(f"Error in streaming turn {turn_id}: {e}")
+                await turn.publish({"type": "error", "error": str(e), "session_id": session_id})
+            finally:
+                await turn.close()
+
+        turn.task = asyncio.create_task(run())
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+        return turn
+
+    def cancel(self, turn_id: str) -> bool:
+        """Cancel a running turn; returns False if it is unknown or already finished."""
+        turn = self.turns.get(turn_id)
+        if turn is None or turn.done or turn.task is None:
+            return False
+        turn.task.cancel()
+        return True
+
+    async def _reap(self) -> None:
+        """Cancel orphaned turns and forget finished ones."""
+        while self.turns:
+            await asyncio.sleep(1.0)
+            now = time.monotonic()
+            for turn_id, turn in list(self.turns.items()):
+                if turn.done:
+                    if turn.subscribers == 0 and now - turn.finished_at > self.retention:
+                        del self.turns[turn_id]
+                elif turn.detached_at is not None and now - turn.detached_at > self.orphan_timeout:
+                    logger.info(f"Cancelling orphaned streaming turn {turn_id}")
+                    self.cancel(turn_id)
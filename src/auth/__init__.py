@@ -0,0 +1,5 @@
+"""Azure AD credential management shared by the Azure clients."""
+
+from .token_manager import AzureTokenManager, get_token_manager
+
+__all__ = ["AzureTokenManager", "get_token_manager"]
@@ -0,0 +1,236 @@
+"""Process-wide Azure AD token cache with proactive background refresh.
+
+Both the Azure OpenAI client and the Cosmos DB client authenticate with
+managed identity. Instead of each creating a `DefaultAzureCredential` and
+fetching tokens inside the request path, they share one `AzureTokenManager`:
+tokens are cached per scope, refreshed by a background thread before they
+expire, and concurrent refreshes of the same scope are de-duplicated. A scope
+whose refresh fails is retried with exponential backoff, so a broken
+credential is not called in a tight loop.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _ScopeState:
+    """Cached token and refresh statistics of one scope."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.token: Any = None
+        self.fetched_at: Optional[float] = None
+        self.refresh_count = 0
+        self.failure_count = 0
+        self.consecutive_failures = 0
+        self.retry_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+
+class AzureTokenManager:
+    """Caches and proactively refreshes Azure AD tokens per scope.
+
+    Implements the `get_token` method of azure-core's `TokenCredential`, so it
+    can be passed wherever a credential is expected (e.g. `CosmosClient`).
+    """
+
+    def __init__(
+        self,
+        credential: Any = None,
+        refresh_margin: float = 300.0,
+        clock: Callable[[], float] = time.time,
+        retry_initial: float = 1.0,
+        retry_max: float = 300.0,
+    ):
+        """Initialize the manager.
+
+        Args:
+            credential: Underlying credential; a DefaultAzureCredential is created on first use if omitted
+            refresh_margin: Refresh tokens this many seconds before they expire
+            clock: Source of the current time in epoch seconds (injectable for tests)
+            retry_initial: Seconds before retrying a scope after its first failed refresh
+            retry_max: Upper bound of the doubling retry delay
+        """
+        self._credential = credential
+        self.refresh_margin = refresh_margin
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self._clock = clock
+        self._scopes: Dict[str, _ScopeState] = {}
+        self._scopes_lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    @property
+    def credential(self) -> Any:
+        """The underlying credential"""
+        if self._credential is None:
+            from azure.identity import DefaultAzureCredential
+
+            self._credential = DefaultAzureCredential()
+        return self._credential
+
+    def _state(self, scope: str) -> _ScopeState:
+        with self._scopes_lock:
+            state = self._scopes.get(scope)
+            if state is None:
+                state = self._scopes[scope] = _ScopeState()
+                self._wakeup.set()
+            return state
+
+    def _needs_refresh(self, state: _ScopeState) -> bool:
+        return state.token is None or state.token.expires_on - self._clock() <= self.refresh_margin
+
+    def _backing_off(self, state: _ScopeState) -> bool:
+        return state.retry_at is not None and self._clock() < state.retry_at
+
+    def get_token(self, *scopes: str, **kwargs: Any) -> Any:
+        """Return a cached token for the scope, fetching it only when due.
+
+        Args:
+            *scopes: A single scope, e.g. "https://cosmos.azure.com/.default"
+            **kwargs: Claims/tenant options; a request with options bypasses the cache
+
+        Returns:
+            azure.core.credentials.AccessToken
+        """
+        if kwargs.get("claims") or kwargs.get("tenant_id") or len(scopes) != 1:
+            return self.credential.get_token(*scopes, **kwargs)
+
+        state = self._state(scopes[0])
+        token = state.token
+        if token is not None and token.expires_on > self._clock():
+            if self._needs_refresh(state) and not self._refresher_alive():
+                # No background refresher running: refresh in the caller, still de-duplicated
+                return self._refresh(scopes[0], state)
+            return token
+        return self._refresh(scopes[0], state)
+
+    def _refresh(self, scope: str, state: _ScopeState, force: bool = False) -> Any:
+        """Fetch a new token unless another thread already did while we waited for the lock"""
+        with state.lock:
+            if not force and not self._needs_refresh(state):
+                return state.token
+            token_valid = state.token is not None and state.token.expires_on > self._clock()
+            if not force and token_valid and self._backing_off(state):
+                # A recent refresh failed; keep serving the still-valid token until the retry is due
+                return state.token
+            try:
+                token = self.credential.get_token(scope)
+            except Exception as e:
+                state.failure_count += 1
+                state.consecutive_failures += 1
+                delay = min(self.retry_initial * 2 ** (state.consecutive_failures - 1), self.retry_max)
+                state.retry_at = self._clock() + delay
+                state.last_error = str(e)
+                logger.warning(f"Token refresh for {scope} failed, retrying in {delay:.0f}s: {e}")
+                if token_valid:
+                    return state.token
+                raise
+            state.token = token
+            state.fetched_at = self._clock()
+            state.refresh_count += 1
+            state.consecutive_failures = 0
+            state.retry_at = None
+            state.last_error = None
+            return token
+
+    def bearer_token_provider(self, scope: str) -> Callable[[], str]:
+        """Return a callable producing bearer tokens, e.g. for `azure_ad_token_provider`"""
+        def provider() -> str:
+            return self.get_token(scope).token
+
+        return provider
+
+    # region Background refresh
+
+    def _refresher_alive(self) -> bool:
+        return self._refresher is not None and self._refresher.is_alive()
+
+    def start_background_refresh(self) -> None:
+        """Start the daemon thread that refreshes tokens before they expire"""
+        if self._refresher_alive():
+            return
+        self._stop.clear()
+        self._refresher = threading.Thread(target=self._refresh_loop, name="azure-token-refresh", daemon=True)
+        self._refresher.start()
+
+    def stop_background_refresh(self) -> None:
+        """Stop the refresh thread"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=5)
+            self._refresher = None
+
+    def _next_refresh_delay(self) -> float:
+        """Seconds until the next scope is due: its refresh time or, after a failure, its retry time"""
+        now = self._clock()
+        with self._scopes_lock:
+            states = list(self._scopes.values())
+        delays = []
+        for state in states:
+            if state.retry_at is not None:
+                delays.append(state.retry_at - now)
+            elif state.token is None:
+                delays.append(0.0)
+            else:
+                delays.append(state.token.expires_on - self.refresh_margin - now)
+        return max(min(delays, default=60.0), 1.0)
+
+    def refresh_due(self) -> None:
+        """Refresh every scope that is due and not backing off after a failure"""
+        with self._scopes_lock:
+            items = list(self._scopes.items())
+        for scope, state in items:
+            if self._needs_refresh(state) and not self._backing_off(state):
+                try:
+                    self._refresh(scope, state)
+                except Exception:
+                    pass  # recorded in state; retried after the backoff
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(timeout=self._next_refresh_delay())
+            self._wakeup.clear()
+            if self._stop.is_set():
+                return
+            self.refresh_due()
+
+    # endregion
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Token age, time to expiry and refresh counters per scope"""
+        now = self._clock()
+        with self._scopes_lock:
+            items = list(self._scopes.items())
+        return {
+            scope: {
+                "token_age_seconds": round(now - state.fetched_at, 1) if state.fetched_at else None,
+                "expires_in_seconds": round(state.token.expires_on - now, 1) if state.token else None,
+                "refresh_count": state.refresh_count,
+                "failure_count": state.failure_count,
+                "consecutive_failures": state.consecutive_failures,
+                "retry_in_seconds": round(max(state.retry_at - now, 0.0), 1) if state.retry_at else None,
+                "last_error": state.last_error,
+            }
+            for scope, state in items
+        }
+
+
+_manager: Optional[AzureTokenManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_token_manager() -> AzureTokenManager:
+    """Return the process-wide token manager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = AzureTokenManager()
+        return _manager
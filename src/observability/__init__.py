@@ -0,0 +1,5 @@
+"""Request-scoped context shared by the web layer and the layers below it."""
+
+from .request_context import current_endpoint
+
+__all__ = ["current_endpoint"]
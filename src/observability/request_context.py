@@ -0,0 +1,12 @@
+"""Context variables describing the request being served.
+
+The web layer sets them; lower layers (for example Cosmos DB request charge
+accounting) read them to attribute their work without importing the web
+layer or threading the values through every call.
+"""
+
+from contextvars import ContextVar
+from typing import Optional
+
+# "METHOD /path" of the HTTP request being served, or None outside a request
+current_endpoint: ContextVar[Optional[str]] = ContextVar("current_endpoint", default=None)
@@ -0,0 +1,6 @@
+"""Session-affine request routing across application replicas."""
+
+from .hash_ring import HashRing
+from .proxy import SessionAffinityProxy
+
+__all__ = ["HashRing", "SessionAffinityProxy"]
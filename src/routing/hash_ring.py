@@ -0,0 +1,71 @@
+"""Consistent hash ring for mapping sessions to workers."""
+
+import bisect
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes.
+
+    Each worker is placed on the ring `replicas` times. A key belongs to the
+    first worker clockwise from its hash, so adding or removing a worker only
+    moves the keys adjacent to that worker's points (about 1/N of all keys).
+    """
+
+    def __init__(self, nodes: Optional[Iterable[str]] = None, replicas: int = 160):
+        """Initialize the ring.
+
+        Args:
+            nodes: Initial worker identifiers (e.g. base URLs)
+            replicas: Virtual nodes per worker; more gives a more even spread
+        """
+        self.replicas = replicas
+        self._lock = threading.Lock()
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self._nodes: set = set()
+        for node in nodes or []:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+    @property
+    def nodes(self) -> List[str]:
+        """Workers currently on the ring."""
+        return sorted(self._nodes)
+
+    def add_node(self, node: str) -> None:
+        """Place a worker on the ring."""
+        with self._lock:
+            if node in self._nodes:
+                return
+            self._nodes.add(node)
+            for i in range(self.replicas):
+                point = self._hash(f"{node}#{i}")
+                if point in self._owners:
+                    continue
+                bisect.insort(self._points, point)
+                self._owners[point] = node
+
+    def remove_node(self, node: str) -> None:
+        """Take a worker off the ring; its keys move to the next workers."""
+        with self._lock:
+            if node not in self._nodes:
+                return
+            self._nodes.discard(node)
+            points = [p for p, owner in self._owners.items() if owner == node]
+            for point in points:
+                del self._owners[point]
+            self._points = sorted(self._owners)
+
+    def get_node(self, key: str) -> Optional[str]:
+        """Return the worker that owns a key, or None if the ring is empty."""
+        with self._lock:
+            if not self._points:
+                return None
+            index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+            return self._owners[self._points[index]]
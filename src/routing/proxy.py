@@ -0,0 +1,495 @@
+"""Session-affine ASGI front proxy.
+
+Conversation state (the agent thread and the chat session registry) lives in
+each replica's memory, so every request of a session must reach the same
+replica. The proxy extracts the session key from the request, picks the
+owning worker on a consistent hash ring and forwards the request, streaming
+the response back.
+
+Requests that start a conversation without a key (a chat message without
+`session_id`, an A2A message without `contextId`) would get a key assigned by
+whichever worker served them, and the follow-up carrying that key could hash
+to a different worker. The proxy therefore assigns the key itself, writing a
+new `session_id`/`contextId` into the body before routing on it.
+
+WebSocket connections are routed by their X-Session-Id header or
+`session_id` query parameter and relayed frame by frame. A multiplexed chat
+connection (`/api/chat/ws`) lands on a single worker, so it may only carry
+the sessions that worker owns: the proxy gives a `send` frame without a
+`session_id` a key that hashes to that worker, and answers one naming a
+session owned by another worker with an `error` frame instead of forwarding
+it. Open one connection per worker, using the `session_id` of a conversation
+to reach its worker.
+
+Requests that address a turn, a batch or an A2A task carry no session key:
+
+- a stream cancel (`/api/chat/stream/{turn_id}/cancel`) follows the session
+  its turn was started in, learned from the stream request's `turn_id`;
+- a batch is submitted under an id the proxy assigns (`X-Batch-Id`), and
+  `/a2a/batch/{batch_id}...` is routed on that id;
+- A2A `tasks/*` calls follow the conversation their task belongs to, learned
+  from the `taskId` in the response to the message that created it.
+
+The learned turns and tasks are kept in a bounded in-memory table, so after a
+proxy restart they fall back to the X-Session-Id header, which clients may
+always send.
+
+Run several replicas and the proxy locally::
+
+    uvicorn main:app --port 8001 &
+    uvicorn main:app --port 8002 &
+    SESSION_ROUTER_WORKERS=http://localhost:8001,http://localhost:8002 \
+        python -m src.routing.proxy
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import uuid
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import httpx
+from starlette.requests import HTTPConnection, Request
+from starlette.responses import JSONResponse, StreamingResponse
+
+from .hash_ring import HashRing
+
+logger = logging.getLogger(__name__)
+
+SESSION_HEADER = "x-session-id"
+BATCH_HEADER = "x-batch-id"
+ROUTED_WORKER_HEADER = "x-routed-worker"
+
+# Hop-by-hop headers are not forwarded
+_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host", "content-length",
+}
+
+# Close codes (RFC 6455)
+_WS_INTERNAL_ERROR = 1011
+_WS_TRY_AGAIN_LATER = 1013
+
+# Close codes that only report a missing status or a dropped connection and
+# must not be sent in a close frame
+_WS_RESERVED_CODES = {1005, 1006}
+
+# Multiplexed chat WebSocket, whose `send` frames name their session
+_CHAT_WS_PATH = "/api/chat/ws"
+
+# JSON-RPC methods of the A2A protocol that start or continue a conversation
+_A2A_MESSAGE_METHODS = {"message/send", "message/stream"}
+
+# Task ids are read from the start of a message response only
+_TASK_ID_PATTERN = re.compile(rb'"taskId"\s*:\s*"([^"\\]+)"')
+_TASK_ID_SCAN_BYTES = 64 * 1024
+
+
+def _json_object(body: bytes) -> Optional[dict]:
+    try:
+        payload = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def extract_session_key(headers, query_params, path: str, body: bytes) -> Optional[str]:
+    """Find the session key of a request.
+
+    Checked in order: the X-Session-Id header, a session_id query parameter,
+    a session id in the path (/api/chat/sessions/{id}), `session_id` in a
+    chat JSON body, and `contextId` in an A2A JSON-RPC body.
+
+    Returns:
+        The session key, or None for session-less requests
+    """
+    if headers.get(SESSION_HEADER):
+        return headers[SESSION_HEADER]
+    if query_params.get("session_id"):
+        return query_params["session_id"]
+    if path.startswith("/api/chat/sessions/"):
+        return path.rsplit("/", 1)[-1] or None
+    if not body:
+        return None
+    payload = _json_object(body)
+    if payload is None:
+        return None
+    if payload.get("session_id"):
+        return payload["session_id"]
+    params = payload.get("params")
+    if not isinstance(params, dict):
+        return None
+    message = params.get("message")
+    if isinstance(message, dict) and message.get("contextId"):
+        return message["contextId"]
+    return params.get("contextId") or None
+
+
+def extract_resource_id(path: str, body: bytes) -> Optional[str]:
+    """Find the turn, batch or A2A task a session-less request addresses.
+
+    Returns:
+        A namespaced id (`turn:<id>`, `batch:<id>` or `task:<id>`), or None
+    """
+    parts = path.strip("/").split("/")
+    if len(parts) == 5 and parts[:3] == ["api", "chat", "stream"] and parts[4] == "cancel":
+        return f"turn:{parts[3]}"
+    if len(parts) >= 3 and parts[:2] == ["a2a", "batch"]:
+        return f"batch:{parts[2]}"
+    if not path.startswith("/a2a") or not body:
+        return None
+    payload = _json_object(body)
+    if payload is None or not str(payload.get("method", "")).startswith("tasks/"):
+        return None
+    params = payload.get("params")
+    if not isinstance(params, dict):
+        return None
+    task_id = params.get("id") or params.get("taskId")
+    return f"task:{task_id}" if isinstance(task_id, str) and task_id else None
+
+
+def assign_session_key(path: str, body: bytes) -> Tuple[Optional[str], bytes]:
+    """Give a session-less conversation request a key before it is routed.
+
+    A chat message without `session_id` gets one, and so does the `message`
+    of an A2A `message/send` or `message/stream` call without `contextId`.
+
+    Returns:
+        The assigned key (None if the request does not start a conversation)
+        and the body to forward
+    """
+    payload = _json_object(body)
+    if payload is None:
+        return None, body
+    key = uuid.uuid4().hex
+    if path.startswith("/api/chat/") and isinstance(payload.get("message"), str):
+        payload["session_id"] = key
+    elif payload.get("method") in _A2A_MESSAGE_METHODS:
+        params = payload.get("params")
+        message = params.get("message") if isinstance(params, dict) else None
+        if not isinstance(message, dict):
+            return None, body
+        message["contextId"] = key
+    else:
+        return None, body
+    return key, json.dumps(payload).encode("utf-8")
+
+
+class SessionAffinityProxy:
+    """ASGI application forwarding requests to the worker owning their session."""
+
+    def __init__(
+        self,
+        workers: list[str],
+        health_interval: float = 5.0,
+        client: Optional[httpx.AsyncClient] = None,
+        max_routes: int = 100_000,
+    ):
+        """Initialize the proxy.
+
+        Args:
+            workers: Base URLs of the application replicas
+            health_interval: Seconds between worker health checks (0 disables)
+            client: HTTP client used for forwarding
+            max_routes: Turns and tasks whose session is remembered
+        """
+        self.workers = list(workers)
+        self.ring = HashRing(self.workers)
+        self.health_interval = health_interval
+        self.client = client or httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=5.0))
+        self.max_routes = max_routes
+        # Session keys of the turns and tasks seen, least recently used first
+        self._routes: "OrderedDict[str, str]" = OrderedDict()
+        self._health_task: Optional[asyncio.Task] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] == "websocket":
+            await self._forward_websocket(scope, receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        response = await self._forward(Request(scope, receive))
+        await response(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if self.health_interval:
+                    self._health_task = asyncio.create_task(self._health_loop())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._health_task:
+                    self._health_task.cancel()
+                await self.client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def route(self, session_key: Optional[str]) -> Optional[str]:
+        """Pick the worker for a session key; session-less requests are spread by the ring too."""
+        if session_key is None:
+            session_key = os.urandom(8).hex()
+        return self.ring.get_node(session_key)
+
+    def remember(self, resource_id: str, session_key: str) -> None:
+        """Record the session a turn or task belongs to."""
+        self._routes[resource_id] = session_key
+        self._routes.move_to_end(resource_id)
+        if len(self._routes) > self.max_routes:
+            self._routes.popitem(last=False)
+
+    def learned_key(self, resource_id: Optional[str]) -> Optional[str]:
+        """Session key recorded for a turn or task, if any."""
+        session_key = self._routes.get(resource_id) if resource_id else None
+        if session_key is not None:
+            self._routes.move_to_end(resource_id)
+        return session_key
+
+    def _learn_task(self, head: bytes, session_key: str) -> Optional[bytes]:
+        """Look for the task id at the start of a message response.
+
+        Returns:
+            The bytes scanned so far, or None once the id is found or the
+            scan limit is reached
+        """
+        match = _TASK_ID_PATTERN.search(head)
+        if match:
+            self.remember(f"task:{match.group(1).decode()}", session_key)
+            return None
+        return head if len(head) < _TASK_ID_SCAN_BYTES else None
+
+    async def _forward(self, request: Request):
+        body = await request.body()
+        path = request.url.path
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in _HOP_HEADERS}
+        resource_id = extract_resource_id(path, body)
+        if request.method == "POST" and path.rstrip("/") == "/a2a/batch":
+            # The batch id is its routing key, so the proxy picks it
+            batch_id = uuid.uuid4().hex
+            headers[BATCH_HEADER] = batch_id
+            session_key = f"batch:{batch_id}"
+        elif resource_id and resource_id.startswith("batch:"):
+            session_key = resource_id
+        else:
+            session_key = (
+                extract_session_key(request.headers, request.query_params, path, body)
+                or self.learned_key(resource_id)
+            )
+            if session_key is None and request.method == "POST" and body:
+                session_key, body = assign_session_key(path, body)
+
+        payload = _json_object(body) if session_key and request.method == "POST" else None
+        learn_tasks = False
+        if payload is not None:
+            if path == "/api/chat/stream" and isinstance(payload.get("turn_id"), str):
+                self.remember(f"turn:{payload['turn_id']}", session_key)
+            learn_tasks = path.startswith("/a2a") and payload.get("method") in _A2A_MESSAGE_METHODS
+
+        worker = self.route(session_key)
+        if worker is None:
+            return JSONResponse({"error": "No healthy workers"}, status_code=503)
+
+        if session_key:
+            headers[SESSION_HEADER] = session_key
+        url = httpx.URL(worker + path, query=request.url.query.encode("utf-8"))
+        upstream_request = self.client.build_request(request.method, url, headers=headers, content=body)
+        try:
+            upstream = await self.client.send(upstream_request, stream=True)
+        except httpx.TransportError as e:
+            logger.warning(f"Worker {worker} unreachable, removing from ring: {e}")
+            self.ring.remove_node(worker)
+            return JSONResponse({"error": "Worker unavailable, retry"}, status_code=503)
+
+        response_headers = {
+            k: v for k, v in upstream.headers.items() if k.lower() not in _HOP_HEADERS
+        }
+        response_headers[ROUTED_WORKER_HEADER] = worker
+        learn_tasks = learn_tasks and "content-encoding" not in upstream.headers
+
+        async def body_iterator():
+            head = b"" if learn_tasks else None
+            try:
+                async for chunk in upstream.aiter_raw():
+                    if head is not None:
+                        head = self._learn_task(head + chunk, session_key)
+                    yield chunk
+            finally:
+                await upstream.aclose()
+
+        return StreamingResponse(
+            body_iterator(),
+            status_code=upstream.status_code,
+            headers=response_headers,
+        )
+
+    def owned_session_key(self, worker: str, attempts: int = 1000) -> Optional[str]:
+        """A new session key that the ring maps to `worker`, if one is found."""
+        for _ in range(attempts):
+            key = uuid.uuid4().hex
+            if self.ring.get_node(key) == worker:
+                return key
+        return None
+
+    def check_chat_frame(self, text: str, worker: str) -> Tuple[Optional[str], Optional[dict]]:
+        """Keep the sessions of a multiplexed chat connection on its worker.
+
+        Returns:
+            The frame text to forward (None to drop it) and an error frame to
+            send back to the client, if any
+        """
+        payload = _json_object(text.encode("utf-8"))
+        if payload is None or payload.get("type") != "send":
+            return text, None
+        session_id = payload.get("session_id")
+        if not session_id:
+            session_id = self.owned_session_key(worker)
+            if session_id is None:
+                return text, None
+            payload["session_id"] = session_id
+            return json.dumps(payload), None
+        if self.ring.get_node(session_id) == worker:
+            return text, None
+        return None, {
+            "type": "error",
+            "id": payload.get("id"),
+            "session_id": session_id,
+            "error": "Session is served by another replica; open a connection with its session_id",
+        }
+
+    async def _forward_websocket(self, scope, receive, send):
+        """Relay a WebSocket connection to the worker owning its session."""
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import ConnectionClosed, InvalidHandshake
+
+        request = HTTPConnection(scope)
+        if (await receive())["type"] != "websocket.connect":
+            return
+        session_key = extract_session_key(request.headers, request.query_params, request.url.path, b"")
+        worker = self.route(session_key)
+        if worker is None:
+            await send({"type": "websocket.close", "code": _WS_TRY_AGAIN_LATER, "reason": "No healthy workers"})
+            return
+
+        headers = {
+            k: v for k, v in request.headers.items()
+            if k.lower() not in _HOP_HEADERS and not k.lower().startswith("sec-websocket-")
+        }
+        if session_key:
+            headers[SESSION_HEADER] = session_key
+        url = "ws" + worker[len("http"):] + request.url.path
+        if request.url.query:
+            url += "?" + request.url.query
+        try:
+            upstream = await connect(
+                url,
+                additional_headers=headers,
+                subprotocols=scope.get("subprotocols") or None,
+                open_timeout=5,
+            )
+        except (OSError, InvalidHandshake, asyncio.TimeoutError) as e:
+            logger.warning(f"WebSocket to worker {worker} failed: {e}")
+            if isinstance(e, OSError):
+                self.ring.remove_node(worker)
+            await send({"type": "websocket.close", "code": _WS_TRY_AGAIN_LATER, "reason": "Worker unavailable"})
+            return
+
+        await send({
+            "type": "websocket.accept",
+            "subprotocol": upstream.subprotocol,
+            "headers": [(ROUTED_WORKER_HEADER.encode(), worker.encode())],
+        })
+
+        check_frames = request.url.path == _CHAT_WS_PATH
+
+        async def client_to_worker():
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    code = message.get("code", 1000)
+                    await upstream.close(code=1000 if code in _WS_RESERVED_CODES else code)
+                    return
+                if message.get("text") is not None:
+                    text, error = message["text"], None
+                    if check_frames:
+                        text, error = self.check_chat_frame(text, worker)
+                    if error is not None:
+                        await send({"type": "websocket.send", "text": json.dumps(error)})
+                    if text is not None:
+                        await upstream.send(text)
+                elif message.get("bytes") is not None:
+                    await upstream.send(message["bytes"])
+
+        async def worker_to_client():
+            try:
+                async for data in upstream:
+                    key = "text" if isinstance(data, str) else "bytes"
+                    await send({"type": "websocket.send", key: data})
+            except ConnectionClosed:
+                pass
+            except OSError:
+                return  # The client went away
+            code, reason = upstream.close_code, upstream.close_reason or ""
+            if code is None or code == 1006:
+                code, reason = _WS_INTERNAL_ERROR, "Worker connection lost"
+            elif code == 1005:
+                code = 1000
+            try:
+                await send({"type": "websocket.close", "code": code, "reason": reason})
+            except OSError:
+                pass  # The client closed first
+
+        tasks = [asyncio.create_task(client_to_worker()), asyncio.create_task(worker_to_client())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    logger.warning(f"WebSocket relay to worker {worker} failed: {task.exception()!r}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await upstream.close()
+
+    async def _health_loop(self):
+        """Periodically re-check workers, adding recovered ones and removing failed ones."""
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for worker in self.workers:
+                try:
+                    response = await self.client.get(f"{worker}/health", timeout=2.0)
+                    healthy = response.status_code == 200
+                except httpx.HTTPError:
+                    healthy = False
+                if healthy and worker not in self.ring.nodes:
+                    logger.info(f"Worker {worker} joined the ring")
+                    self.ring.add_node(worker)
+                elif not healthy and worker in self.ring.nodes:
+                    logger.warning(f"Worker {worker} left the ring")
+                    self.ring.remove_node(worker)
+
+
+def create_proxy_from_env() -> SessionAffinityProxy:
+    """Create the proxy from SESSION_ROUTER_WORKERS (comma-separated base URLs)."""
+    workers = [w.strip().rstrip("/") for w in os.getenv("SESSION_ROUTER_WORKERS", "").split(",") if w.strip()]
+    if not workers:
+        raise ValueError("SESSION_ROUTER_WORKERS environment variable is required")
+    return SessionAffinityProxy(
+        workers,
+        health_interval=float(os.getenv("SESSION_ROUTER_HEALTH_INTERVAL", "5")),
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run(
+        create_proxy_from_env(),
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("SESSION_ROUTER_PORT", 8080)),
+    )
@@ -1,5 +1,5 @@
 """Storage module for conversation persistence."""
 
-from .cosmos_storage import CosmosConversationStorage
+from .cosmos_storage import CosmosConversationStorage, get_conversation_storage
 
-__all__ = ["CosmosConversationStorage"]
+__all__ = ["CosmosConversationStorage", "get_conversation_storage"]
@@ -0,0 +1,42 @@
+"""Export conversations for analytics: `python -m src.storage --output exports/conversations.jsonl.gz`."""
+
+import argparse
+import json
+import logging
+
+from dotenv import load_dotenv
+
+from .cosmos_storage import get_conversation_storage
+from .export import DEFAULT_SKEW_SECONDS, EXPORT_FORMATS, export_conversations, read_watermark, write_watermark
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO)
+
+parser = argparse.ArgumentParser(description="Export conversations to compressed JSONL or Parquet")
+parser.add_argument("--output", required=True, help="Destination file")
+parser.add_argument("--format", choices=EXPORT_FORMATS, default="jsonl")
+parser.add_argument("--since", help="Only export conversations modified after this ISO timestamp")
+parser.add_argument("--watermark-file", help="Read --since from, and save the new watermark to, this file")
+parser.add_argument("--page-size", type=int, default=100)
+parser.add_argument("--concurrency", type=int, default=4)
+parser.add_argument(
+    "--skew-seconds",
+    type=float,
+    default=DEFAULT_SKEW_SECONDS,
+    help="Clock-skew margin subtracted from the start time to form the next watermark",
+)
+args = parser.parse_args()
+
+since = args.since or (read_watermark(args.watermark_file) if args.watermark_file else None)
+summary = export_conversations(
+    get_conversation_storage(),
+    args.output,
+    export_format=args.format,
+    since=since,
+    page_size=args.page_size,
+    concurrency=args.concurrency,
+    skew_seconds=args.skew_seconds,
+)
+if args.watermark_file:
+    write_watermark(args.watermark_file, summary)
+print(json.dumps(summary, indent=2))
@@ -0,0 +1,119 @@
+"""Read-through cache of conversation documents.
+
+Documents are kept per session together with their Cosmos DB `_etag`, so a
+read can be revalidated with `If-None-Match` instead of transferring (and
+paying for) the full document again. The cache is bounded by the estimated
+size of the documents and evicts the least recently used sessions first.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class CachedConversation:
+    """A cached conversation document and its ETag."""
+
+    __slots__ = ("document", "etag", "size", "written_at")
+
+    def __init__(self, document: Dict, size: int, written_at: Optional[float]):
+        self.document = document
+        self.etag: Optional[str] = document.get("_etag")
+        self.size = size
+        self.written_at = written_at
+
+
+class ConversationCache:
+    """LRU cache of conversation documents bounded by memory."""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Upper bound of the estimated size of cached documents
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, CachedConversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.full_reads = 0
+        self.full_read_charge = 0.0
+        self.conditional_read_charge = 0.0
+
+    def get(self, session_id: str) -> Optional[CachedConversation]:
+        """Return the cached entry of a session and mark it recently used."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries.move_to_end(session_id)
+            return entry
+
+    def put(self, session_id: str, document: Dict, written: bool = False) -> None:
+        """Cache a document read from or written to Cosmos DB.
+
+        Args:
+            session_id: Unique session identifier
+            document: Conversation document including `_etag`
+            written: Whether this pod just wrote the document
+        """
+        size = len(json.dumps(document, separators=(",", ":")))
+        if size > self.max_bytes:
+            self.invalidate(session_id)
+            return
+        entry = CachedConversation(document, size, time.monotonic() if written else None)
+        with self._lock:
+            previous = self._entries.pop(session_id, None)
+            if previous is not None:
+                self.current_bytes -= previous.size
+            self._entries[session_id] = entry
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size
+                self.evictions += 1
+
+    def invalidate(self, session_id: str) -> None:
+        """Drop a session from the cache."""
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self.current_bytes -= entry.size
+
+    def record_hit(self, request_charge: float = 0.0) -> None:
+        """Count a read answered from the cache (after a 304 or without revalidation)."""
+        with self._lock:
+            self.hits += 1
+            self.conditional_read_charge += request_charge
+
+    def record_miss(self, request_charge: float = 0.0) -> None:
+        """Count a read that transferred the full document."""
+        with self._lock:
+            self.misses += 1
+            self.full_reads += 1
+            self.full_read_charge += request_charge
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate, memory use and estimated RU savings"""
+        with self._lock:
+            reads = self.hits + self.misses
+            average_full_read = self.full_read_charge / self.full_reads if self.full_reads else 0.0
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / reads, 4) if reads else None,
+                "request_charge": round(self.full_read_charge + self.conditional_read_charge, 2),
+                # What the hits would have cost as full reads, minus what revalidation cost
+                "request_charge_saved": round(
+                    max(self.hits * average_full_read - self.conditional_read_charge, 0.0), 2
+                ),
+            }
@@ -1,16 +1,26 @@
 """Cosmos DB storage implementation for conversations."""
 
 import os
+import copy
+import time
+import asyncio
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta
 
 from azure.cosmos import CosmosClient, PartitionKey
 from azure.cosmos.exceptions import CosmosResourceNotFoundError
-from azure.identity import DefaultAzureCredential
+
+from src.auth import get_token_manager
+
+from .conversation_cache import ConversationCache
+from .request_charge import REQUEST_CHARGE_HEADER, RequestChargeTracker
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of operations in one Cosmos DB transactional batch
+MAX_BATCH_OPERATIONS = 100
+
 
 class CosmosConversationStorage:
     """Stores conversation history in Azure Cosmos DB."""
@@ -22,6 +32,22 @@ class CosmosConversationStorage:
         self.database_name = os.getenv("AZURE_COSMOS_DATABASE", "AgentDB")
         self.container_name = os.getenv("AZURE_COSMOS_CONTAINER", "conversations")
         
+        # Retention policy: documents expire this long after their last write
+        retention_days = os.getenv("AZURE_COSMOS_RETENTION_DAYS")
+        self.ttl_seconds: Optional[int] = int(float(retention_days) * 86400) if retention_days else None
+        self.purge_concurrency = int(os.getenv("AZURE_COSMOS_PURGE_CONCURRENCY", "16"))
+        
+        # Read-through cache; documents this pod wrote within cache_fresh_seconds
+        # are served without revalidation, everything else is revalidated by ETag
+        self.cache = ConversationCache(
+            max_bytes=int(float(os.getenv("AZURE_COSMOS_CACHE_MAX_MB", "16")) * 1024 * 1024)
+        )
+        self.cache_fresh_seconds = float(os.getenv("AZURE_COSMOS_CACHE_FRESH_SECONDS", "0"))
+        
+        # RU accounting; with a budget, operations wait client-side instead of hitting 429s
+        ru_budget = os.getenv("AZURE_COSMOS_RU_BUDGET")
+        self.charges = RequestChargeTracker(budget_per_second=float(ru_budget) if ru_budget else None)
+        
         if not self.endpoint:
             raise ValueError("AZURE_COSMOS_ENDPOINT environment variable is required")
         
@@ -31,8 +57,7 @@ class CosmosConversationStorage:
             self.client = CosmosClient(self.endpoint, credential=self.key)
         else:
             logger.info("Initializing Cosmos DB client with Managed Identity")
-            credential = DefaultAzureCredential()
-            self.client = CosmosClient(self.endpoint, credential=credential)
+            self.client = CosmosClient(self.endpoint, credential=get_token_manager())
         
         # Get database and container
         self.database = self.client.get_database_client(self.database_name)
@@ -50,6 +75,7 @@ class CosmosConversationStorage:
         """
         try:
             # Try to get existing conversation
+            await self.charges.throttle()
             conversation = self._get_conversation(session_id)
             
             # Add new message
@@ -62,11 +88,21 @@ class CosmosConversationStorage:
             # Update last modified
             conversation["lastModified"] = datetime.utcnow().isoformat()
             
-            # Upsert the conversation
-            self.container.upsert_item(conversation)
+            # Cosmos DB expires the document ttl seconds after this write
+            if self.ttl_seconds is not None:
+                conversation["ttl"] = self.ttl_seconds
+            
+            # Upsert the conversation and cache the stored version with its new ETag
+            await self.charges.throttle()
+            saved = self.container.upsert_item(
+                conversation,
+                response_hook=self.charges.response_hook("upsert_conversation", session_id)
+            )
+            self.cache.put(session_id, saved, written=True)
             logger.info(f"Saved message for session {session_id}")
             
         except Exception as e:
+            self.cache.invalidate(session_id)
             logger.error(f"Error saving message to Cosmos DB: {e}")
             raise
 
@@ -80,6 +116,7 @@ class CosmosConversationStorage:
             List of conversation messages
         """
         try:
+            await self.charges.throttle()
             conversation = self._get_conversation(session_id)
             return conversation.get("messages", [])
         except CosmosResourceNotFoundError:
@@ -98,17 +135,134 @@ class CosmosConversationStorage:
         Returns:
             True if deleted successfully, False otherwise
         """
+        self.cache.invalidate(session_id)
         try:
-            self.container.delete_item(item=session_id, partition_key=session_id)
+            deleted = await asyncio.to_thread(self._delete_session_items, session_id)
+            if not deleted:
+                logger.warning(f"Conversation {session_id} not found for deletion")
+                return False
             logger.info(f"Deleted conversation for session {session_id}")
             return True
-        except CosmosResourceNotFoundError:
-            logger.warning(f"Conversation {session_id} not found for deletion")
-            return False
         except Exception as e:
             logger.error(f"Error deleting conversation from Cosmos DB: {e}")
             return False
 
+    async def purge_conversations(
+        self,
+        older_than: Optional[timedelta] = None,
+        session_ids: Optional[Iterable[str]] = None,
+    ) -> Dict[str, int]:
+        """Delete many conversations at once.
+        
+        Sessions are selected by age (last modification older than
+        `older_than`), by explicit id, or both. Each session's items are
+        deleted with partition-scoped transactional batches, and sessions are
+        purged concurrently (up to AZURE_COSMOS_PURGE_CONCURRENCY at a time).
+        
+        Args:
+            older_than: Purge sessions not modified within this period
+            session_ids: Purge these sessions
+            
+        Returns:
+            Counts of purged sessions, deleted items and failed sessions
+        """
+        targets = set(session_ids or [])
+        if older_than is not None:
+            cutoff = (datetime.utcnow() - older_than).isoformat()
+            targets.update(await asyncio.to_thread(self._query_sessions_modified_before, cutoff))
+        
+        semaphore = asyncio.Semaphore(self.purge_concurrency)
+        result = {"sessions": 0, "items": 0, "failed": 0}
+        
+        async def purge(session_id: str) -> None:
+            async with semaphore:
+                try:
+                    deleted = await asyncio.to_thread(self._delete_session_items, session_id)
+                except Exception as e:
+                    logger.error(f"Error purging session {session_id}: {e}")
+                    result["failed"] += 1
+                    return
+            if deleted:
+                result["sessions"] += 1
+                result["items"] += deleted
+        
+        await asyncio.gather(*(purge(session_id) for session_id in targets))
+        logger.info(f"Purged {result['sessions']} conversations ({result['items']} items, {result['failed']} failed)")
+        return result
+
+    def enable_ttl(self) -> None:
+        """Turn on per-document TTL for the container.
+        
+        Sets the container default TTL to -1 (items never expire unless they
+        carry a `ttl`), which Cosmos DB requires before per-item TTLs apply.
+        A replace sends the whole container definition, so every other setting
+        read from the container is passed back unchanged.
+        """
+        properties = self.container.read()
+        if properties.get("defaultTtl") is not None:
+            return
+        partition_key = properties["partitionKey"]
+        paths = partition_key["paths"]
+        optional = {
+            "analyticalStorageTtl": "analytical_storage_ttl",
+            "computedProperties": "computed_properties",
+            "fullTextPolicy": "full_text_policy",
+            "vectorEmbeddingPolicy": "vector_embedding_policy",
+        }
+        kwargs = {arg: properties[key] for key, arg in optional.items() if properties.get(key) is not None}
+        self.database.replace_container(
+            self.container,
+            partition_key=PartitionKey(
+                path=paths if len(paths) > 1 else paths[0],
+                kind=partition_key.get("kind", "Hash"),
+                version=partition_key.get("version", 2),
+            ),
+            indexing_policy=properties.get("indexingPolicy"),
+            conflict_resolution_policy=properties.get("conflictResolutionPolicy"),
+            default_ttl=-1,
+            **kwargs,
+        )
+        logger.info(f"Enabled per-document TTL on {self.database_name}/{self.container_name}")
+
+    def _query_sessions_modified_before(self, cutoff: str) -> List[str]:
+        """Return ids of sessions whose last modification is before `cutoff` (ISO timestamp)."""
+        query = "SELECT DISTINCT VALUE c.sessionId FROM c WHERE c.lastModified < @cutoff"
+        self.charges.throttle_sync()
+        return list(self.container.query_items(
+            query=query,
+            parameters=[{"name": "@cutoff", "value": cutoff}],
+            enable_cross_partition_query=True,
+            response_hook=self.charges.response_hook("query_stale_sessions")
+        ))
+
+    def _delete_session_items(self, session_id: str) -> int:
+        """Delete every item of a session with transactional batches in its partition.
+        
+        Args:
+            session_id: Unique session identifier (also the partition key)
+            
+        Returns:
+            Number of items deleted
+        """
+        self.cache.invalidate(session_id)
+        self.charges.throttle_sync()
+        item_ids = [
+            item["id"] for item in self.container.query_items(
+                query="SELECT c.id FROM c",
+                partition_key=session_id,
+                response_hook=self.charges.response_hook("query_session_items", session_id)
+            )
+        ]
+        for start in range(0, len(item_ids), MAX_BATCH_OPERATIONS):
+            operations = [("delete", (item_id,)) for item_id in item_ids[start:start + MAX_BATCH_OPERATIONS]]
+            self.charges.throttle_sync()
+            self.container.execute_item_batch(
+                batch_operations=operations,
+                partition_key=session_id,
+                response_hook=self.charges.response_hook("delete_batch", session_id)
+            )
+        return len(item_ids)
+
     async def get_all_sessions(self) -> List[str]:
         """Get all active session IDs.
         
@@ -117,28 +271,129 @@ class CosmosConversationStorage:
         """
         try:
             query = "SELECT c.sessionId FROM c"
+            await self.charges.throttle()
             items = list(self.container.query_items(
                 query=query,
-                enable_cross_partition_query=True
+                enable_cross_partition_query=True,
+                response_hook=self.charges.response_hook("query_all_sessions")
             ))
             return [item["sessionId"] for item in items]
         except Exception as e:
             logger.error(f"Error retrieving sessions from Cosmos DB: {e}")
             return []
 
+    def metrics(self) -> Dict[str, Any]:
+        """Storage metrics: read-through cache hit rate and RU savings, RU usage and throttling."""
+        return {"cache": self.cache.stats(), "request_charge": self.charges.report()}
+
+    def _read_item(self, session_id: str, etag: Optional[str] = None) -> Tuple[Dict, float]:
+        """Read a conversation document, conditionally if an ETag is given.
+        
+        Returns:
+            The document (empty when unchanged since `etag`) and the request charge
+        """
+        headers: Dict[str, str] = {}
+        record = self.charges.response_hook("read_conversation", session_id)
+        
+        def hook(response_headers: Dict, result: Any) -> None:
+            headers.update(response_headers)
+            record(response_headers, result)
+        
+        kwargs = {"initial_headers": {"If-None-Match": etag}} if etag else {}
+        document = self.container.read_item(
+            item=session_id,
+            partition_key=session_id,
+            response_hook=hook,
+            **kwargs
+        )
+        return document, float(headers.get(REQUEST_CHARGE_HEADER, 0) or 0)
+
+    def iter_conversations(
+        self,
+        since: Optional[str] = None,
+        page_size: int = 100,
+        concurrency: int = 4,
+    ) -> List[Iterator[Dict]]:
+        """Stream conversation documents for export, split for parallel reading.
+        
+        The container's feed ranges are spread over up to `concurrency`
+        iterators, each paging through its ranges with `page_size` documents
+        per round trip. The RU budget is checked before every page, not just
+        once per feed range. SDKs without feed range support get a single
+        iterator.
+        
+        Args:
+            since: Only conversations modified after this ISO timestamp
+            page_size: Documents per page
+            concurrency: Maximum number of iterators
+            
+        Returns:
+            Iterators over disjoint parts of the container
+        """
+        query = "SELECT * FROM c"
+        parameters: List[Dict[str, Any]] = []
+        if since:
+            query += " WHERE c.lastModified > @since"
+            parameters.append({"name": "@since", "value": since})
+        
+        def read(feed_ranges: List[Optional[Dict]]) -> Iterator[Dict]:
+            for feed_range in feed_ranges:
+                kwargs = {"feed_range": feed_range} if feed_range is not None else {"enable_cross_partition_query": True}
+                pages = self.container.query_items(
+                    query=query,
+                    parameters=parameters,
+                    max_item_count=page_size,
+                    response_hook=self.charges.response_hook("export_query"),
+                    **kwargs
+                ).by_page()
+                # Each page is fetched lazily by next(), so wait for budget first
+                while True:
+                    self.charges.throttle_sync()
+                    try:
+                        page = next(pages)
+                    except StopIteration:
+                        break
+                    yield from page
+        
+        read_feed_ranges = getattr(self.container, "read_feed_ranges", None)
+        if read_feed_ranges is None or concurrency <= 1:
+            return [read([None])]
+        feed_ranges = list(read_feed_ranges())
+        groups = [feed_ranges[i::concurrency] for i in range(min(concurrency, len(feed_ranges)))]
+        return [read(group) for group in groups]
+
     def _get_conversation(self, session_id: str) -> Dict:
         """Get conversation document or create new one.
         
+        Reads go through the conversation cache: a cached document is
+        revalidated with If-None-Match and reused when Cosmos DB answers 304.
+        
         Args:
             session_id: Unique session identifier
             
         Returns:
-            Conversation document
+            Conversation document (a copy the caller may modify)
         """
+        cached = self.cache.get(session_id)
+        if (
+            cached is not None
+            and cached.written_at is not None
+            and time.monotonic() - cached.written_at < self.cache_fresh_seconds
+        ):
+            self.cache.record_hit()
+            return copy.deepcopy(cached.document)
+        
         try:
             # Try to read existing conversation
-            return self.container.read_item(item=session_id, partition_key=session_id)
+            document, charge = self._read_item(session_id, cached.etag if cached else None)
+            if cached is not None and (not document or document.get("_etag") == cached.etag):
+                self.cache.record_hit(charge)
+                return copy.deepcopy(cached.document)
+            self.cache.record_miss(charge)
+            self.cache.put(session_id, document)
+            return copy.deepcopy(document)
         except CosmosResourceNotFoundError:
+            self.cache.invalidate(session_id)
             # Create new conversation document
             return {
                 "id": session_id,
@@ -147,3 +402,18 @@ class CosmosConversationStorage:
                 "created": datetime.utcnow().isoformat(),
                 "lastModified": datetime.utcnow().isoformat()
             }
+
+
+_storage: Optional[CosmosConversationStorage] = None
+
+
+def get_conversation_storage() -> CosmosConversationStorage:
+    """Return the process-wide conversation storage, creating it on first use.
+    
+    Returns:
+        Shared CosmosConversationStorage instance
+    """
+    global _storage
+    if _storage is None:
+        _storage = CosmosConversationStorage()
+    return _storage
@@ -0,0 +1,290 @@
+"""Streaming export of conversations to columnar files for analytics.
+
+Conversations are read page by page from a storage backend, flattened into
+one row per message with a fixed schema and written as gzip-compressed JSONL
+or Parquet (when `pyarrow` is installed). Producers and the writer are joined
+by a bounded queue, so memory stays bounded however large the container is.
+Incremental exports start from a `lastModified` watermark saved by the
+previous run::
+
+    python -m src.storage --format parquet --output exports/conversations.parquet \\
+        --watermark-file exports/watermark.json
+
+An incremental run reads the conversations modified after the watermark but
+writes only their messages timestamped after it, so turns exported by an
+earlier run are not repeated. The next watermark is the time the run started
+minus a clock-skew margin, not the newest `lastModified` it saw: a write that
+commits while the parallel pages are read, or on a host whose clock is
+behind, is picked up by the next run instead of falling into a gap.
+
+Rows are keyed by (`session_id`, `message_index`): messages are only ever
+appended, so the key is stable, and a message that is exported twice (for
+example a message without a timestamp, one inside the skew margin, or runs
+started from overlapping watermarks) must be upserted on that key rather than
+appended.
+"""
+
+import gzip
+import json
+import logging
+import math
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Protocol
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; JSONL export is always available
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Fixed export schema: one row per message, keyed by (session_id, message_index)
+EXPORT_FIELDS = [
+    "session_id",
+    "message_index",
+    "role",
+    "content",
+    "timestamp",
+    "token_count",
+    "conversation_last_modified",
+]
+
+EXPORT_FORMATS = ("jsonl", "parquet")
+
+# Default allowance for clocks of the writers running behind the exporter's
+DEFAULT_SKEW_SECONDS = 300.0
+
+_END = object()
+
+
+class ConversationSource(Protocol):
+    """A storage backend that can stream its conversation documents."""
+
+    def iter_conversations(
+        self,
+        since: Optional[str] = None,
+        page_size: int = 100,
+        concurrency: int = 4,
+    ) -> Iterator[Iterator[Dict]]:
+        """Return independent iterators over conversations modified after `since`.
+
+        Each iterator covers a disjoint part of the data (e.g. a feed range)
+        and is consumed by its own producer thread.
+        """
+        ...
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (about four characters per token for English text)."""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def conversation_rows(conversation: Dict, since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Flatten a conversation document into export rows.
+
+    With `since`, only messages timestamped after it are returned; messages
+    without a timestamp are always returned. `message_index` is the position
+    in the whole conversation either way. A stored token count (`tokens` on
+    the message) is used when present, otherwise it is estimated from the
+    content.
+    """
+    session_id = conversation.get("sessionId") or conversation.get("id")
+    last_modified = conversation.get("lastModified")
+    rows = []
+    for index, message in enumerate(conversation.get("messages", [])):
+        timestamp = message.get("timestamp")
+        if since and timestamp and timestamp <= since:
+            continue
+        content = message.get("content") or ""
+        tokens = message.get("tokens")
+        rows.append({
+            "session_id": session_id,
+            "message_index": index,
+            "role": message.get("role"),
+            "content": content,
+            "timestamp": timestamp,
+            "token_count": int(tokens) if tokens is not None else estimate_tokens(content),
+            "conversation_last_modified": last_modified,
+        })
+    return rows
+
+
+class JsonlWriter:
+    """Gzip-compressed JSON Lines writer."""
+
+    def __init__(self, path: Path):
+        self._file = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        self._file.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetWriter:
+    """Parquet writer emitting one row group per batch."""
+
+    def __init__(self, path: Path):
+        if pa is None:
+            raise RuntimeError("Parquet export requires the pyarrow package")
+        self.schema = pa.schema([
+            ("session_id", pa.string()),
+            ("message_index", pa.int32()),
+            ("role", pa.string()),
+            ("content", pa.string()),
+            ("timestamp", pa.string()),
+            ("token_count", pa.int32()),
+            ("conversation_last_modified", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(str(path), self.schema, compression="zstd")
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def export_conversations(
+    source: ConversationSource,
+    output_path: str,
+    export_format: str = "jsonl",
+    since: Optional[str] = None,
+    page_size: int = 100,
+    concurrency: int = 4,
+    batch_rows: int = 5000,
+    queue_pages: int = 16,
+    skew_seconds: float = DEFAULT_SKEW_SECONDS,
+) -> Dict[str, Any]:
+    """Export the messages added after `since` to a compressed file.
+
+    Args:
+        source: Storage backend to read from
+        output_path: Destination file; written to a temporary file and renamed when complete
+        export_format: "jsonl" (gzip) or "parquet"
+        since: lastModified watermark of the previous export (ISO timestamp)
+        page_size: Documents per page read from the backend
+        concurrency: Producer threads reading the backend in parallel
+        batch_rows: Rows buffered before each write
+        queue_pages: Pages buffered between producers and the writer
+        skew_seconds: Clock-skew margin subtracted from the start time to form
+            the new watermark
+
+    Returns:
+        Export summary: rows, conversations, elapsed seconds, rows per second
+        and the new watermark
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_name(output.name + ".tmp")
+    writer = ParquetWriter(tmp_path) if export_format == "parquet" else JsonlWriter(tmp_path)
+
+    pages: "queue.Queue" = queue.Queue(maxsize=queue_pages)
+    errors: List[BaseException] = []
+    stop = threading.Event()
+
+    def produce(conversations: Iterator[Dict]) -> None:
+        try:
+            page: List[Dict] = []
+            for conversation in conversations:
+                if stop.is_set():
+                    return
+                page.append(conversation)
+                if len(page) >= page_size:
+                    pages.put(page)
+                    page = []
+            if page:
+                pages.put(page)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            pages.put(_END)
+
+    # Timestamps are naive UTC ISO strings, as written by the storage backend
+    watermark = (datetime.utcnow() - timedelta(seconds=skew_seconds)).isoformat()
+    if since is not None and since > watermark:
+        watermark = since
+    started = time.perf_counter()
+    producers = [
+        threading.Thread(target=produce, args=(part,), daemon=True)
+        for part in source.iter_conversations(since=since, page_size=page_size, concurrency=concurrency)
+    ]
+    for producer in producers:
+        producer.start()
+
+    rows_written = 0
+    conversations = 0
+    batch: List[Dict[str, Any]] = []
+    finished = 0
+    try:
+        while finished < len(producers):
+            page = pages.get()
+            if page is _END:
+                finished += 1
+                continue
+            for conversation in page:
+                conversations += 1
+                batch.extend(conversation_rows(conversation, since))
+            if len(batch) >= batch_rows:
+                writer.write(batch)
+                rows_written += len(batch)
+                batch = []
+        if errors:
+            raise errors[0]
+        if batch:
+            writer.write(batch)
+            rows_written += len(batch)
+        writer.close()
+        tmp_path.replace(output)
+    except BaseException:
+        stop.set()
+        # Unblock producers waiting on a full queue
+        while any(producer.is_alive() for producer in producers):
+            try:
+                pages.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "output": str(output),
+        "format": export_format,
+        "rows": rows_written,
+        "conversations": conversations,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows_written / elapsed, 1) if elapsed else None,
+        "since": since,
+        "watermark": watermark,
+    }
+    logger.info(
+        f"Exported {rows_written} rows from {conversations} conversations "
+        f"in {elapsed:.1f}s ({summary['rows_per_second']} rows/s)"
+    )
+    return summary
+
+
+def read_watermark(path: str) -> Optional[str]:
+    """Read the watermark saved by the previous export, if any."""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8")).get("watermark")
+    except FileNotFoundError:
+        return None
+
+
+def write_watermark(path: str, summary: Dict[str, Any]) -> None:
+    """Persist the export summary so the next export continues from its watermark."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(summary, indent=2), encoding="utf-8")
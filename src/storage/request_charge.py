@@ -0,0 +1,165 @@
+"""Request charge (RU) accounting and client-side throttling for Cosmos DB.
+
+Every Cosmos DB response carries its cost in the `x-ms-request-charge`
+header. `RequestChargeTracker` collects those charges per operation, per
+session and per API endpoint, and optionally enforces an RU/s budget: when the
+budget is spent, the next operation waits until it has been replenished,
+instead of running into server-side 429 throttling.
+
+The endpoint of a charge is read from `src.observability.current_endpoint`,
+which the web layer sets for each request.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src.observability import current_endpoint
+
+REQUEST_CHARGE_HEADER = "x-ms-request-charge"
+
+
+class ChargeTotals:
+    """Number of operations and total request charge."""
+
+    __slots__ = ("count", "charge")
+
+    def __init__(self):
+        self.count = 0
+        self.charge = 0.0
+
+    def add(self, charge: float) -> None:
+        self.count += 1
+        self.charge += charge
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "request_charge": round(self.charge, 2),
+            "average": round(self.charge / self.count, 2) if self.count else 0.0,
+        }
+
+
+class RequestChargeTracker:
+    """Aggregates Cosmos DB request charges and enforces an optional RU/s budget."""
+
+    def __init__(self, budget_per_second: Optional[float] = None, max_sessions: int = 10000):
+        """Initialize the tracker.
+
+        Args:
+            budget_per_second: RU/s this client may spend; None disables throttling
+            max_sessions: Number of sessions tracked individually
+        """
+        self.budget_per_second = budget_per_second
+        self.max_sessions = max_sessions
+        self.total = ChargeTotals()
+        self.by_operation: Dict[str, ChargeTotals] = {}
+        self.by_session: Dict[str, ChargeTotals] = {}
+        self.by_endpoint: Dict[str, ChargeTotals] = {}
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+        # Token bucket holding at most one second of budget. Charges are only
+        # known after an operation, so the balance may go negative.
+        self._available = budget_per_second or 0.0
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def response_hook(self, operation: str, session_id: Optional[str] = None) -> Callable[[Dict, Any], None]:
+        """Return a Cosmos DB `response_hook` recording the charge of each response.
+
+        Queries may call the hook once per page; each page is recorded.
+        """
+        endpoint = current_endpoint.get()
+
+        def hook(headers: Dict, _result: Any) -> None:
+            self.record(operation, float(headers.get(REQUEST_CHARGE_HEADER, 0) or 0), session_id, endpoint)
+
+        return hook
+
+    def record(
+        self,
+        operation: str,
+        charge: float,
+        session_id: Optional[str] = None,
+        endpoint: Optional[str] = None,
+    ) -> None:
+        """Record the charge of one response and debit it from the budget."""
+        if endpoint and session_id:
+            # Keep endpoint labels bounded: /sessions/abc -> /sessions/{session_id}
+            endpoint = endpoint.replace(session_id, "{session_id}")
+        with self._lock:
+            self.total.add(charge)
+            self.by_operation.setdefault(operation, ChargeTotals()).add(charge)
+            if endpoint:
+                self.by_endpoint.setdefault(endpoint, ChargeTotals()).add(charge)
+            if session_id and (session_id in self.by_session or len(self.by_session) < self.max_sessions):
+                self.by_session.setdefault(session_id, ChargeTotals()).add(charge)
+            if self.budget_per_second:
+                self._refill()
+                self._available -= charge
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._available = min(
+            self.budget_per_second,
+            self._available + (now - self._refilled_at) * self.budget_per_second,
+        )
+        self._refilled_at = now
+
+    def _delay(self) -> float:
+        """Seconds until the budget is positive again."""
+        if not self.budget_per_second:
+            return 0.0
+        with self._lock:
+            self._refill()
+            if self._available > 0:
+                return 0.0
+            return -self._available / self.budget_per_second + 0.001
+
+    def _record_wait(self, waited: float) -> None:
+        with self._lock:
+            self.throttled += 1
+            self.throttled_seconds += waited
+
+    async def throttle(self) -> None:
+        """Wait (without blocking the event loop) until the RU budget allows another operation."""
+        delay = self._delay()
+        if not delay:
+            return
+        started = time.monotonic()
+        while delay:
+            await asyncio.sleep(delay)
+            delay = self._delay()
+        self._record_wait(time.monotonic() - started)
+
+    def throttle_sync(self) -> None:
+        """Blocking variant of `throttle` for worker threads."""
+        delay = self._delay()
+        if not delay:
+            return
+        started = time.monotonic()
+        while delay:
+            time.sleep(delay)
+            delay = self._delay()
+        self._record_wait(time.monotonic() - started)
+
+    def session_charge(self, session_id: str) -> float:
+        """Total request charge attributed to a session."""
+        totals = self.by_session.get(session_id)
+        return totals.charge if totals else 0.0
+
+    def report(self, top_sessions: int = 10) -> Dict[str, Any]:
+        """Charges per operation and endpoint, the most expensive sessions and throttling counters"""
+        with self._lock:
+            sessions = sorted(self.by_session.items(), key=lambda item: item[1].charge, reverse=True)
+            return {
+                "total": self.total.to_dict(),
+                "budget_per_second": self.budget_per_second,
+                "throttled": self.throttled,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "operations": {name: totals.to_dict() for name, totals in self.by_operation.items()},
+                "endpoints": {name: totals.to_dict() for name, totals in self.by_endpoint.items()},
+                "top_sessions": {name: totals.to_dict() for name, totals in sessions[:top_sessions]},
+            }
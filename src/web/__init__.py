@@ -0,0 +1,5 @@
+"""Web front-end asset pipeline and page rendering."""
+
+from .assets import AssetManifest, PrecompressedStaticFiles, build_assets
+
+__all__ = ["AssetManifest", "PrecompressedStaticFiles", "build_assets"]
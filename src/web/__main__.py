@@ -0,0 +1,12 @@
+"""Build fingerprinted, precompressed static assets: `python -m src.web [static_dir]`."""
+
+import logging
+import sys
+from pathlib import Path
+
+from .assets import build_assets
+
+logging.basicConfig(level=logging.INFO)
+root = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parents[2] / "static"
+for logical, fingerprinted in build_assets(root).items():
+    print(f"{logical} -> {fingerprinted}")
@@ -0,0 +1,154 @@
+"""Fingerprinted, precompressed static assets.
+
+The build step copies each CSS/JS file under `static/` to
+`static/dist/<name>.<hash><ext>` and writes gzip (and brotli, when the
+`brotli` package is installed) variants next to it, plus a `manifest.json`
+mapping logical paths to fingerprinted ones::
+
+    python -m src.web
+
+At runtime `PrecompressedStaticFiles` serves the best precompressed variant
+the client accepts, and fingerprinted files are cached as immutable.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always produced
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+ASSET_EXTENSIONS = {".css", ".js"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=300"
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def build_assets(static_dir: Path) -> Dict[str, str]:
+    """Fingerprint and precompress the CSS/JS assets under `static_dir`.
+
+    Args:
+        static_dir: The static files directory
+
+    Returns:
+        Manifest mapping logical paths (e.g. "css/style.css") to fingerprinted
+        paths relative to `static_dir` (e.g. "dist/css/style.1a2b3c4d5e6f.css")
+    """
+    static_dir = Path(static_dir)
+    dist_dir = static_dir / DIST_DIR
+    if dist_dir.exists():
+        shutil.rmtree(dist_dir)
+
+    manifest: Dict[str, str] = {}
+    for source in sorted(static_dir.rglob("*")):
+        if not source.is_file() or source.suffix not in ASSET_EXTENSIONS:
+            continue
+        relative = source.relative_to(static_dir)
+        if relative.parts[0] == DIST_DIR:
+            continue
+
+        data = source.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        target = dist_dir / relative.parent / f"{source.stem}.{digest}{source.suffix}"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        target.with_name(target.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            target.with_name(target.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+        manifest[relative.as_posix()] = target.relative_to(static_dir).as_posix()
+
+    (dist_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    logger.info(f"Built {len(manifest)} static assets into {dist_dir}")
+    return manifest
+
+
+class AssetManifest:
+    """Resolves logical asset paths to their fingerprinted URLs."""
+
+    def __init__(self, static_dir: Path, url_prefix: str = "/static"):
+        self.url_prefix = url_prefix.rstrip("/")
+        manifest_path = Path(static_dir) / DIST_DIR / MANIFEST_NAME
+        self.entries: Dict[str, str] = {}
+        if manifest_path.exists():
+            self.entries = json.loads(manifest_path.read_text())
+        else:
+            logger.warning("Static asset manifest not found; run `python -m src.web` to build it")
+
+    def url(self, path: str) -> str:
+        """Return the URL of an asset, fingerprinted when it has been built."""
+        return f"{self.url_prefix}/{self.entries.get(path, path)}"
+
+
+def _accepted_encodings(headers: Headers) -> set:
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves `.br`/`.gz` siblings and long-lived cache headers."""
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        path = str(full_path)
+        immutable = f"{os.sep}{DIST_DIR}{os.sep}" in path
+
+        response: Optional[Response] = None
+        if immutable:
+            accepted = _accepted_encodings(request_headers)
+            for encoding, suffix in ENCODINGS:
+                if encoding not in accepted or not os.path.exists(path + suffix):
+                    continue
+                variant_stat = os.stat(path + suffix)
+                response = FileResponse(
+                    path + suffix,
+                    status_code=status_code,
+                    stat_result=variant_stat,
+                    media_type=_media_type(path),
+                )
+                response.headers["Content-Encoding"] = encoding
+                break
+
+        if response is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+        elif self.is_not_modified(response.headers, request_headers):
+            # A 304 has no body: send only the validator and caching headers,
+            # not the encoded variant's Content-Length/Content-Encoding
+            response = Response(status_code=304, headers={"ETag": response.headers["etag"]})
+
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if immutable else DEFAULT_CACHE_CONTROL
+        if immutable:
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+def _media_type(path: str) -> str:
+    if path.endswith(".css"):
+        return "text/css"
+    if path.endswith(".js"):
+        return "text/javascript"
+    return "application/octet-stream"
+
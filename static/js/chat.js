@@ -3,6 +3,9 @@ class TravelAgentChat {
         this.sessionId = this.generateSessionId();
         this.isTyping = false;
         this.messageHistory = [];
+        this.abortController = null;
+        this.currentTurnId = null;
+        this.maxReconnectAttempts = 3;
         
         this.initializeElements();
         this.attachEventListeners();
@@ -13,6 +16,7 @@ class TravelAgentChat {
     initializeElements() {
         this.messageInput = document.getElementById('message-input');
         this.sendButton = document.getElementById('send-button');
+        this.stopButton = document.getElementById('stop-button');
         this.messagesContainer = document.getElementById('messages');
         this.typingIndicator = document.getElementById('typing-indicator');
         this.welcomeMessage = document.getElementById('welcome-message');
@@ -26,6 +30,9 @@ class TravelAgentChat {
         // Send button click
         this.sendButton.addEventListener('click', () => this.sendMessage());
         
+        // Stop button aborts the streaming response
+        this.stopButton.addEventListener('click', () => this.stopResponse());
+        
         // New conversation button click
         this.newConversationBtn.addEventListener('click', () => this.startNewConversation());
         
@@ -55,6 +62,9 @@ class TravelAgentChat {
     }
 
     startNewConversation() {
+        // Stop any response still streaming
+        this.stopResponse();
+        
         // Generate new session ID
         this.sessionId = this.generateSessionId();
         
@@ -147,38 +157,243 @@ class TravelAgentChat {
     }
 
     async getAgentResponse(message) {
+        const turnId = this.generateTurnId();
+        const streamingMessage = this.createStreamingMessage();
+        const controller = new AbortController();
+        let lastEventId = -1;
+        let attempt = 0;
+
+        this.abortController = controller;
+        this.currentTurnId = turnId;
+        this.showStopButton(true);
+
         try {
-            const response = await fetch('/api/chat/message', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    message: message,
-                    session_id: this.sessionId
-                })
-            });
-
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
+            while (true) {
+                try {
+                    const finished = await this.consumeStream({
+                        message: message,
+                        session_id: this.sessionId,
+                        turn_id: turnId,
+                        last_event_id: lastEventId
+                    }, controller.signal, (eventId, event) => {
+                        lastEventId = eventId;
+                        attempt = 0;
+                        this.handleStreamEvent(event, streamingMessage);
+                    });
+
+                    if (finished) {
+                        break;
+                    }
+                    // Stream ended without a final event: the connection dropped
+                    throw new Error('Stream closed before completion');
+                } catch (error) {
+                    if (error.name === 'AbortError') {
+                        this.setStreamingStatus(streamingMessage, 'Stopped');
+                        this.finishStreamingMessage(streamingMessage);
+                        return;
+                    }
+                    if (error.fromServer || attempt >= this.maxReconnectAttempts) {
+                        this.removeStreamingMessageIfEmpty(streamingMessage);
+                        throw error;
+                    }
+                    attempt += 1;
+                    this.updateStatus('connecting');
+                    this.setStreamingStatus(streamingMessage, 'Reconnecting...');
+                    await this.delay(Math.min(500 * 2 ** (attempt - 1), 4000));
+                }
+            }
+            this.updateStatus('connected');
+        } finally {
+            this.abortController = null;
+            this.currentTurnId = null;
+            this.showStopButton(false);
+        }
+    }
+
+    async consumeStream(payload, signal, onEvent) {
+        const response = await fetch('/api/chat/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify(payload),
+            signal: signal
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let finished = false;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let eventId = null;
+                let data = '';
+                for (const line of block.split('\n')) {
+                    if (line.startsWith('id:')) {
+                        eventId = parseInt(line.slice(3).trim(), 10);
+                    } else if (line.startsWith('data:')) {
+                        data += line.slice(5).trim();
+                    }
+                }
+                if (!data) continue;
+
+                const event = JSON.parse(data);
+                onEvent(eventId, event);
+                if (['final', 'error', 'cancelled'].includes(event.type)) {
+                    finished = true;
+                }
             }
+        }
+        return finished;
+    }
+
+    handleStreamEvent(event, streamingMessage) {
+        if (event.session_id) {
+            this.sessionId = event.session_id;
+        }
 
-            const data = await response.json();
-            
-            // Add assistant response
-            this.addMessage(data.response, 'assistant');
-            
-            // Update session ID if provided
-            if (data.session_id) {
-                this.sessionId = data.session_id;
+        switch (event.type) {
+            case 'delta':
+                this.typingIndicator.style.display = 'none';
+                this.appendStreamingText(streamingMessage, event.delta);
+                this.setStreamingStatus(streamingMessage, '');
+                break;
+            case 'status':
+                this.setStreamingStatus(streamingMessage, this.describeProgress(event));
+                break;
+            case 'final':
+                this.typingIndicator.style.display = 'none';
+                this.replaceStreamingText(streamingMessage, event.content);
+                this.setStreamingStatus(streamingMessage, '');
+                this.finishStreamingMessage(streamingMessage);
+                this.messageHistory.push({ sender: 'assistant', content: event.content, timestamp: new Date() });
+                break;
+            case 'cancelled':
+                this.setStreamingStatus(streamingMessage, 'Stopped');
+                this.finishStreamingMessage(streamingMessage);
+                break;
+            case 'error': {
+                const error = new Error(event.error || 'Streaming error');
+                error.fromServer = true;
+                throw error;
             }
-            
-        } catch (error) {
-            console.error('API Error:', error);
-            throw error;
         }
     }
 
+    describeProgress(event) {
+        const steps = event.progress || [];
+        const last = steps[steps.length - 1];
+        if (!last) {
+            return event.content || '';
+        }
+        const tool = (last.tool || '').split('-').pop();
+        return last.type === 'tool_call'
+            ? `Consulting ${tool}...`
+            : `${tool} finished (${Math.round(last.elapsed_ms)} ms)`;
+    }
+
+    createStreamingMessage() {
+        this.addMessage('', 'assistant');
+        const messageDiv = this.messagesContainer.lastElementChild;
+        messageDiv.classList.add('streaming');
+        const textDiv = messageDiv.querySelector('.message-text');
+        const textNode = document.createTextNode('');
+        textDiv.appendChild(textNode);
+
+        const statusDiv = document.createElement('div');
+        statusDiv.className = 'message-status';
+        textDiv.after(statusDiv);
+
+        // The final text is recorded when the stream completes
+        this.messageHistory.pop();
+
+        return { messageDiv, textNode, statusDiv, pendingText: '', frameRequested: false };
+    }
+
+    appendStreamingText(streamingMessage, text) {
+        streamingMessage.pendingText += text;
+        if (!streamingMessage.frameRequested) {
+            streamingMessage.frameRequested = true;
+            requestAnimationFrame(() => this.flushStreamingText(streamingMessage));
+        }
+    }
+
+    flushStreamingText(streamingMessage) {
+        streamingMessage.frameRequested = false;
+        if (streamingMessage.pendingText) {
+            streamingMessage.textNode.appendData(streamingMessage.pendingText);
+            streamingMessage.pendingText = '';
+            this.scrollToBottom();
+        }
+    }
+
+    replaceStreamingText(streamingMessage, text) {
+        streamingMessage.pendingText = '';
+        if (streamingMessage.textNode.data !== text) {
+            streamingMessage.textNode.data = text;
+        }
+        this.scrollToBottom();
+    }
+
+    setStreamingStatus(streamingMessage, text) {
+        streamingMessage.statusDiv.textContent = text;
+        streamingMessage.statusDiv.style.display = text ? 'block' : 'none';
+    }
+
+    finishStreamingMessage(streamingMessage) {
+        this.flushStreamingText(streamingMessage);
+        streamingMessage.messageDiv.classList.remove('streaming');
+    }
+
+    removeStreamingMessageIfEmpty(streamingMessage) {
+        this.flushStreamingText(streamingMessage);
+        if (!streamingMessage.textNode.data) {
+            streamingMessage.messageDiv.remove();
+        }
+    }
+
+    stopResponse() {
+        if (!this.abortController) return;
+        const turnId = this.currentTurnId;
+        this.abortController.abort();
+        if (turnId) {
+            // Closing the connection alone leaves the turn running until it is orphaned.
+            // The session header routes the cancel to the replica running the turn.
+            fetch(`/api/chat/stream/${encodeURIComponent(turnId)}/cancel`, {
+                method: 'POST',
+                headers: { 'X-Session-Id': this.sessionId }
+            })
+                .catch(error => console.warn('Cancel request failed:', error));
+        }
+    }
+
+    showStopButton(visible) {
+        this.stopButton.style.display = visible ? 'flex' : 'none';
+        this.sendButton.style.display = visible ? 'none' : 'flex';
+    }
+
+    generateTurnId() {
+        return 'turn_' + Math.random().toString(36).substr(2, 9) + '_' + Date.now();
+    }
+
+    delay(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
     addMessage(content, sender, isError = false) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${sender}`;
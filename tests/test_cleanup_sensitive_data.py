@@ -0,0 +1,48 @@
+"""Tests for cleaning the staged content of a git repository."""
+
+import subprocess
+
+import pytest
+
+from cleanup_sensitive_data import SensitiveDataCleaner, git_staged_blob, git_staged_files
+
+SECRET = "172.168.108.4"
+
+
+def run_git(repo, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo, check=True, capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    run_git(tmp_path, "init", "-q")
+    (tmp_path / "notes.md").write_text("host: example\n" * 20)
+    run_git(tmp_path, "add", "notes.md")
+    run_git(tmp_path, "commit", "-q", "-m", "initial")
+    return tmp_path
+
+
+def test_staged_rename_is_listed_under_its_new_path(repo):
+    run_git(repo, "mv", "notes.md", "guide.md")
+    (repo / "added.md").write_text("new\n")
+    run_git(repo, "add", "added.md")
+
+    assert sorted(git_staged_files(repo)) == [("100644", "added.md"), ("100644", "guide.md")]
+
+
+def test_clean_staged_cleans_a_renamed_file(repo):
+    run_git(repo, "mv", "notes.md", "guide.md")
+    (repo / "guide.md").write_text("host: example\n" * 20 + f"ip: {SECRET}\n")
+    run_git(repo, "add", "guide.md")
+
+    cleaner = SensitiveDataCleaner(str(repo))
+    assert cleaner.clean_staged() == 1
+
+    staged = git_staged_blob(repo, "guide.md").decode()
+    assert SECRET not in staged
+    assert "<YOUR-PHASE1-PUBLIC-IP>" in staged
+    # The working tree copy is left as it was
+    assert SECRET in (repo / "guide.md").read_text()
@@ -0,0 +1,197 @@
+"""Tests for the bounded A2A event queues: coalescing, overflow and slow consumers."""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from a2a.server.tasks import InMemoryTaskStore
+from a2a.types import Task, TaskState, TaskStatus, TaskStatusUpdateEvent
+
+from src.agent.event_queue import (
+    SLOW_CONSUMER_MESSAGE,
+    BoundedEventQueue,
+    BoundedQueueManager,
+    QueuePolicy,
+)
+
+TASK_ID = "task-1"
+CONTEXT_ID = "context-1"
+
+
+def status_update(state=TaskState.working, final=False, progress=None, text=None) -> TaskStatusUpdateEvent:
+    metadata = {}
+    if progress is not None:
+        metadata["progress"] = progress
+    if text is not None:
+        metadata["text"] = text
+    return TaskStatusUpdateEvent(
+        taskId=TASK_ID,
+        contextId=CONTEXT_ID,
+        status=TaskStatus(state=state),
+        final=final,
+        metadata=metadata or None,
+    )
+
+
+async def drain(queue: BoundedEventQueue) -> list:
+    events = []
+    while queue.depth:
+        events.append(await queue.dequeue_event(no_wait=True))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_unread_working_updates_are_coalesced():
+    queue = BoundedEventQueue(QueuePolicy(capacity=8))
+    await queue.enqueue_event(status_update(progress=[{"step": 1}], text="first"))
+    await queue.enqueue_event(status_update(progress=[{"step": 2}], text="second"))
+    await queue.enqueue_event(status_update(progress=[{"step": 3}]))
+
+    events = await drain(queue)
+    assert len(events) == 1
+    assert events[0].metadata["progress"] == [{"step": 1}, {"step": 2}, {"step": 3}]
+    assert events[0].metadata["text"] == "second"
+    assert queue.coalesced == 2
+
+
+@pytest.mark.asyncio
+async def test_read_and_final_updates_are_not_coalesced():
+    queue = BoundedEventQueue(QueuePolicy(capacity=8))
+    first = status_update(progress=[{"step": 1}])
+    await queue.enqueue_event(first)
+    assert (await queue.dequeue_event(no_wait=True)).metadata["progress"] == [{"step": 1}]
+
+    await queue.enqueue_event(status_update(progress=[{"step": 2}]))
+    await queue.enqueue_event(status_update(state=TaskState.completed, final=True))
+
+    events = await drain(queue)
+    assert [event.status.state for event in events] == [TaskState.working, TaskState.completed]
+    assert queue.coalesced == 0
+    # The producer's event is copied, so coalescing never changes it
+    assert first.metadata["progress"] == [{"step": 1}]
+
+
+@pytest.mark.asyncio
+async def test_drop_policy_drops_working_updates_but_keeps_final_events():
+    queue = BoundedEventQueue(QueuePolicy(capacity=2, overflow="drop", coalesce=False, slow_consumer_timeout=5))
+    for step in range(4):
+        await queue.enqueue_event(status_update(progress=[{"step": step}]))
+    assert queue.depth == 2
+    assert queue.dropped == 2
+
+    final = asyncio.create_task(queue.enqueue_event(status_update(state=TaskState.completed, final=True)))
+    await asyncio.sleep(0.01)
+    assert not final.done()  # Waits for room instead of being dropped
+    await queue.dequeue_event(no_wait=True)
+    await asyncio.wait_for(final, 1)
+
+    events = await drain(queue)
+    assert events[-1].status.state == TaskState.completed
+    assert queue.dropped == 2
+
+
+@pytest.mark.asyncio
+async def test_block_policy_waits_for_the_consumer():
+    queue = BoundedEventQueue(QueuePolicy(capacity=1, overflow="block", coalesce=False, slow_consumer_timeout=5))
+    await queue.enqueue_event(status_update(text="first"))
+    producer = asyncio.create_task(queue.enqueue_event(status_update(text="second")))
+    await asyncio.sleep(0.01)
+    assert not producer.done()
+
+    assert (await queue.dequeue_event(no_wait=True)).metadata["text"] == "first"
+    await asyncio.wait_for(producer, 1)
+    assert (await queue.dequeue_event(no_wait=True)).metadata["text"] == "second"
+    assert queue.dropped == 0
+    assert queue.blocked_seconds > 0
+
+
+@pytest.fixture
+def policy():
+    return QueuePolicy(capacity=1, overflow="block", coalesce=False, slow_consumer_timeout=0.05)
+
+
+@pytest_asyncio.fixture
+async def task_store():
+    store = InMemoryTaskStore()
+    await store.save(Task(id=TASK_ID, contextId=CONTEXT_ID, status=TaskStatus(state=TaskState.working)))
+    return store
+
+
+@pytest.mark.asyncio
+async def test_slow_main_consumer_is_disconnected_and_task_marked_failed(policy, task_store):
+    manager = BoundedQueueManager(policy, task_store=task_store)
+    queue = await manager.create_or_tap(TASK_ID)
+
+    await queue.enqueue_event(status_update(text="first"))
+    await queue.enqueue_event(status_update(text="second"))  # Blocks past the timeout
+
+    assert queue.is_closed()
+    assert queue.slow_consumer
+    assert queue.depth == 0
+    task = await task_store.get(TASK_ID)
+    assert task.status.state == TaskState.failed
+    assert task.status.message.parts[0].root.text == SLOW_CONSUMER_MESSAGE
+
+    # Later events are ignored, and the manager counts the disconnection
+    await queue.enqueue_event(status_update(state=TaskState.completed, final=True))
+    assert queue.depth == 0
+    await manager.close(TASK_ID)
+    assert manager.totals["slow_consumers"] == 1
+
+
+@pytest.mark.asyncio
+async def test_consumer_that_stops_reading_is_disconnected(task_store):
+    policy = QueuePolicy(capacity=8, slow_consumer_timeout=0.05)
+    manager = BoundedQueueManager(policy, task_store=task_store)
+    queue = await manager.create_or_tap(TASK_ID)
+
+    await queue.enqueue_event(status_update(text="unread"))
+    await asyncio.sleep(0.06)
+    await queue.enqueue_event(status_update(state=TaskState.completed, final=True))
+
+    assert queue.is_closed()
+    assert (await task_store.get(TASK_ID)).status.state == TaskState.failed
+
+
+@pytest.mark.asyncio
+async def test_slow_tap_is_disconnected_without_failing_the_task(policy, task_store):
+    manager = BoundedQueueManager(policy, task_store=task_store)
+    queue = await manager.create_or_tap(TASK_ID)
+    tap = await manager.tap(TASK_ID)
+
+    await queue.enqueue_event(status_update(text="first"))
+    await queue.dequeue_event(no_wait=True)
+    await queue.enqueue_event(status_update(text="second"))  # The tap never reads
+
+    assert tap.is_closed() and tap.slow_consumer
+    assert tap not in queue._children
+    assert not queue.is_closed()
+    assert (await task_store.get(TASK_ID)).status.state == TaskState.working
+
+
+@pytest.mark.asyncio
+async def test_finished_task_is_not_overwritten(policy, task_store):
+    await task_store.save(Task(id=TASK_ID, contextId=CONTEXT_ID, status=TaskStatus(state=TaskState.completed)))
+    manager = BoundedQueueManager(policy, task_store=task_store)
+    queue = await manager.create_or_tap(TASK_ID)
+
+    await queue.enqueue_event(status_update(text="first"))
+    await queue.enqueue_event(status_update(text="second"))
+
+    assert queue.is_closed()
+    assert (await task_store.get(TASK_ID)).status.state == TaskState.completed
+
+
+@pytest.mark.asyncio
+async def test_disconnect_does_not_wait_for_a_stalled_tap(policy, task_store):
+    manager = BoundedQueueManager(policy, task_store=task_store)
+    queue = await manager.create_or_tap(TASK_ID)
+    tap = await manager.tap(TASK_ID)
+
+    await queue.enqueue_event(status_update(text="first"))  # Neither consumer reads
+    await asyncio.wait_for(queue.enqueue_event(status_update(text="second")), 1)
+
+    assert queue.is_closed() and queue.slow_consumer
+    assert tap.is_closed() and tap.depth == 0
+    assert (await task_store.get(TASK_ID)).status.state == TaskState.failed
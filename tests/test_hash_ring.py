@@ -0,0 +1,39 @@
+"""Tests for the consistent hash ring used by the session-affine proxy."""
+
+from collections import Counter
+
+from src.routing.hash_ring import HashRing
+
+WORKERS = ["http://worker-1", "http://worker-2", "http://worker-3"]
+KEYS = [f"session-{i}" for i in range(3000)]
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing().get_node("session") is None
+
+
+def test_keys_are_mapped_consistently_and_spread_evenly():
+    ring = HashRing(WORKERS)
+    owners = {key: ring.get_node(key) for key in KEYS}
+    assert owners == {key: HashRing(reversed(WORKERS)).get_node(key) for key in KEYS}
+
+    counts = Counter(owners.values())
+    assert set(counts) == set(WORKERS)
+    assert min(counts.values()) > len(KEYS) / len(WORKERS) * 0.7
+
+
+def test_removing_a_worker_only_moves_its_keys():
+    ring = HashRing(WORKERS)
+    before = {key: ring.get_node(key) for key in KEYS}
+    ring.remove_node(WORKERS[0])
+    after = {key: ring.get_node(key) for key in KEYS}
+
+    assert ring.nodes == WORKERS[1:]
+    for key in KEYS:
+        if before[key] != WORKERS[0]:
+            assert after[key] == before[key]
+        else:
+            assert after[key] in WORKERS[1:]
+
+    ring.add_node(WORKERS[0])
+    assert {key: ring.get_node(key) for key in KEYS} == before
@@ -0,0 +1,206 @@
+"""Tests for the session-affine proxy, routing across real worker processes.
+
+Each worker is a separate uvicorn process running `worker_app`, which keeps
+its turns, batches and tasks in memory like the real replicas do, so a
+request routed to the wrong process fails.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from src.routing.proxy import ROUTED_WORKER_HEADER, SessionAffinityProxy, extract_resource_id
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_turns: set = set()
+_batches: set = set()
+_tasks: dict = {}
+
+
+async def _health(request: Request):
+    return JSONResponse({"status": "healthy"})
+
+
+async def _stream(request: Request):
+    payload = await request.json()
+    _turns.add(payload["turn_id"])
+    return JSONResponse({"session_id": payload["session_id"], "pid": os.getpid()})
+
+
+async def _cancel(request: Request):
+    if request.path_params["turn_id"] in _turns:
+        return JSONResponse({"cancelled": True})
+    return JSONResponse({"detail": "Turn not running"}, status_code=404)
+
+
+async def _batch_submit(request: Request):
+    batch_id = request.headers.get("x-batch-id") or uuid.uuid4().hex
+    _batches.add(batch_id)
+    return JSONResponse({"batch_id": batch_id, "status": "running"}, status_code=202)
+
+
+async def _batch_status(request: Request):
+    if request.path_params["batch_id"] in _batches:
+        return JSONResponse({"status": "running"})
+    return JSONResponse({"error": "Batch not found"}, status_code=404)
+
+
+async def _rpc(request: Request):
+    payload = await request.json()
+    params = payload["params"]
+    if payload["method"] == "message/send":
+        task_id = uuid.uuid4().hex
+        context_id = params["message"]["contextId"]
+        _tasks[task_id] = context_id
+        message = {**params["message"], "taskId": task_id}
+        result = {"contextId": context_id, "history": [message], "id": task_id, "kind": "task"}
+    elif params["id"] in _tasks:
+        result = {"contextId": _tasks[params["id"]], "id": params["id"], "kind": "task"}
+    else:
+        return JSONResponse({"jsonrpc": "2.0", "id": payload["id"], "error": {"code": -32001}})
+    return JSONResponse({"jsonrpc": "2.0", "id": payload["id"], "result": result})
+
+
+worker_app = Starlette(routes=[
+    Route("/health", _health),
+    Route("/api/chat/stream", _stream, methods=["POST"]),
+    Route("/api/chat/stream/{turn_id}/cancel", _cancel, methods=["POST"]),
+    Route("/a2a/batch", _batch_submit, methods=["POST"]),
+    Route("/a2a/batch/{batch_id}", _batch_status),
+    Route("/a2a/", _rpc, methods=["POST"]),
+])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def workers():
+    processes, urls = [], []
+    for _ in range(3):
+        port = _free_port()
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "tests.test_proxy:worker_app", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT,
+        ))
+        urls.append(f"http://127.0.0.1:{port}")
+    try:
+        deadline = time.monotonic() + 20
+        for url in urls:
+            while True:
+                try:
+                    if httpx.get(f"{url}/health").status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                assert time.monotonic() < deadline, "worker did not start"
+                time.sleep(0.1)
+        yield urls
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+@pytest.fixture
+def client(workers):
+    proxy = SessionAffinityProxy(workers, health_interval=0)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=proxy), base_url="http://proxy")
+
+
+def rpc(method: str, params: dict) -> dict:
+    return {"jsonrpc": "2.0", "id": uuid.uuid4().hex, "method": method, "params": params}
+
+
+def test_extract_resource_id():
+    assert extract_resource_id("/api/chat/stream/turn_1/cancel", b"") == "turn:turn_1"
+    assert extract_resource_id("/a2a/batch/abc/results", b"") == "batch:abc"
+    body = json.dumps(rpc("tasks/cancel", {"id": "t1"})).encode()
+    assert extract_resource_id("/a2a/", body) == "task:t1"
+    assert extract_resource_id("/api/chat/message", b'{"message": "hi"}') is None
+
+
+@pytest.mark.asyncio
+async def test_session_requests_reach_one_worker(client):
+    async with client:
+        for i in range(20):
+            session_id = f"session-{i}"
+            served = {
+                (await client.post("/api/chat/stream", json={
+                    "message": "hi", "session_id": session_id, "turn_id": f"{session_id}-{turn}",
+                })).headers[ROUTED_WORKER_HEADER]
+                for turn in range(3)
+            }
+            assert len(served) == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_follows_the_turn_without_a_session_header(client):
+    async with client:
+        for i in range(20):
+            turn_id = f"turn-{i}"
+            started = await client.post("/api/chat/stream", json={"message": "hi", "turn_id": turn_id})
+            cancelled = await client.post(f"/api/chat/stream/{turn_id}/cancel")
+            assert cancelled.status_code == 200
+            assert cancelled.headers[ROUTED_WORKER_HEADER] == started.headers[ROUTED_WORKER_HEADER]
+
+
+@pytest.mark.asyncio
+async def test_batch_requests_follow_the_batch(client):
+    async with client:
+        for _ in range(20):
+            submitted = await client.post("/a2a/batch", content=b'{"custom_id": "1", "query": "hi"}\n')
+            assert submitted.status_code == 202
+            status = await client.get(f"/a2a/batch/{submitted.json()['batch_id']}")
+            assert status.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_task_calls_follow_the_task(client):
+    async with client:
+        for _ in range(20):
+            sent = await client.post("/a2a/", json=rpc("message/send", {
+                "message": {"role": "user", "parts": [{"kind": "text", "text": "hi"}], "messageId": uuid.uuid4().hex},
+            }))
+            task = sent.json()["result"]
+            fetched = await client.post("/a2a/", json=rpc("tasks/get", {"id": task["id"]}))
+            assert fetched.json()["result"]["contextId"] == task["contextId"]
+
+
+def test_chat_websocket_frames_stay_on_the_connection_worker():
+    workers = ["http://worker-1", "http://worker-2", "http://worker-3"]
+    proxy = SessionAffinityProxy(workers, health_interval=0)
+    worker = workers[0]
+
+    text, error = proxy.check_chat_frame(json.dumps({"type": "send", "message": "hi"}), worker)
+    assert error is None
+    assert proxy.ring.get_node(json.loads(text)["session_id"]) == worker
+
+    owned = proxy.owned_session_key(worker)
+    frame = json.dumps({"type": "send", "message": "hi", "session_id": owned})
+    assert proxy.check_chat_frame(frame, worker) == (frame, None)
+
+    foreign = proxy.owned_session_key(workers[1])
+    frame = json.dumps({"type": "send", "id": "t1", "message": "hi", "session_id": foreign})
+    text, error = proxy.check_chat_frame(frame, worker)
+    assert text is None
+    assert error["type"] == "error" and error["id"] == "t1"
+
+    ping = json.dumps({"type": "ping"})
+    assert proxy.check_chat_frame(ping, worker) == (ping, None)
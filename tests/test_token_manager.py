@@ -0,0 +1,168 @@
+"""Tests for the Azure AD token manager, using a fake credential and clock."""
+
+import threading
+import time
+from collections import namedtuple
+
+import pytest
+
+from src.auth.token_manager import AzureTokenManager
+
+AccessToken = namedtuple("AccessToken", ["token", "expires_on"])
+
+SCOPE = "https://cosmos.azure.com/.default"
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class FakeCredential:
+    """Issues tokens valid for `lifetime` seconds, or raises while `failing`."""
+
+    def __init__(self, clock: FakeClock, lifetime: float = 3600.0, delay: float = 0.0):
+        self.clock = clock
+        self.lifetime = lifetime
+        self.delay = delay
+        self.failing = False
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_token(self, *scopes, **kwargs):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        if self.delay:
+            time.sleep(self.delay)
+        if self.failing:
+            raise RuntimeError("credential unavailable")
+        return AccessToken(f"token-{calls}", self.clock() + self.lifetime)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def credential(clock):
+    return FakeCredential(clock)
+
+
+@pytest.fixture
+def manager(credential, clock):
+    return AzureTokenManager(credential, refresh_margin=300.0, clock=clock, retry_initial=1.0, retry_max=8.0)
+
+
+def test_token_is_cached_until_refresh_margin(manager, credential, clock):
+    first = manager.get_token(SCOPE)
+    clock.advance(3000)
+    assert manager.get_token(SCOPE) is first
+    assert credential.calls == 1
+
+
+def test_caller_refreshes_inside_margin_without_background_thread(manager, credential, clock):
+    manager.get_token(SCOPE)
+    clock.advance(3400)
+    assert manager.get_token(SCOPE).token == "token-2"
+    assert credential.calls == 2
+
+
+def test_refresh_due_refreshes_proactively(manager, credential, clock):
+    manager.get_token(SCOPE)
+
+    manager.refresh_due()
+    assert credential.calls == 1
+    assert manager._next_refresh_delay() == pytest.approx(3300.0)
+
+    clock.advance(3300)
+    manager.refresh_due()
+    assert credential.calls == 2
+    assert manager.get_token(SCOPE).token == "token-2"
+
+
+def test_options_bypass_the_cache(manager, credential):
+    manager.get_token(SCOPE)
+    manager.get_token(SCOPE, claims='{"access_token": {}}')
+    assert credential.calls == 2
+
+
+def test_concurrent_refreshes_are_deduplicated(clock):
+    credential = FakeCredential(clock, delay=0.05)
+    manager = AzureTokenManager(credential, clock=clock)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(manager.get_token(SCOPE))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert credential.calls == 1
+    assert {token.token for token in results} == {"token-1"}
+
+
+def test_failed_refresh_backs_off_exponentially(manager, credential, clock):
+    credential.failing = True
+    with pytest.raises(RuntimeError):
+        manager.get_token(SCOPE)
+    assert credential.calls == 1
+
+    expected_delays = [1.0, 2.0, 4.0, 8.0, 8.0]
+    for delay in expected_delays:
+        assert manager._next_refresh_delay() == pytest.approx(max(delay, 1.0))
+        # Not retried before the backoff elapses
+        clock.advance(delay - 0.5)
+        calls = credential.calls
+        manager.refresh_due()
+        assert credential.calls == calls
+        clock.advance(0.5)
+        manager.refresh_due()
+        assert credential.calls == calls + 1
+
+    credential.failing = False
+    clock.advance(8.0)
+    manager.refresh_due()
+    assert manager.get_token(SCOPE).token.startswith("token-")
+    state = manager.metrics()[SCOPE]
+    assert state["consecutive_failures"] == 0
+    assert state["retry_in_seconds"] is None
+
+
+def test_valid_token_is_served_while_refresh_fails(manager, credential, clock):
+    token = manager.get_token(SCOPE)
+    clock.advance(3400)
+    credential.failing = True
+
+    assert manager.get_token(SCOPE) is token
+    calls = credential.calls
+    # Backing off: further callers get the cached token without hitting the credential
+    assert manager.get_token(SCOPE) is token
+    assert credential.calls == calls
+
+    clock.advance(1.0)
+    assert manager.get_token(SCOPE) is token
+    assert credential.calls == calls + 1
+
+
+def test_metrics(manager, credential, clock):
+    manager.get_token(SCOPE)
+    clock.advance(600)
+    credential.failing = True
+    manager.refresh_due()  # not due yet
+    clock.advance(2700)
+    manager.refresh_due()
+
+    metrics = manager.metrics()[SCOPE]
+    assert metrics["token_age_seconds"] == 3300.0
+    assert metrics["expires_in_seconds"] == 300.0
+    assert metrics["refresh_count"] == 1
+    assert metrics["failure_count"] == 1
+    assert metrics["consecutive_failures"] == 1
+    assert metrics["retry_in_seconds"] == 1.0
+    assert metrics["last_error"] == "credential unavailable"
@@ -0,0 +1,114 @@
+"""Tests for the destination guide vector index and its hashing embedder."""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.agent.embeddings import HashingEmbedder
+from src.agent.vector_index import (
+    VectorIndex,
+    build_index,
+    chunk_guides,
+    destination_matches,
+    ensure_index,
+)
+
+GUIDES = {
+    "tokyo.md": "# Tokyo\n\nTake the Yamanote line around the city.\n\nTipping is not expected in restaurants.\n",
+    "rome.md": "# Rome\n\nValidate your metro ticket before boarding.\n\nA coperto cover charge is normal.\n",
+    "new-york.md": "# New York\n\nThe subway runs all night.\n\nTip fifteen to twenty percent in restaurants.\n",
+}
+
+
+class CountingEmbedder(HashingEmbedder):
+    """Hashing embedder that counts the passages it embeds."""
+
+    def __init__(self, dim: int = 64):
+        super().__init__(dim)
+        self.embedded = 0
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        with self._lock:
+            self.embedded += len(texts)
+        return super().embed(texts)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    corpus_dir = tmp_path / "guides"
+    corpus_dir.mkdir()
+    for name, text in GUIDES.items():
+        (corpus_dir / name).write_text(text, encoding="utf-8")
+    return corpus_dir
+
+
+def test_chunk_guides_keeps_whole_paragraphs_under_the_limit(corpus):
+    passages = chunk_guides(corpus, max_chars=50)
+    assert {p["title"] for p in passages} == {"Tokyo", "Rome", "New York"}
+    tokyo = [p["text"] for p in passages if p["source"] == "tokyo.md"]
+    assert tokyo == ["Take the Yamanote line around the city.", "Tipping is not expected in restaurants."]
+
+    merged = chunk_guides(corpus, max_chars=400)
+    assert len(merged) == len(GUIDES)
+    assert all("# " not in p["text"] for p in merged)
+
+
+def test_destination_matches_names_and_aliases():
+    assert destination_matches("New York City", "New York")
+    assert destination_matches("NYC", "New York")
+    assert destination_matches("Tokyo, Japan", "Tokyo")
+    assert destination_matches("Roma", "Rome")
+    assert not destination_matches("Romania", "Rome")
+    assert not destination_matches("York", "New York")
+
+
+def test_exact_ivf_and_filtered_search_agree(tmp_path):
+    embedder = HashingEmbedder(64)
+    passages = [{"text": f"passage {i} about topic {i % 7}", "title": f"City {i % 3}"} for i in range(200)]
+    index = VectorIndex(build_index(passages, tmp_path / "index", embedder, nlist=4), embedder)
+    queries = embedder.embed(["topic 3", "passage 42"])
+
+    scores, _ = index.search_vectors(queries, k=5)
+    brute_force = -np.sort(-(queries @ np.asarray(index.vectors).T), axis=1)[:, :5]
+    np.testing.assert_allclose(scores, brute_force, rtol=1e-5)
+
+    # Probing every cluster is exact
+    ivf_scores, _ = index.search_vectors(queries, k=5, nprobe=4)
+    np.testing.assert_allclose(ivf_scores, scores, rtol=1e-5)
+
+    allowed = np.arange(0, 200, 3)
+    _, filtered = index.search_vectors(queries, k=5, rows=allowed)
+    assert set(filtered.ravel().tolist()) <= set(allowed.tolist())
+
+
+def test_destination_filter_applies_before_top_k(corpus, tmp_path):
+    index = VectorIndex(build_index(chunk_guides(corpus, max_chars=50), tmp_path / "index"))
+    results = index.search("tipping in restaurants", k=2, destination="NYC")
+    assert results and all(r["title"] == "New York" for r in results)
+    assert index.search("tipping", destination="Lisbon") == []
+
+
+def test_concurrent_ensure_index_builds_once(corpus, tmp_path):
+    embedder = CountingEmbedder()
+    out = tmp_path / "index"
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda _: ensure_index(out, corpus, embedder), range(4)))
+    assert embedder.embedded == len(chunk_guides(corpus))
+    assert len(VectorIndex(out, embedder)) == len(GUIDES)
+
+
+def test_ensure_index_rebuilds_when_the_corpus_changes(corpus, tmp_path):
+    embedder = CountingEmbedder()
+    out = tmp_path / "index"
+    ensure_index(out, corpus, embedder)
+    ensure_index(out, corpus, embedder)
+    assert embedder.embedded == len(GUIDES)
+
+    (corpus / "kyoto.md").write_text("# Kyoto\n\nBuy a bus day pass.\n", encoding="utf-8")
+    ensure_index(out, corpus, embedder)
+    assert json.loads((out / "meta.json").read_text())["count"] == len(GUIDES) + 1
+    assert VectorIndex(out, embedder).search("bus day pass", k=1)[0]["title"] == "Kyoto"